@@ -84,6 +84,19 @@ DATABASES = {
     }
 }
 
+# Embedded document store holding rosters generated with the "nosql" backend
+ROSTER_DOCUMENT_STORE = BASE_DIR / 'roster_documents.sqlite3'
+
+# Crew flight duty limits in hours, checked when rosters pick crew (see
+# flights.duty_rules.DutyLimits); set to None to turn the checks off
+CREW_DUTY_LIMITS = {
+    'max_duty_24h': 13,
+    'max_duty_7d': 60,
+    'max_duty_28d': 190,
+    'min_rest': 10,
+    'max_duty_period': 13,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
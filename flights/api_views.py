@@ -1,42 +1,55 @@
 from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import OrderingFilter, SearchFilter
 from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from .models import (
     Airport,
-    PlaneType,
     Flight,
     Pilot,
-    CabinCrew,
     Passenger,
-    FlightTicket,
-    MenuItem,
-    Roster,
+    RosterJob,
 )
 from .serializers import (
     AirportSerializer,
     PlaneTypeSerializer,
     FlightSerializer,
+    FlightLiteSerializer,
     PilotSerializer,
     CabinCrewSerializer,
     PassengerSerializer,
     TicketSerializer,
+    TicketLiteSerializer,
     MenuItemSerializer,
     RosterSerializer,
+    RosterLiteSerializer,
+    RosterJobSerializer,
+    sideload_flight_references,
 )
-from .roster_engine import generate_roster
+from .crew_index import get_pilot_index, get_qualification_index
+from .crew_optimizer import OBJECTIVES
+from .roster_jobs import enqueue_roster_job, job_events
+from .roster_engine import RosterInProgress, generate_roster, generate_rosters, simulate_roster, update_roster
+from .roster_export import export_rosters, stream_export
+from .seat_map import SEATING_ENGINES, get_seat_map
+from .seat_occupancy import get_occupancy
+from . import prefetch_plans
+from .pagination import OptInCursorPagination
 from .permissions import IsStaffOrReadOnly, IsStaffOrSuperuser
 
 User = get_user_model()
 
 
 class AirportViewSet(viewsets.ModelViewSet):
-    queryset = Airport.objects.all()
+    queryset = prefetch_plans.airports()
     serializer_class = AirportSerializer
     permission_classes = [IsStaffOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -45,7 +58,7 @@ class AirportViewSet(viewsets.ModelViewSet):
 
 
 class MenuItemViewSet(viewsets.ModelViewSet):
-    queryset = MenuItem.objects.all()
+    queryset = prefetch_plans.menu_items()
     serializer_class = MenuItemSerializer
     permission_classes = [IsStaffOrReadOnly]
     filter_backends = [SearchFilter, OrderingFilter]
@@ -54,23 +67,149 @@ class MenuItemViewSet(viewsets.ModelViewSet):
 
 
 class PlaneTypeViewSet(viewsets.ModelViewSet):
-    queryset = PlaneType.objects.all()
+    queryset = prefetch_plans.plane_types()
     serializer_class = PlaneTypeSerializer
     permission_classes = [IsStaffOrReadOnly]
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ['code', 'name']
     ordering_fields = ['total_seats', 'business_seats', 'economy_seats']
 
+    @action(detail=True, methods=['get'])
+    def seatmap(self, request, pk=None):
+        """Compiled seat map: class zones, row/column grid, aisle and window flags, seat indices"""
+        return Response(get_seat_map(self.get_object()).to_dict())
 
-class FlightViewSet(viewsets.ModelViewSet):
-    queryset = Flight.objects.select_related('origin_airport', 'destination_airport', 'plane_type').all().order_by('id')
+
+class LiteViewMixin:
+    """
+    `?view=lite` on list endpoints: flat rows with ids for related objects.
+
+    Rows come from `lite_serializer_class`, read without joins, and the
+    flights (unless the rows are flights), airports and plane types they
+    refer to are sideloaded once per response under `flights`, `airports`
+    and `plane_types`. The queries and payload per page then stay the same
+    however deeply the full serializers nest.
+    """
+    lite_serializer_class = None
+    # Field of each row holding its flight; None when the rows are flights
+    lite_flight_field = 'flight'
+    lite_actions = ('list',)
+
+    def is_lite(self):
+        return (self.request is not None and self.request.query_params.get('view') == 'lite'
+                and self.action in self.lite_actions)
+
+    def get_serializer_class(self):
+        if self.is_lite():
+            return self.lite_serializer_class
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.is_lite():
+            queryset = queryset.select_related(None).prefetch_related(None)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        return self.list_response(self.filter_queryset(self.get_queryset()))
+
+    def list_response(self, queryset):
+        """Paginated serialized rows of `queryset`, with the lite sideloads when asked for."""
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        data = self.get_serializer(rows, many=True).data
+        response = self.get_paginated_response(data) if page is not None else Response(data)
+        if self.is_lite():
+            if isinstance(response.data, list):
+                response.data = {'results': response.data}
+            response.data.update(self.lite_sideload(rows))
+        return response
+
+    def lite_sideload(self, rows):
+        if self.lite_flight_field is None:
+            return sideload_flight_references(rows)
+        flight_ids = {getattr(row, f'{self.lite_flight_field}_id') for row in rows} - {None}
+        flights = list(Flight.objects.filter(id__in=flight_ids).order_by('id')) if flight_ids else []
+        return {'flights': FlightLiteSerializer(flights, many=True).data, **sideload_flight_references(flights)}
+
+
+# Longest departure-date window /flights/search/ accepts
+FLIGHT_SEARCH_MAX_DAYS = 31
+
+
+class FlightViewSet(LiteViewMixin, viewsets.ModelViewSet):
+    queryset = prefetch_plans.flights().order_by('id')
     serializer_class = FlightSerializer
+    lite_serializer_class = FlightLiteSerializer
+    lite_flight_field = None
+    lite_actions = ('list', 'search')
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('id',)
     permission_classes = [IsStaffOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['origin_airport', 'destination_airport', 'status', 'plane_type__code']
     search_fields = ['flight_number', 'origin_airport__code', 'destination_airport__code']
     ordering_fields = ['departure_time', 'arrival_time', 'flight_number']
 
+    @action(detail=True, methods=['get'])
+    def seatmap(self, request, pk=None):
+        """
+        Compiled seat map of the flight's plane with the seats taken by live tickets.
+
+        `taken` is a hex bitmap over seat indices (bit i set: seat i is
+        taken); with `?occupancy=list` it is the list of taken labels.
+        Served from a per-process cache that ticket writes keep current.
+        """
+        try:
+            occupancy = get_occupancy(int(pk))
+        except (TypeError, ValueError, Flight.DoesNotExist):
+            return Response({'detail': 'flight not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(occupancy.to_dict(as_list=request.query_params.get('occupancy') == 'list'))
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Flights on a route by departure day, earliest first.
+
+        `origin` and `destination` are airport codes; `date` picks one day,
+        `date_from`/`date_to` a window of up to FLIGHT_SEARCH_MAX_DAYS days.
+        `status` and `plane_type` (code) narrow it further. The lookup is
+        one range scan of the (origin, destination, departure_date,
+        departure_time) index, so it costs the same however many flights
+        other routes and days hold.
+        """
+        params = request.query_params
+        origin, destination = params.get('origin', '').upper(), params.get('destination', '').upper()
+        if not origin or not destination:
+            return Response({'detail': 'origin and destination are required'}, status=status.HTTP_400_BAD_REQUEST)
+        day = params.get('date')
+        try:
+            date_from = parse_date(params.get('date_from') or day or '')
+            date_to = parse_date(params.get('date_to') or day or params.get('date_from') or '')
+        except ValueError:
+            date_from = date_to = None
+        if date_from is None or date_to is None:
+            return Response({'detail': 'date or date_from/date_to is required as YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        if date_to < date_from:
+            return Response({'detail': 'date_to is before date_from'}, status=status.HTTP_400_BAD_REQUEST)
+        if (date_to - date_from).days + 1 > FLIGHT_SEARCH_MAX_DAYS:
+            return Response({'detail': f'date window is limited to {FLIGHT_SEARCH_MAX_DAYS} days'}, status=status.HTTP_400_BAD_REQUEST)
+
+        airports = dict(Airport.objects.filter(code__in=[origin, destination]).values_list('code', 'id'))
+        queryset = self.get_queryset().none()
+        if origin in airports and destination in airports:
+            queryset = self.get_queryset().filter(
+                origin_airport_id=airports[origin],
+                destination_airport_id=airports[destination],
+                departure_date__range=(date_from, date_to),
+            ).order_by('departure_date', 'departure_time', 'id')
+            if params.get('status'):
+                queryset = queryset.filter(status=params['status'])
+            if params.get('plane_type'):
+                queryset = queryset.filter(plane_type__code=params['plane_type'])
+        self.cursor_ordering = ('departure_time', 'id')
+        return self.list_response(queryset)
+
 
 class PilotViewSet(viewsets.ModelViewSet):
     """
@@ -87,7 +226,7 @@ class PilotViewSet(viewsets.ModelViewSet):
     - Each flight must have at least one senior and one junior pilot
     - Flights may have at most two trainees
     """
-    queryset = Pilot.objects.select_related('vehicle_restriction').all()
+    queryset = prefetch_plans.pilots()
     serializer_class = PilotSerializer
     permission_classes = [IsStaffOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -95,16 +234,54 @@ class PilotViewSet(viewsets.ModelViewSet):
     search_fields = ['code', 'first_name', 'last_name', 'nationality']
     ordering_fields = ['age', 'max_range_km', 'seniority', 'code']
 
+    def get_queryset(self):
+        """
+        Filter by `min_range_km` (pilots who can fly that far) or `flight`
+        (pilots qualified for its plane type and distance) through the
+        cached pilot range index, the one the roster engine selects from.
+        """
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        min_range_km = params.get('min_range_km')
+        flight_id = params.get('flight')
+        if min_range_km is None and flight_id is None:
+            return queryset
+        try:
+            min_range_km = int(min_range_km) if min_range_km is not None else 0
+            flight_id = int(flight_id) if flight_id is not None else None
+        except ValueError:
+            raise ValidationError({'detail': 'min_range_km and flight must be integers'})
+        plane_type_ids = None
+        if flight_id is not None:
+            flight = Flight.objects.filter(id=flight_id).values('plane_type_id', 'distance_km').first()
+            if flight is None or flight['plane_type_id'] is None:
+                return queryset.none()
+            plane_type_ids = [flight['plane_type_id']]
+            min_range_km = max(min_range_km, flight['distance_km'] or 0)
+        return queryset.filter(id__in=get_pilot_index().pilot_ids(plane_type_ids, min_range_km=min_range_km))
+
 
 class CabinCrewViewSet(viewsets.ModelViewSet):
-    queryset = CabinCrew.objects.prefetch_related('vehicle_restrictions').all()
+    queryset = prefetch_plans.cabin_crew()
     serializer_class = CabinCrewSerializer
     permission_classes = [IsStaffOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['role', 'seniority', 'vehicle_restrictions']
+    filterset_fields = ['role', 'seniority']
     search_fields = ['code', 'first_name', 'last_name', 'nationality']
     ordering_fields = ['age']
 
+    def get_queryset(self):
+        """Filter by vehicle_restrictions (repeatable) through the cached qualification index."""
+        queryset = super().get_queryset()
+        plane_type_ids = self.request.query_params.getlist('vehicle_restrictions')
+        if plane_type_ids:
+            try:
+                plane_type_ids = [int(pid) for pid in plane_type_ids]
+            except ValueError:
+                raise ValidationError({'vehicle_restrictions': 'Plane type ids must be integers'})
+            queryset = queryset.filter(id__in=get_qualification_index().cabin_crew_ids_for_any(plane_type_ids))
+        return queryset
+
 
 class PassengerViewSet(viewsets.ModelViewSet):
     """
@@ -118,8 +295,10 @@ class PassengerViewSet(viewsets.ModelViewSet):
     - Seat number: May be designated or absent
     - Affiliated passengers: 1-2 passenger IDs if seat number absent (for neighboring seat assignment)
     """
-    queryset = Passenger.objects.prefetch_related('tickets__flight', 'affiliated_passengers', 'parent').all()
+    queryset = prefetch_plans.passengers()
     serializer_class = PassengerSerializer
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('id',)
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['seat_type', 'age', 'nationality']
@@ -140,9 +319,12 @@ class PassengerViewSet(viewsets.ModelViewSet):
         return queryset.distinct()
 
 
-class TicketViewSet(viewsets.ModelViewSet):
-    queryset = FlightTicket.objects.select_related('passenger', 'flight').all().order_by('id')
+class TicketViewSet(LiteViewMixin, viewsets.ModelViewSet):
+    queryset = prefetch_plans.tickets().order_by('id')
     serializer_class = TicketSerializer
+    lite_serializer_class = TicketLiteSerializer
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('id',)
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['flight', 'passenger', 'status', 'ticket_number']
@@ -164,9 +346,12 @@ class TicketViewSet(viewsets.ModelViewSet):
         serializer.save(price=str(base), user=user)
 
 
-class RosterViewSet(viewsets.ModelViewSet):
-    queryset = Roster.objects.select_related('flight').all().order_by('-created_at')
+class RosterViewSet(LiteViewMixin, viewsets.ModelViewSet):
+    queryset = prefetch_plans.rosters().order_by('-created_at')
     serializer_class = RosterSerializer
+    lite_serializer_class = RosterLiteSerializer
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-id',)
     permission_classes = [IsStaffOrSuperuser]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['flight', 'backend']
@@ -183,70 +368,211 @@ class RosterViewSet(viewsets.ModelViewSet):
         backend = request.data.get('backend', 'sql')
         pilot_ids = request.data.get('pilot_ids', [])  # Optional manual selection
         cabin_crew_ids = request.data.get('cabin_crew_ids', [])  # Optional manual selection
+        incremental = bool(request.data.get('incremental', False))  # Apply ticket changes to the latest roster
+        run_async = bool(request.data.get('async', False))  # Queue a job instead of waiting for the roster
+        seating = request.data.get('seating', 'python')  # Seat pool engine: python or numpy
         if not flight_id:
             return Response({'detail': 'flight_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if seating not in SEATING_ENGINES:
+            return Response({'detail': f"seating must be one of {', '.join(SEATING_ENGINES)}"}, status=status.HTTP_400_BAD_REQUEST)
+        if incremental and (pilot_ids or cabin_crew_ids):
+            return Response({'detail': 'incremental updates keep the existing crew'}, status=status.HTTP_400_BAD_REQUEST)
+        if run_async:
+            if incremental:
+                return Response({'detail': 'incremental updates cannot be queued'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                params = {
+                    'flight_id': int(flight_id),
+                    'backend': backend,
+                    'pilot_ids': [int(pid) for pid in pilot_ids or []],
+                    'cabin_crew_ids': [int(cid) for cid in cabin_crew_ids or []],
+                    'seating': seating,
+                }
+            except (TypeError, ValueError):
+                return Response({'detail': 'flight_id, pilot_ids and cabin_crew_ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+            job = enqueue_roster_job('single', params, request.user)
+            return Response(RosterJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
         try:
-            roster = generate_roster(
-                flight_id=flight_id, 
-                backend=backend, 
-                user=request.user,
-                pilot_ids=pilot_ids if pilot_ids else None,
-                cabin_crew_ids=cabin_crew_ids if cabin_crew_ids else None
-            )
+            if incremental:
+                roster = update_roster(flight_id=flight_id, user=request.user)
+            else:
+                roster = generate_roster(
+                    flight_id=flight_id, 
+                    backend=backend, 
+                    user=request.user,
+                    pilot_ids=pilot_ids if pilot_ids else None,
+                    cabin_crew_ids=cabin_crew_ids if cabin_crew_ids else None,
+                    seating=seating,
+                )
         except Flight.DoesNotExist:
             return Response({'detail': 'flight not found'}, status=status.HTTP_404_NOT_FOUND)
+        except RosterInProgress as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_409_CONFLICT)
         except ValueError as exc:
             return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         serializer = self.get_serializer(roster)
+        if incremental:
+            return Response({**serializer.data, 'delta': roster.delta}, status=status.HTTP_200_OK)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsStaffOrSuperuser])
+    def simulate(self, request):
+        """
+        Dry run of `generate`: same input, nothing is written.
+
+        Returns the proposed roster and every rule the selection breaks.
+        """
+        flight_id = request.data.get('flight_id')
+        backend = request.data.get('backend', 'sql')
+        seating = request.data.get('seating', 'python')
+        if not flight_id:
+            return Response({'detail': 'flight_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if seating not in SEATING_ENGINES:
+            return Response({'detail': f"seating must be one of {', '.join(SEATING_ENGINES)}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            pilot_ids = [int(pid) for pid in request.data.get('pilot_ids') or []]
+            cabin_crew_ids = [int(cid) for cid in request.data.get('cabin_crew_ids') or []]
+            result = simulate_roster(
+                flight_id=flight_id,
+                backend=backend,
+                pilot_ids=pilot_ids or None,
+                cabin_crew_ids=cabin_crew_ids or None,
+                seating=seating,
+            )
+        except (TypeError, ValueError):
+            return Response({'detail': 'flight_id, pilot_ids and cabin_crew_ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        except Flight.DoesNotExist:
+            return Response({'detail': 'flight not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsStaffOrSuperuser])
+    def generate_batch(self, request):
+        """
+        Generate rosters for many flights in one request.
+
+        Accepts either `flight_ids` or a `date_from`/`date_to` departure range
+        (YYYY-MM-DD, inclusive). Every flight gets its own result or error.
+        Set `optimize` to choose crew for the whole batch at once
+        (`objective`: min_crew or fair, `time_budget` in seconds).
+        `seating` picks the seat pool engine (python or numpy). Set
+        `pairings` to keep one crew across connecting flights. With
+        `async` the batch is queued and the job is returned (202); follow
+        it at rosters/jobs/<id>/.
+        """
+        flight_ids = request.data.get('flight_ids') or []
+        backend = request.data.get('backend', 'sql')
+        date_from = request.data.get('date_from')
+        date_to = request.data.get('date_to')
+        optimize = bool(request.data.get('optimize', False))
+        objective = request.data.get('objective', 'min_crew')
+        pairings = bool(request.data.get('pairings', False))
+        seating = request.data.get('seating', 'python')
+        if seating not in SEATING_ENGINES:
+            return Response({'detail': f"seating must be one of {', '.join(SEATING_ENGINES)}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            time_budget = float(request.data.get('time_budget', 10))
+            flight_ids = [int(fid) for fid in flight_ids]
+            dates = [parse_date(value) if value else None for value in (date_from, date_to)]
+            if any(value and parsed is None for value, parsed in zip((date_from, date_to), dates)):
+                raise ValueError(date_from or date_to)
+        except (TypeError, ValueError):
+            return Response({'detail': 'flight_ids must be integers, time_budget a number and dates YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        date_from, date_to = dates
+        if not flight_ids and not (date_from or date_to):
+            return Response({'detail': 'flight_ids or date_from/date_to is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if optimize and pairings:
+            return Response({'detail': 'optimize and pairings cannot be combined'}, status=status.HTTP_400_BAD_REQUEST)
+        if request.data.get('async', False):
+            if optimize and objective not in OBJECTIVES:
+                return Response({'detail': f"objective must be one of {', '.join(OBJECTIVES)}"}, status=status.HTTP_400_BAD_REQUEST)
+            job = enqueue_roster_job('batch', {
+                'flight_ids': flight_ids,
+                'date_from': date_from.isoformat() if date_from else None,
+                'date_to': date_to.isoformat() if date_to else None,
+                'backend': backend,
+                'optimize': optimize,
+                'objective': objective,
+                'time_budget': time_budget,
+                'seating': seating,
+                'pairings': pairings,
+            }, request.user)
+            return Response(RosterJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+        try:
+            report = generate_rosters(
+                flight_ids=flight_ids or None,
+                date_from=date_from,
+                date_to=date_to,
+                backend=backend,
+                user=request.user,
+                optimize=optimize,
+                objective=objective,
+                time_budget=time_budget,
+                seating=seating,
+                pairings=pairings,
+            )
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK)
     
+    @action(detail=False, methods=['get'], permission_classes=[IsStaffOrSuperuser],
+            url_path=r'jobs/(?P<job_id>[0-9]+)', url_name='job')
+    def job(self, request, job_id=None):
+        """
+        Status and progress of a queued roster job; finished jobs link their roster.
+
+        With `?stream=1` the response is a text/event-stream that sends the
+        job again whenever its status or progress changes, until it finishes.
+        """
+        try:
+            job = RosterJob.objects.select_related('roster').get(id=job_id)
+        except RosterJob.DoesNotExist:
+            return Response({'detail': 'job not found'}, status=status.HTTP_404_NOT_FOUND)
+        if request.query_params.get('stream'):
+            render = lambda j: JSONRenderer().render(RosterJobSerializer(j).data).decode()
+            response = StreamingHttpResponse(job_events(job.id, render), content_type='text/event-stream')
+            response['Cache-Control'] = 'no-cache'
+            return response
+        return Response(RosterJobSerializer(job).data)
+
+    def _export_response(self, rosters, fmt, filename, single=False):
+        try:
+            content_type, body = stream_export(rosters, fmt, single=single)
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(body, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+        return response
+
     @action(detail=True, methods=['get'], permission_classes=[IsStaffOrSuperuser])
     def export_json(self, request, pk=None):
         """Export roster as JSON"""
         roster = self.get_object()
-        export_data = {
-            'flight': {
-                'flight_number': roster.flight.flight_number if roster.flight else None,
-                'origin': roster.flight.origin_airport.code if roster.flight and roster.flight.origin_airport else None,
-                'destination': roster.flight.destination_airport.code if roster.flight and roster.flight.destination_airport else None,
-                'departure': roster.flight.departure_time.isoformat() if roster.flight and roster.flight.departure_time else None,
-                'arrival': roster.flight.arrival_time.isoformat() if roster.flight and roster.flight.arrival_time else None,
-            },
-            'backend': roster.backend,
-            'created_at': roster.created_at.isoformat(),
-            'crew': [],
-            'passengers': []
-        }
-        
-        # Add crew
-        for assignment in roster.crew_assignments.all():
-            if assignment.crew_type == 'pilot' and assignment.pilot:
-                export_data['crew'].append({
-                    'type': 'pilot',
-                    'code': assignment.pilot.code,
-                    'name': f"{assignment.pilot.first_name} {assignment.pilot.last_name}",
-                    'role': assignment.assigned_role,
-                })
-            elif assignment.crew_type == 'cabin' and assignment.cabin_crew:
-                export_data['crew'].append({
-                    'type': 'cabin',
-                    'code': assignment.cabin_crew.code,
-                    'name': f"{assignment.cabin_crew.first_name} {assignment.cabin_crew.last_name}",
-                    'role': assignment.assigned_role,
-                })
-        
-        # Add passengers
-        for assignment in roster.passenger_assignments.all():
-            if assignment.passenger:
-                export_data['passengers'].append({
-                    'name': f"{assignment.passenger.first_name} {assignment.passenger.last_name}",
-                    'seat': assignment.seat_number,
-                    'seat_type': assignment.seat_type,
-                    'email': assignment.passenger.email,
-                    'passport': assignment.passenger.passport_number,
-                })
-        
-        return Response(export_data, status=status.HTTP_200_OK)
+        return self._export_response(export_rosters([roster.id]), 'json', f'roster-{roster.id}', single=True)
+
+    @action(detail=True, methods=['get'], permission_classes=[IsStaffOrSuperuser])
+    def export(self, request, pk=None):
+        """Stream a roster manifest; ?fmt=json (default), ndjson or csv."""
+        roster = self.get_object()
+        fmt = request.query_params.get('fmt', 'json')
+        return self._export_response(export_rosters([roster.id]), fmt, f'roster-{roster.id}', single=True)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsStaffOrSuperuser],
+            url_path='export', url_name='export-range')
+    def export_range(self, request):
+        """Stream the latest roster of every flight departing between ?date_from= and ?date_to=."""
+        date_from, date_to = request.query_params.get('date_from'), request.query_params.get('date_to')
+        try:
+            dates = [parse_date(value) if value else None for value in (date_from, date_to)]
+        except ValueError:
+            dates = [None, None]
+        if (date_from and dates[0] is None) or (date_to and dates[1] is None):
+            return Response({'detail': 'dates must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rosters = export_rosters(date_from=dates[0], date_to=dates[1])
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.query_params.get('fmt', 'json')
+        return self._export_response(rosters, fmt, f"rosters-{date_from or 'start'}-{date_to or 'end'}")
 
 
 @api_view(['POST'])
@@ -0,0 +1,182 @@
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+import time
+
+from django.db.models import Value
+
+from .models import CabinCrew, Pilot
+
+# Cached indexes are rebuilt after this many seconds. The save/delete
+# signals only reach the process that made the change, so this bounds how
+# long other processes (API workers, roster job workers) serve crew data
+# that changed elsewhere.
+INDEX_MAX_AGE = 60.0
+
+
+class QualificationIndex:
+    """
+    Which crew may work on which plane type.
+
+    Maps plane type id to the ids of the pilots restricted to it and the
+    cabin crew qualified for it, so checking a whole crew against a
+    flight is a set lookup per member instead of a query per member.
+    """
+
+    def __init__(self, pilots_by_plane: Dict[int, Set[int]], cabin_crew_by_plane: Dict[int, Set[int]]):
+        self._pilots: Dict[int, FrozenSet[int]] = {pid: frozenset(ids) for pid, ids in pilots_by_plane.items()}
+        self._cabin_crew: Dict[int, FrozenSet[int]] = {pid: frozenset(ids) for pid, ids in cabin_crew_by_plane.items()}
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls) -> "QualificationIndex":
+        """Read pilot restrictions and the cabin crew M2M in one UNION query."""
+        pilots = Pilot.objects.filter(vehicle_restriction__isnull=False).annotate(
+            kind=Value("pilot"),
+        ).order_by().values_list("kind", "vehicle_restriction_id", "id")
+        cabin_crew = CabinCrew.vehicle_restrictions.through.objects.annotate(
+            kind=Value("cabin"),
+        ).order_by().values_list("kind", "planetype_id", "cabincrew_id")
+
+        pilots_by_plane: Dict[int, Set[int]] = {}
+        cabin_crew_by_plane: Dict[int, Set[int]] = {}
+        for kind, plane_type_id, crew_id in pilots.union(cabin_crew, all=True):
+            target = pilots_by_plane if kind == "pilot" else cabin_crew_by_plane
+            target.setdefault(plane_type_id, set()).add(crew_id)
+        return cls(pilots_by_plane, cabin_crew_by_plane)
+
+    def pilot_ids(self, plane_type_id: int) -> FrozenSet[int]:
+        return self._pilots.get(plane_type_id, frozenset())
+
+    def cabin_crew_ids(self, plane_type_id: int) -> FrozenSet[int]:
+        return self._cabin_crew.get(plane_type_id, frozenset())
+
+    def cabin_crew_ids_for_any(self, plane_type_ids: Iterable[int]) -> Set[int]:
+        """Cabin crew qualified for at least one of the plane types."""
+        ids: Set[int] = set()
+        for plane_type_id in plane_type_ids:
+            ids |= self.cabin_crew_ids(plane_type_id)
+        return ids
+
+
+_qualification_index = None
+_qualification_lock = Lock()
+
+
+def get_qualification_index() -> QualificationIndex:
+    """
+    The qualification index, cached per process.
+
+    The cache is dropped by invalidate_qualification_index(), which the
+    Pilot, CabinCrew and vehicle_restrictions signals call, and rebuilt
+    once older than INDEX_MAX_AGE. Rules that must not act on stale data
+    (validating a chosen crew) read the crew's own restrictions instead.
+    """
+    global _qualification_index
+    index = _qualification_index
+    if index is None or time.monotonic() - index.built_at > INDEX_MAX_AGE:
+        index = QualificationIndex.build()
+        with _qualification_lock:
+            _qualification_index = index
+    return index
+
+
+def invalidate_qualification_index() -> None:
+    global _qualification_index
+    with _qualification_lock:
+        _qualification_index = None
+
+
+class PilotRangeIndex:
+    """
+    Pilots grouped by (plane type, seniority), sorted by max_range_km.
+
+    Finding the pilots who may fly a distance is a bisect into the sorted
+    ranges of each group instead of a range query. Pilots without a
+    vehicle restriction are kept under plane type None; pilots without a
+    max range can fly nothing and are left out.
+    """
+
+    def __init__(self, pilots: Iterable[Pilot]):
+        groups: Dict[Tuple[Optional[int], Optional[str]], List[Pilot]] = {}
+        for pilot in pilots:
+            if pilot.max_range_km is not None:
+                groups.setdefault((pilot.vehicle_restriction_id, pilot.seniority), []).append(pilot)
+        self._pilots: Dict[Tuple[Optional[int], Optional[str]], List[Pilot]] = {}
+        self._ranges: Dict[Tuple[Optional[int], Optional[str]], List[int]] = {}
+        for key, members in groups.items():
+            members.sort(key=lambda p: (p.max_range_km, p.code))
+            self._pilots[key] = members
+            self._ranges[key] = [p.max_range_km for p in members]
+        self._seniorities: Dict[Optional[int], List[Optional[str]]] = {}
+        for plane_type_id, seniority in self._pilots:
+            self._seniorities.setdefault(plane_type_id, []).append(seniority)
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls) -> "PilotRangeIndex":
+        """Read every pilot in one query."""
+        return cls(Pilot.objects.order_by())
+
+    def pilots(self, plane_type_id: Optional[int], seniority: Optional[str], min_range_km: int = 0) -> List[Pilot]:
+        """Pilots of the group whose max range covers `min_range_km`, shortest range first."""
+        key = (plane_type_id, seniority)
+        members = self._pilots.get(key)
+        if not members:
+            return []
+        return members[bisect_left(self._ranges[key], min_range_km):]
+
+    def pilots_for(self, plane_type_id: Optional[int], min_range_km: int = 0) -> List[Pilot]:
+        """Pilots restricted to the plane type who cover the distance, ordered by seniority and code."""
+        return sorted(
+            (
+                pilot
+                for seniority in self.seniorities(plane_type_id)
+                for pilot in self.pilots(plane_type_id, seniority, min_range_km)
+            ),
+            key=lambda p: (p.seniority or "", p.code),
+        )
+
+    def pilot_ids(self, plane_type_ids: Optional[Iterable[Optional[int]]] = None,
+                  seniorities: Optional[Iterable[Optional[str]]] = None, min_range_km: int = 0) -> Set[int]:
+        """Ids of pilots covering `min_range_km`, optionally limited to some plane types and seniorities."""
+        plane_type_ids = None if plane_type_ids is None else set(plane_type_ids)
+        seniorities = None if seniorities is None else set(seniorities)
+        return {
+            pilot.id
+            for plane_type_id, seniority in self._pilots
+            if (plane_type_ids is None or plane_type_id in plane_type_ids)
+            and (seniorities is None or seniority in seniorities)
+            for pilot in self.pilots(plane_type_id, seniority, min_range_km)
+        }
+
+    def seniorities(self, plane_type_id: Optional[int]) -> List[Optional[str]]:
+        return self._seniorities.get(plane_type_id, [])
+
+
+_pilot_index = None
+_pilot_lock = Lock()
+
+
+def get_pilot_index() -> PilotRangeIndex:
+    """
+    The pilot range index, cached per process.
+
+    The cache is dropped by invalidate_pilot_index(), which the Pilot
+    save and delete signals call, and rebuilt once older than
+    INDEX_MAX_AGE. The roster engine re-reads the pilots it picked from
+    the index before saving a roster.
+    """
+    global _pilot_index
+    index = _pilot_index
+    if index is None or time.monotonic() - index.built_at > INDEX_MAX_AGE:
+        index = PilotRangeIndex.build()
+        with _pilot_lock:
+            _pilot_index = index
+    return index
+
+
+def invalidate_pilot_index() -> None:
+    global _pilot_index
+    with _pilot_lock:
+        _pilot_index = None
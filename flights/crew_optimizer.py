@@ -0,0 +1,343 @@
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+import heapq
+import os
+import random
+import time
+
+# This module deliberately avoids Django imports: problems are plain tuples
+# so they can be shipped to worker processes and solved there.
+
+OBJECTIVES = ("min_crew", "fair")
+
+CrewKey = Tuple[str, int]
+
+
+class FlightSlot(NamedTuple):
+    id: int
+    plane_type_id: int
+    distance_km: int
+    start: float
+    end: float
+    min_cabin_crew: int
+    max_cabin_crew: int
+
+
+class PilotCandidate(NamedTuple):
+    id: int
+    plane_type_id: int
+    max_range_km: int
+    seniority: str
+
+
+class CabinCandidate(NamedTuple):
+    id: int
+    plane_type_ids: FrozenSet[int]
+    seniority: str
+
+
+class CrewProblem(NamedTuple):
+    """Flights to staff, the crew pools, and duty periods that are already booked (epoch seconds)."""
+    flights: Tuple[FlightSlot, ...]
+    pilots: Tuple[PilotCandidate, ...]
+    cabin_crew: Tuple[CabinCandidate, ...]
+    busy: Dict[CrewKey, List[Tuple[float, float]]]
+
+
+def _slots(flight: FlightSlot) -> Optional[List[Tuple[str, str, int]]]:
+    """
+    (crew kind, seniority or 'any', count) positions a flight needs, mirroring automatic selection.
+
+    The cabin gets one senior and up to four juniors, capped so the cabin
+    total stays within the plane's [min_cabin_crew, max_cabin_crew];
+    None when no cabin satisfies those limits.
+    """
+    if flight.max_cabin_crew < 1 or flight.min_cabin_crew > flight.max_cabin_crew:
+        return None
+    juniors = min(4, flight.max_cabin_crew - 1)
+    return [
+        ("pilot", "senior", 1),
+        ("pilot", "junior", 1),
+        ("cabin", "senior", 1),
+        ("cabin", "junior", juniors),
+        ("cabin", "any", max(0, flight.min_cabin_crew - 1 - juniors)),
+    ]
+
+
+class _Timeline:
+    """Sorted, non-overlapping duty periods of one crew member; flight id None marks pre-existing duty."""
+
+    __slots__ = ("starts", "ends", "flights")
+
+    def __init__(self, periods=()):
+        self.starts: List[float] = []
+        self.ends: List[float] = []
+        self.flights: List[Optional[int]] = []
+        for start, end in sorted(periods):
+            self.add(start, end, None)
+
+    def conflicts(self, start: float, end: float) -> List[Optional[int]]:
+        i = bisect_left(self.starts, end)
+        out = []
+        while i > 0 and self.ends[i - 1] > start:
+            i -= 1
+            out.append(self.flights[i])
+        return out
+
+    def is_free(self, start: float, end: float) -> bool:
+        i = bisect_left(self.starts, end)
+        return i == 0 or self.ends[i - 1] <= start
+
+    def last_end_before(self, start: float) -> Optional[float]:
+        i = bisect_left(self.starts, start)
+        return self.ends[i - 1] if i else None
+
+    def add(self, start: float, end: float, flight_id: Optional[int]) -> None:
+        i = bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.flights.insert(i, flight_id)
+
+    def remove(self, flight_id: int) -> None:
+        i = self.flights.index(flight_id)
+        del self.starts[i], self.ends[i], self.flights[i]
+
+
+class _Plan:
+    def __init__(self, problem: CrewProblem, objective: str, seed: int):
+        self.problem = problem
+        self.objective = objective
+        self.rng = random.Random(seed)
+        self.noisy = seed != 0
+        self.timelines: Dict[CrewKey, _Timeline] = {
+            key: _Timeline(periods) for key, periods in problem.busy.items()
+        }
+        self.duty: Dict[CrewKey, float] = {}
+        self.crew: Dict[int, List[Tuple[CrewKey, str, str]]] = {}
+        self.unassigned: Dict[int, str] = {}
+        self.flights = {f.id: f for f in problem.flights}
+
+        # Pilots per (plane type, seniority), sorted by range so the ones
+        # that can fly a distance are a bisect away
+        self.pilot_ranges: Dict[Tuple[int, str], List[int]] = {}
+        self.pilot_keys: Dict[Tuple[int, str], List[CrewKey]] = {}
+        for pilot in sorted(problem.pilots, key=lambda p: (p.max_range_km, p.id)):
+            group = (pilot.plane_type_id, pilot.seniority)
+            self.pilot_ranges.setdefault(group, []).append(pilot.max_range_km)
+            self.pilot_keys.setdefault(group, []).append(("pilot", pilot.id))
+            self.timeline(("pilot", pilot.id))
+        # Cabin crew per (plane type, seniority or 'any'); slack is how many types they can serve
+        self.cabin_groups: Dict[Tuple[int, str], List[Tuple[CrewKey, float]]] = {}
+        for member in problem.cabin_crew:
+            entry = (("cabin", member.id), float(len(member.plane_type_ids)))
+            for plane_type_id in member.plane_type_ids:
+                self.cabin_groups.setdefault((plane_type_id, member.seniority), []).append(entry)
+                self.cabin_groups.setdefault((plane_type_id, "any"), []).append(entry)
+            self.timeline(entry[0])
+
+    def timeline(self, key: CrewKey) -> _Timeline:
+        timeline = self.timelines.get(key)
+        if timeline is None:
+            timeline = self.timelines[key] = _Timeline()
+        return timeline
+
+    def eligible(self, flight: FlightSlot, kind: str, seniority: str) -> List[Tuple[CrewKey, float]]:
+        """(crew key, slack) pairs qualified for the position; slack measures how over-qualified they are."""
+        if kind == "pilot":
+            group = (flight.plane_type_id, seniority)
+            ranges = self.pilot_ranges.get(group, [])
+            first = bisect_left(ranges, flight.distance_km)
+            return [
+                (key, float(max_range - flight.distance_km))
+                for key, max_range in zip(self.pilot_keys[group][first:], ranges[first:])
+            ]
+        return self.cabin_groups.get((flight.plane_type_id, seniority), [])
+
+    def score(self, key: CrewKey, slack: float, flight: FlightSlot):
+        noise = self.rng.random() if self.noisy else 0.0
+        if self.objective == "fair":
+            return (self.duty.get(key, 0.0), slack, noise, key)
+        last_end = self.timeline(key).last_end_before(flight.start)
+        gap = flight.start - last_end if last_end is not None else float("inf")
+        # Reuse crew who are already working, best-fitting the idle gap
+        return (key not in self.duty, gap, slack, noise, key)
+
+    def book(self, flight: FlightSlot, key: CrewKey, kind: str, role: str) -> None:
+        self.timeline(key).add(flight.start, flight.end, flight.id)
+        self.duty[key] = self.duty.get(key, 0.0) + (flight.end - flight.start) / 60.0
+        self.crew.setdefault(flight.id, []).append((key, kind, role))
+
+    def unbook(self, flight: FlightSlot, key: CrewKey) -> Tuple[str, str]:
+        self.timeline(key).remove(flight.id)
+        self.duty[key] -= (flight.end - flight.start) / 60.0
+        if self.duty[key] <= 0:
+            del self.duty[key]
+        entries = self.crew[flight.id]
+        for i, (booked, kind, role) in enumerate(entries):
+            if booked == key:
+                del entries[i]
+                return kind, role
+        raise KeyError(key)
+
+    def staff(self, flight: FlightSlot) -> Optional[str]:
+        slots = _slots(flight)
+        if slots is None:
+            return (f"Cabin crew limits cannot be met (min {flight.min_cabin_crew}, "
+                    f"max {flight.max_cabin_crew})")
+        on_board = set()
+        timelines = self.timelines
+        for kind, seniority, count in slots:
+            if count <= 0:
+                continue
+            candidates = [
+                (self.score(key, slack, flight), key)
+                for key, slack in self.eligible(flight, kind, seniority)
+                if key not in on_board and timelines[key].is_free(flight.start, flight.end)
+            ]
+            picks = [key for _, key in heapq.nsmallest(count, candidates)]
+            while len(picks) < count:
+                key = self.repair(flight, kind, seniority, on_board | set(picks))
+                if key is None:
+                    return f"Not enough {seniority} {kind} crew available"
+                picks.append(key)
+            for key in picks:
+                self.book(flight, key, kind, seniority)
+                on_board.add(key)
+        return None
+
+    def repair(self, flight: FlightSlot, kind: str, seniority: str, exclude) -> Optional[CrewKey]:
+        """
+        Free a qualified crew member whose only conflict is one planned
+        flight by handing that flight's position to someone else.
+        """
+        for key, _ in self.eligible(flight, kind, seniority):
+            if key in exclude:
+                continue
+            conflicts = self.timeline(key).conflicts(flight.start, flight.end)
+            if len(conflicts) != 1 or conflicts[0] is None:
+                continue
+            other = self.flights[conflicts[0]]
+            role = next(r for k, _, r in self.crew[other.id] if k == key)
+            crew_on_other = {k for k, _, _ in self.crew[other.id]}
+            for substitute, _ in self.eligible(other, kind, role):
+                if substitute in crew_on_other or substitute in exclude or substitute == key:
+                    continue
+                if not self.timeline(substitute).is_free(other.start, other.end):
+                    continue
+                self.unbook(other, key)
+                self.book(other, substitute, kind, role)
+                return key
+        return None
+
+    def rollback(self, flight: FlightSlot) -> None:
+        for key, _, _ in list(self.crew.get(flight.id, [])):
+            self.unbook(flight, key)
+        self.crew.pop(flight.id, None)
+
+    def solve(self, order: List[FlightSlot], deadline: Optional[float] = None) -> bool:
+        """Staff flights in order; False if `deadline` (monotonic) passed before finishing."""
+        for i, flight in enumerate(order):
+            if deadline is not None and i % 64 == 0 and time.monotonic() >= deadline:
+                return False
+            reason = self.staff(flight)
+            if reason:
+                self.rollback(flight)
+                self.unassigned[flight.id] = reason
+        return True
+
+    def cost(self) -> Tuple:
+        used = len(self.duty)
+        busiest = max(self.duty.values(), default=0.0)
+        if self.objective == "fair":
+            return (len(self.unassigned), busiest, used)
+        return (len(self.unassigned), used, busiest)
+
+    def result(self) -> Dict:
+        assignments = {}
+        for flight_id, entries in self.crew.items():
+            assignments[flight_id] = {
+                "pilot_ids": [key[1] for key, kind, _ in entries if kind == "pilot"],
+                "cabin_crew_ids": [key[1] for key, kind, _ in entries if kind == "cabin"],
+            }
+        return {
+            "assignments": assignments,
+            "unassigned": dict(self.unassigned),
+            "crew_used": len(self.duty),
+            "max_duty_minutes": round(max(self.duty.values(), default=0.0), 1),
+            "cost": list(self.cost()),
+        }
+
+
+def _solve_once(problem: CrewProblem, objective: str, seed: int, deadline: Optional[float] = None) -> Optional["_Plan"]:
+    plan = _Plan(problem, objective, seed)
+    order = sorted(problem.flights, key=lambda f: (f.start, f.id))
+    if seed:
+        # Perturb the order among flights that depart close together
+        rng = random.Random(seed)
+        order.sort(key=lambda f: (f.start + rng.uniform(0, 1800), f.id))
+    return plan if plan.solve(order, deadline) else None
+
+
+# Restarts without improvement after which a search gives up early
+STALL_LIMIT = 25
+
+
+def _search(problem: CrewProblem, objective: str, first_seed: int, seed_step: int, time_budget: float) -> Dict:
+    deadline = time.monotonic() + time_budget
+    best = None
+    seed = first_seed
+    restarts = 0
+    stalled = 0
+    while True:
+        # The first pass always runs to completion so there is a plan to return
+        plan = _solve_once(problem, objective, seed, deadline if best is not None else None)
+        if plan is None:
+            break
+        restarts += 1
+        if best is None or plan.cost() < best.cost():
+            best = plan
+            stalled = 0
+        else:
+            stalled += 1
+        seed += seed_step
+        if stalled >= STALL_LIMIT or time.monotonic() >= deadline:
+            break
+    result = best.result()
+    result["restarts"] = restarts
+    return result
+
+
+def optimize(problem: CrewProblem, objective: str = "min_crew", time_budget: float = 10.0,
+             workers: Optional[int] = None) -> Dict:
+    """
+    Assign crew to every flight of a horizon as one problem.
+
+    Flights are staffed in departure order, picking for each position the
+    qualified, free crew member that best serves the objective
+    ('min_crew' reuses working crew and fills idle gaps tightly, 'fair'
+    spreads duty minutes), with a one-step swap repair when a position
+    cannot be filled. Randomised restarts run on `workers` local processes
+    until `time_budget` seconds have passed or restarts stop improving;
+    the best plan (fewest unstaffed flights, then objective) wins.
+
+    Returns:
+        Dict with per-flight ``assignments`` (pilot_ids/cabin_crew_ids),
+        ``unassigned`` reasons, ``crew_used``, ``max_duty_minutes``,
+        ``cost`` and the number of ``restarts``.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {', '.join(OBJECTIVES)}")
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(problem.flights) < 2:
+        return _search(problem, objective, 0, 1, time_budget)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_search, problem, objective, worker, workers, time_budget)
+            for worker in range(workers)
+        ]
+        results = [future.result() for future in futures]
+    best = min(results, key=lambda r: r["cost"])
+    best["restarts"] = sum(r["restarts"] for r in results)
+    return best
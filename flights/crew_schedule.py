@@ -0,0 +1,152 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .duty_rules import DutyLimits, duty_violations
+from .models import RosterCrewAssignment
+
+CrewKey = Tuple[str, int]
+
+
+def pilot_key(pilot_id: int) -> CrewKey:
+    return ("pilot", pilot_id)
+
+
+def cabin_key(cabin_crew_id: int) -> CrewKey:
+    return ("cabin", cabin_crew_id)
+
+
+class CrewSchedule:
+    """
+    Interval index of crew duty periods.
+
+    For every crew member the busy periods are kept as sorted, disjoint
+    (merged) intervals, so checking whether someone is free for a flight
+    is a bisect over their own timeline and booking a flight inserts
+    into it. Keys are ("pilot", id) or ("cabin", id).
+
+    With `limits` the schedule also enforces flight duty limits (see
+    duty_rules): a running total of duty per timeline makes the duty
+    inside any window a pair of bisects, so can_fly() is cheap enough to
+    run on every candidate.
+    """
+
+    def __init__(self, limits: Optional[DutyLimits] = None):
+        self.limits = limits
+        self._starts: Dict[CrewKey, List[datetime]] = {}
+        self._ends: Dict[CrewKey, List[datetime]] = {}
+        # _duty[key][i] is the duty before the i-th interval; one longer than the timeline
+        self._duty: Dict[CrewKey, List[timedelta]] = {}
+
+    @classmethod
+    def load(cls, start: Optional[datetime], end: Optional[datetime], exclude_flight_ids: Iterable[int] = (),
+             limits: Optional[DutyLimits] = None) -> "CrewSchedule":
+        """
+        Build the index from the latest roster of every flight overlapping
+        [start, end], in one query.
+
+        With `limits`, flights up to the limits' horizon either side are
+        loaded too, since they count towards the duty checks. Flights in
+        `exclude_flight_ids` are left out because they are about to be
+        re-rostered; cancelled flights never block anyone.
+        """
+        schedule = cls(limits)
+        if start is None or end is None:
+            return schedule
+        if limits is not None:
+            start, end = start - limits.horizon, end + limits.horizon
+        rows = RosterCrewAssignment.objects.filter(
+            roster__flight__departure_time__lt=end,
+            roster__flight__arrival_time__gt=start,
+        ).exclude(
+            roster__flight_id__in=list(exclude_flight_ids),
+        ).exclude(
+            roster__flight__status="Cancelled",
+        ).values_list(
+            "roster_id",
+            "roster__flight_id",
+            "pilot_id",
+            "cabin_crew_id",
+            "roster__flight__departure_time",
+            "roster__flight__arrival_time",
+        )
+        rows = list(rows)
+        # Regenerating a roster leaves the old one behind; only the newest counts
+        latest: Dict[int, int] = {}
+        for roster_id, flight_id, *_ in rows:
+            if roster_id > latest.get(flight_id, 0):
+                latest[flight_id] = roster_id
+        for roster_id, flight_id, pilot_id, cabin_crew_id, departure, arrival in rows:
+            if latest[flight_id] != roster_id:
+                continue
+            if pilot_id:
+                schedule.book(pilot_key(pilot_id), departure, arrival)
+            if cabin_crew_id:
+                schedule.book(cabin_key(cabin_crew_id), departure, arrival)
+        return schedule
+
+    def is_free(self, key: CrewKey, start: Optional[datetime], end: Optional[datetime]) -> bool:
+        """True if the crew member has no duty overlapping [start, end)."""
+        if start is None or end is None:
+            return True
+        starts = self._starts.get(key)
+        if not starts:
+            return True
+        # Last interval starting before `end`; intervals are disjoint, so it
+        # is the only one that can reach past `start`.
+        i = bisect_left(starts, end) - 1
+        return i < 0 or self._ends[key][i] <= start
+
+    def book(self, key: CrewKey, start: Optional[datetime], end: Optional[datetime]) -> None:
+        """Add a duty period, merging it with any it overlaps."""
+        if start is None or end is None:
+            return
+        starts = self._starts.setdefault(key, [])
+        ends = self._ends.setdefault(key, [])
+        lo = bisect_left(ends, start)
+        hi = bisect_right(starts, end)
+        if lo < hi:
+            start = min(start, starts[lo])
+            end = max(end, ends[hi - 1])
+        starts[lo:hi] = [start]
+        ends[lo:hi] = [end]
+        duty = self._duty.setdefault(key, [timedelta(0)])
+        duty[lo:] = accumulate((e - s for s, e in zip(starts[lo:], ends[lo:])), initial=duty[lo])
+
+    def can_fly(self, key: CrewKey, start: Optional[datetime], end: Optional[datetime]) -> bool:
+        """True if the crew member is free for [start, end) and it keeps them within their duty limits."""
+        return self.is_free(key, start, end) and not self.duty_violations(key, start, end)
+
+    def duty_violations(self, key: CrewKey, start: Optional[datetime], end: Optional[datetime]) -> List[str]:
+        """Duty limits booking [start, end) would break (none without limits)."""
+        if self.limits is None:
+            return []
+        return duty_violations(self, key, start, end, self.limits)
+
+    def duty_between(self, key: CrewKey, start: datetime, end: datetime) -> timedelta:
+        """Total duty of the crew member inside [start, end)."""
+        starts = self._starts.get(key)
+        if not starts or end <= start:
+            return timedelta(0)
+        ends = self._ends[key]
+        first = bisect_right(ends, start)
+        last = bisect_left(starts, end)
+        if first >= last:
+            return timedelta(0)
+        duty = self._duty[key]
+        return (
+            duty[last] - duty[first]
+            - max(start - starts[first], timedelta(0))
+            - max(ends[last - 1] - end, timedelta(0))
+        )
+
+    def timeline(self, key: CrewKey) -> Tuple[List[datetime], List[datetime]]:
+        """The crew member's merged duty intervals as sorted start and end lists (not copies)."""
+        return self._starts.get(key, []), self._ends.get(key, [])
+
+    def duty_periods(self, key: CrewKey) -> List[Tuple[datetime, datetime]]:
+        return list(zip(self._starts.get(key, []), self._ends.get(key, [])))
+
+    def crew_keys(self) -> List[CrewKey]:
+        return [key for key, starts in self._starts.items() if starts]
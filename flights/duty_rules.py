@@ -0,0 +1,119 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+
+
+class DutyLimits(NamedTuple):
+    """
+    Flight duty limits for a crew member.
+
+    Duty is counted as scheduled block time (departure to arrival).
+    Flights separated by less than `min_rest` belong to the same duty
+    period, which may last at most `max_duty_period` from the first
+    departure to the last arrival; the rolling limits cap the duty in any
+    24 hours, 7 days and 28 days.
+    """
+    max_duty_24h: timedelta = timedelta(hours=13)
+    max_duty_7d: timedelta = timedelta(hours=60)
+    max_duty_28d: timedelta = timedelta(hours=190)
+    min_rest: timedelta = timedelta(hours=10)
+    max_duty_period: timedelta = timedelta(hours=13)
+
+    def windows(self) -> List[Tuple[timedelta, timedelta, str]]:
+        """(window, most duty allowed in it, label) for every rolling limit."""
+        return [
+            (timedelta(hours=24), self.max_duty_24h, "24 hours"),
+            (timedelta(days=7), self.max_duty_7d, "7 days"),
+            (timedelta(days=28), self.max_duty_28d, "28 days"),
+        ]
+
+    @property
+    def horizon(self) -> timedelta:
+        """How far either side of a flight other duty can affect its checks."""
+        return max([window for window, _, _ in self.windows()] + [self.min_rest + self.max_duty_period])
+
+
+def get_duty_limits() -> Optional[DutyLimits]:
+    """
+    Limits from settings.CREW_DUTY_LIMITS (hours per DutyLimits field).
+
+    Fields left out keep their defaults; CREW_DUTY_LIMITS = None turns
+    the duty checks off.
+    """
+    hours = getattr(settings, "CREW_DUTY_LIMITS", {})
+    if hours is None:
+        return None
+    return DutyLimits(**{field: timedelta(hours=value) for field, value in hours.items()})
+
+
+def _hours(duration: timedelta) -> str:
+    return f"{round(duration.total_seconds() / 3600, 1):g}h"
+
+
+def _clip(start: datetime, end: datetime, lo: datetime, hi: datetime) -> timedelta:
+    return max(min(end, hi) - max(start, lo), timedelta(0))
+
+
+def duty_violations(schedule, key, start: Optional[datetime], end: Optional[datetime],
+                    limits: DutyLimits) -> List[str]:
+    """
+    Every duty limit that booking [start, end) would break for the crew member.
+
+    Only windows and duty periods that contain the proposed flight and
+    some other rostered duty are checked, so a lone flight longer than a limit
+    (an augmented crew operation) is never rejected and duty that was
+    already over a limit elsewhere is not blamed on this flight. Each
+    rolling limit is evaluated at the window positions where the duty
+    inside can peak: starting at a duty start or ending at a duty end.
+
+    Returns:
+        Reasons such as "would have 62h of duty in 7 days (limit 60h)",
+        to be prefixed with who the crew member is
+    """
+    if start is None or end is None or end <= start:
+        return []
+    starts, ends = schedule.timeline(key)
+    if not starts:
+        return []
+    violations = []
+
+    def duty_in(lo: datetime, hi: datetime) -> Tuple[timedelta, timedelta]:
+        existing = schedule.duty_between(key, lo, hi)
+        overlap = schedule.duty_between(key, max(lo, start), min(hi, end))
+        return existing, existing + _clip(start, end, lo, hi) - overlap
+
+    for window, limit, label in limits.windows():
+        # Windows [lo, lo + window) overlapping the flight: lo in (start - window, end)
+        first, last = start - window, end
+        candidates = {start, end - window}
+        candidates.update(starts[bisect_right(starts, first):bisect_left(starts, last)])
+        candidates.update(e - window for e in ends[bisect_right(ends, start):bisect_left(ends, end + window)])
+        worst = timedelta(0)
+        for lo in candidates:
+            if first < lo < last:
+                existing, total = duty_in(lo, lo + window)
+                if existing and total > worst:
+                    worst = total
+        if worst > limit:
+            violations.append(f"would have {_hours(worst)} of duty in {label} (limit {_hours(limit)})")
+
+    # The duty period holding the flight: neighbours closer than min_rest join it
+    period_start, period_end = start, end
+    i = bisect_left(starts, start)
+    k = i - 1
+    while k >= 0 and period_start - ends[k] < limits.min_rest:
+        period_start = min(period_start, starts[k])
+        period_end = max(period_end, ends[k])
+        k -= 1
+    k = i
+    while k < len(starts) and starts[k] - period_end < limits.min_rest:
+        period_end = max(period_end, ends[k])
+        k += 1
+    if (period_start, period_end) != (start, end) and period_end - period_start > limits.max_duty_period:
+        violations.append(
+            f"would be on duty for {_hours(period_end - period_start)} without {_hours(limits.min_rest)} rest "
+            f"(limit {_hours(limits.max_duty_period)})"
+        )
+    return violations
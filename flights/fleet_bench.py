@@ -0,0 +1,409 @@
+from datetime import datetime, time, timedelta
+from statistics import mean, median
+from time import perf_counter
+from typing import Dict, List, NamedTuple, Optional
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from faker import Faker
+import platform
+import random
+import resource
+import subprocess
+import tracemalloc
+
+import django
+
+from .crew_index import invalidate_pilot_index, invalidate_qualification_index
+from .models import CabinCrew, Flight, FlightTicket, Passenger, Pilot, PlaneType
+from .roster_engine import generate_roster, generate_rosters
+from .seat_map import invalidate_seat_map
+from .seat_occupancy import invalidate_occupancy
+
+# Version of the results document; bump when its layout changes
+RESULTS_VERSION = 1
+BULK_BATCH_SIZE = 2000
+# Share of each cabin that is sold, so seating never runs out of seats
+MAX_LOAD_FACTOR = 0.95
+
+
+class FleetScale(NamedTuple):
+    flights: int
+    tickets: int
+    pilots: int
+    cabin_crew: int
+    # Days the flights' departures are spread over
+    days: int = 30
+    # Share of ticketed passengers travelling with an affiliated companion
+    affinity: float = 0.05
+
+
+SCALES = {
+    "smoke": FleetScale(flights=50, tickets=2_000, pilots=60, cabin_crew=120, days=7),
+    "small": FleetScale(flights=500, tickets=40_000, pilots=300, cabin_crew=600),
+    "fleet": FleetScale(flights=5_000, tickets=500_000, pilots=800, cabin_crew=1_200),
+}
+
+
+def _seed_reference_data():
+    """Airports, menus and plane types, exactly as seed_demo creates them."""
+    from .management.commands.seed_demo import Command as SeedDemo
+
+    seed = SeedDemo()
+    airports = seed._ensure_airports()
+    plane_types = seed._ensure_planes(seed._ensure_menus())
+    return airports, plane_types
+
+
+def _seat_counts(plane: PlaneType) -> int:
+    layout = plane.seat_layout or {}
+    return len(layout.get("business", [])) + len(layout.get("economy", [])) or (plane.business_seats + plane.economy_seats)
+
+
+def build_fleet(scale: FleetScale, seed: int = 2024) -> Dict:
+    """
+    Create a synthetic fleet of `scale` in the current database.
+
+    Reference data comes from seed_demo; crew, flights, passengers and
+    tickets follow seed_demo's distributions but are bulk inserted and
+    drawn from a generator seeded with `seed`, so the same scale and seed
+    always produce the same fleet. Returns the row counts created and the
+    build time.
+    """
+    start = perf_counter()
+    rng = random.Random(seed)
+    faker = Faker()
+    faker.seed_instance(seed)
+    airports, plane_types = _seed_reference_data()
+
+    with transaction.atomic():
+        pilots = [
+            Pilot(
+                code=f"BP{i:05d}",
+                first_name=faker.first_name(),
+                last_name=faker.last_name(),
+                age=rng.randint(28, 58),
+                gender=rng.choice(["M", "F"]),
+                nationality=faker.country_code(),
+                known_languages=["EN"],
+                # Every plane type gets its share before the rest is random
+                vehicle_restriction=plane_types[i % len(plane_types)] if i < 4 * len(plane_types) else rng.choice(plane_types),
+                max_range_km=rng.randint(1500, 8000),
+                seniority=rng.choices(["senior", "junior", "trainee"], weights=[0.4, 0.4, 0.2])[0],
+            )
+            for i in range(scale.pilots)
+        ]
+        Pilot.objects.bulk_create(pilots, batch_size=BULK_BATCH_SIZE)
+
+        role_choices = ["chief", "regular", "regular", "regular", "chef"]
+        cabin_crew = []
+        for i in range(scale.cabin_crew):
+            role = rng.choice(role_choices)
+            cabin_crew.append(CabinCrew(
+                code=f"BC{i:05d}",
+                first_name=faker.first_name(),
+                last_name=faker.last_name(),
+                age=rng.randint(22, 55),
+                gender=rng.choice(["M", "F"]),
+                nationality=faker.country_code(),
+                known_languages=["EN"],
+                role=role,
+                seniority="senior" if role == "chief" else rng.choice(["junior", "senior"]),
+            ))
+        cabin_crew = CabinCrew.objects.bulk_create(cabin_crew, batch_size=BULK_BATCH_SIZE)
+        through = CabinCrew.vehicle_restrictions.through
+        through.objects.bulk_create(
+            [
+                through(cabincrew_id=member.id, planetype_id=plane.id)
+                for member in cabin_crew
+                for plane in rng.sample(plane_types, k=rng.randint(1, len(plane_types)))
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+        base = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=1), time.min))
+        flights = []
+        for i in range(scale.flights):
+            origin, destination = rng.sample(airports, 2)
+            duration = rng.choice([70, 95, 120, 140, 160, 180, 220, 260, 300, 360])
+            departure = base + timedelta(days=rng.randrange(max(scale.days, 1)), minutes=rng.randint(5 * 60, 22 * 60))
+            flights.append(Flight(
+                flight_number=f"{Flight.COMPANY_PREFIX}{i:04d}",
+                origin_airport=origin,
+                destination_airport=destination,
+                departure_time=departure,
+                departure_date=Flight.departure_day(departure),
+                arrival_time=departure + timedelta(minutes=duration),
+                duration_minutes=duration,
+                distance_km=rng.randint(600, 4500),
+                plane_type=rng.choice(plane_types),
+                status="Scheduled",
+            ))
+        flights = Flight.objects.bulk_create(flights, batch_size=BULK_BATCH_SIZE)
+
+        # Tickets per flight in proportion to its cabin, never overbooked
+        capacity = [int(_seat_counts(f.plane_type) * MAX_LOAD_FACTOR) for f in flights]
+        share = min(1.0, scale.tickets / max(sum(capacity), 1))
+        per_flight = [int(c * share) for c in capacity]
+        passenger_count = max(max(per_flight, default=0), scale.tickets // 4, 1)
+
+        today = timezone.localdate()
+        passengers = []
+        for i in range(passenger_count):
+            age = rng.randint(3, 78)
+            passengers.append(Passenger(
+                first_name=faker.first_name(),
+                last_name=faker.last_name(),
+                email=f"bench.{i}@benchair.test",
+                phone="555-0100",
+                passport_number=f"BN{i:08d}",
+                nationality=faker.country_code(),
+                date_of_birth=today.replace(year=today.year - age, day=1),
+                age=age,
+                gender=rng.choice(["M", "F"]),
+                seat_type=rng.choice(["economy"] * 4 + ["business"]),
+            ))
+        passengers = Passenger.objects.bulk_create(passengers, batch_size=BULK_BATCH_SIZE)
+
+        tickets, affiliations, affiliated = [], [], set()
+        ticket_count = 0
+        for flight, count in zip(flights, per_flight):
+            booked = rng.sample(range(passenger_count), count)
+            for position in booked:
+                passenger = passengers[position]
+                tickets.append(FlightTicket(
+                    ticket_number=f"BT{ticket_count:08d}",
+                    flight=flight,
+                    passenger=passenger,
+                    ticket_class="Business" if passenger.seat_type == "business" else "Economy",
+                    price="180.00",
+                    status="Booked",
+                ))
+                ticket_count += 1
+            for first, second in zip(booked[::2], booked[1::2]):
+                if rng.random() < scale.affinity and first not in affiliated and second not in affiliated:
+                    affiliated.update((first, second))
+                    affiliations.append((passengers[first].id, passengers[second].id))
+            if len(tickets) >= BULK_BATCH_SIZE * 10:
+                # Keep at most a few batches of unsaved tickets in memory
+                FlightTicket.objects.bulk_create(tickets, batch_size=BULK_BATCH_SIZE)
+                tickets = []
+        FlightTicket.objects.bulk_create(tickets, batch_size=BULK_BATCH_SIZE)
+        links = Passenger.affiliated_passengers.through
+        links.objects.bulk_create(
+            [links(from_passenger_id=a, to_passenger_id=b) for a, b in affiliations],
+            batch_size=BULK_BATCH_SIZE,
+        )
+    # bulk_create sends no signals, so drop the caches they would have dropped
+    invalidate_qualification_index()
+    invalidate_pilot_index()
+    invalidate_seat_map()
+    invalidate_occupancy()
+
+    return {
+        "seconds": round(perf_counter() - start, 3),
+        "flights": len(flights),
+        "tickets": ticket_count,
+        "passengers": passenger_count,
+        "pilots": scale.pilots,
+        "cabin_crew": scale.cabin_crew,
+        "affinity_pairs": len(affiliations),
+    }
+
+
+def _summary(values: List[float]) -> Dict:
+    if not values:
+        return {"count": 0, "mean": None, "p50": None, "p95": None, "total": 0.0}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": round(mean(ordered), 3),
+        "p50": round(median(ordered), 3),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "total": round(sum(ordered), 3),
+    }
+
+
+def _sample_flight_ids(sample: int) -> List[int]:
+    """`sample` flights spread evenly over the schedule, the same ones on every run of a fleet."""
+    flight_ids = list(Flight.objects.order_by("departure_time", "id").values_list("id", flat=True))
+    if len(flight_ids) <= sample:
+        return flight_ids
+    step = len(flight_ids) / sample
+    return [flight_ids[int(i * step)] for i in range(sample)]
+
+
+def bench_single(sample: int, backend: str = "sql") -> Dict:
+    """generate_roster() on sampled flights: per-stage and total milliseconds, queries per flight."""
+    stages: Dict[str, List[float]] = {}
+    totals, queries, failures = [], [], []
+    for flight_id in _sample_flight_ids(sample):
+        with CaptureQueriesContext(connection) as ctx:
+            start = perf_counter()
+            try:
+                roster = generate_roster(flight_id, backend=backend)
+            except ValueError as exc:
+                failures.append({"flight_id": flight_id, "error": str(exc)})
+                continue
+            totals.append((perf_counter() - start) * 1000)
+        queries.append(len(ctx.captured_queries))
+        for stage, ms in roster.stage_timings.items():
+            stages.setdefault(stage, []).append(ms)
+    return {
+        "flights": len(totals),
+        "failed": len(failures),
+        "errors": failures[:10],
+        "total_ms": _summary(totals),
+        "stages_ms": {stage: _summary(values) for stage, values in stages.items()},
+        "queries": _summary(queries),
+    }
+
+
+def bench_batch(days: int, backend: str = "sql") -> Dict:
+    """generate_rosters() over the first `days` days of the schedule."""
+    first = Flight.objects.order_by("departure_time").values_list("departure_time", flat=True).first()
+    if first is None:
+        return {"flights": 0}
+    date_from = timezone.localtime(first).date()
+    date_to = date_from + timedelta(days=max(days, 1) - 1)
+    with CaptureQueriesContext(connection) as ctx:
+        start = perf_counter()
+        report = generate_rosters(date_from=date_from, date_to=date_to, backend=backend)
+        seconds = perf_counter() - start
+    flights = len(report["results"])
+    return {
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "flights": flights,
+        "succeeded": report["succeeded"],
+        "failed": report["failed"],
+        "seconds": round(seconds, 3),
+        "flights_per_second": round(flights / seconds, 2) if seconds else None,
+        "queries": len(ctx.captured_queries),
+        "stages_ms": report["timings"],
+    }
+
+
+def _measured(fn, trace_memory: bool, *args) -> Dict:
+    """Run a benchmark phase, adding its peak of traced Python allocations when asked."""
+    if not trace_memory:
+        return fn(*args)
+    tracemalloc.start()
+    try:
+        result = fn(*args)
+        result["peak_traced_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, timeout=10,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(scale: FleetScale, seed: int = 2024, sample: int = 50, batch_days: int = 1,
+                  backend: str = "sql", trace_memory: bool = False) -> Dict:
+    """
+    Build a fleet in the current database and benchmark the roster engine on it.
+
+    Query counting needs the connection to record queries, which it does
+    here regardless of DEBUG. With `trace_memory` each phase also reports
+    its peak of Python allocations (tracemalloc slows the timed code, so
+    only compare traced runs with traced runs).
+    """
+    force_debug = connection.force_debug_cursor
+    connection.force_debug_cursor = True
+    try:
+        build = build_fleet(scale, seed)
+        single = _measured(bench_single, trace_memory, sample, backend)
+        batch = _measured(bench_batch, trace_memory, batch_days, backend)
+    finally:
+        connection.force_debug_cursor = force_debug
+    return {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "seed": seed,
+            "sample": sample,
+            "batch_days": batch_days,
+            "backend": backend,
+            "trace_memory": trace_memory,
+        },
+        "scale": scale._asdict(),
+        "build": build,
+        "single": single,
+        "batch": batch,
+        # Linux reports ru_maxrss in KiB
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+# Growth below these is timer noise, however large it is relative to a
+# small baseline; query counts are exact, so any growth counts
+NOISE_FLOOR_MS = 5.0
+NOISE_FLOOR_SECONDS = 0.5
+
+# Metrics compared between runs: (label, path into the results document, noise floor)
+COMPARED_METRICS = [
+    ("single total p50 ms", ("single", "total_ms", "p50"), NOISE_FLOOR_MS),
+    ("single total p95 ms", ("single", "total_ms", "p95"), NOISE_FLOOR_MS),
+    ("single queries mean", ("single", "queries", "mean"), 0.0),
+    ("batch seconds", ("batch", "seconds"), NOISE_FLOOR_SECONDS),
+    ("batch queries", ("batch", "queries"), 0.0),
+]
+
+
+def _lookup(results: Dict, path) -> Optional[float]:
+    value = results
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare_results(current: Dict, baseline: Dict, max_regression: float) -> List[Dict]:
+    """
+    Per-metric change against a baseline run, including every stage's p50.
+
+    A metric regresses when it grew by more than `max_regression` percent
+    and by more than its noise floor, so sub-millisecond stages do not
+    fail a comparison of a run against itself. Runs are only comparable
+    when they share scale, seed, sample sizes, backend and memory tracing.
+
+    Raises:
+        ValueError: If the runs are not comparable
+    """
+    if current.get("scale") != baseline.get("scale"):
+        raise ValueError(f"Runs differ in scale: {baseline.get('scale')} vs {current.get('scale')}")
+    for key in ("seed", "sample", "batch_days", "backend", "trace_memory"):
+        if current["meta"].get(key) != baseline.get("meta", {}).get(key):
+            raise ValueError(f"Runs differ in {key}: {baseline.get('meta', {}).get(key)} vs {current['meta'].get(key)}")
+
+    metrics = list(COMPARED_METRICS) + [
+        (f"stage {stage} p50 ms", ("single", "stages_ms", stage, "p50"), NOISE_FLOOR_MS)
+        for stage in sorted(current["single"].get("stages_ms", {}))
+    ]
+    rows = []
+    for label, path, noise_floor in metrics:
+        before, after = _lookup(baseline, path), _lookup(current, path)
+        if before is None or after is None:
+            continue
+        change = ((after - before) / before * 100) if before else 0.0
+        rows.append({
+            "metric": label,
+            "baseline": before,
+            "current": after,
+            "change_pct": round(change, 1),
+            "regressed": change > max_regression and after - before > noise_floor,
+        })
+    return rows
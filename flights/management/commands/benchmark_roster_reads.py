@@ -0,0 +1,68 @@
+from statistics import mean, median
+from time import perf_counter
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from flights.api_views import RosterViewSet
+from flights.models import Flight
+from flights.roster_engine import generate_roster
+from flights.serializers import RosterSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare full-roster read latency of the sql and nosql backends for one flight"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flight', dest='flight_id', type=int, required=True, help='Flight id to roster')
+        parser.add_argument('--iterations', type=int, default=50, help='Reads per backend')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+        try:
+            Flight.objects.get(id=options['flight_id'])
+        except Flight.DoesNotExist:
+            raise CommandError(f"Flight {options['flight_id']} not found")
+
+        results = {}
+        for backend in ('sql', 'nosql'):
+            try:
+                roster = generate_roster(options['flight_id'], backend=backend)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            try:
+                results[backend] = self._measure(roster.id, options['iterations'])
+            finally:
+                # Benchmark rosters are not kept; this also removes the nosql document
+                roster.delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for backend, stats in results.items():
+            self.stdout.write(
+                f"{backend:>5}: mean {stats['mean_ms']:.2f} ms, p50 {stats['p50_ms']:.2f} ms, "
+                f"p95 {stats['p95_ms']:.2f} ms, {stats['queries']} queries, {stats['passengers']} passengers"
+            )
+
+    def _measure(self, roster_id, iterations):
+        """Read the roster the way GET /api/rosters/<id>/ does, `iterations` times."""
+        durations = []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as queries:
+                start = perf_counter()
+                data = RosterSerializer(RosterViewSet.queryset.get(id=roster_id)).data
+                durations.append((perf_counter() - start) * 1000)
+        durations.sort()
+        return {
+            'iterations': iterations,
+            'mean_ms': round(mean(durations), 3),
+            'p50_ms': round(median(durations), 3),
+            'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 3),
+            'queries': len(queries.captured_queries),
+            'passengers': len(data['passenger_assignments']),
+        }
@@ -0,0 +1,105 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from flights.fleet_bench import SCALES, compare_results, run_benchmark
+
+
+class Command(BaseCommand):
+    help = "Benchmark roster generation on a synthetic fleet built in a throwaway database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', default='smoke', choices=list(SCALES),
+                            help='Fleet size preset (fleet = 5k flights, 500k tickets, 2k crew)')
+        parser.add_argument('--flights', type=int, help='Override the preset number of flights')
+        parser.add_argument('--tickets', type=int, help='Override the preset number of tickets')
+        parser.add_argument('--pilots', type=int, help='Override the preset number of pilots')
+        parser.add_argument('--cabin-crew', type=int, help='Override the preset number of cabin crew')
+        parser.add_argument('--days', type=int, help='Days the departures are spread over')
+        parser.add_argument('--seed', type=int, default=2024, help='Seed for the synthetic fleet')
+        parser.add_argument('--sample', type=int, default=50, help='Flights rostered one by one with generate_roster')
+        parser.add_argument('--batch-days', type=int, default=1, help='Days of departures rostered with generate_rosters')
+        parser.add_argument('--backend', default='sql', choices=['sql', 'nosql'])
+        parser.add_argument('--trace-memory', action='store_true',
+                            help='Record the peak of Python allocations per phase (slows the run)')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--compare', help='Baseline results JSON to compare against')
+        parser.add_argument('--max-regression', type=float, default=25.0,
+                            help='Fail when a compared metric grew by more than this many percent (and more than its noise floor)')
+
+    def handle(self, *args, **options):
+        overrides = {
+            field: options[field] for field in ('flights', 'tickets', 'pilots', 'cabin_crew', 'days')
+            if options[field] is not None
+        }
+        scale = SCALES[options['scale']]._replace(**overrides)
+        if scale.flights > 10000:
+            raise CommandError('At most 10000 flights fit the AANNNN flight number format')
+        baseline = self._load(options['compare']) if options['compare'] else None
+
+        self.stdout.write(f"Benchmarking on {scale}")
+        # Never touch the configured database: build the fleet in a test database
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with TemporaryDirectory() as tmp, override_settings(ROSTER_DOCUMENT_STORE=Path(tmp) / 'rosters.sqlite3'):
+                results = run_benchmark(
+                    scale,
+                    seed=options['seed'],
+                    sample=options['sample'],
+                    batch_days=options['batch_days'],
+                    backend=options['backend'],
+                    trace_memory=options['trace_memory'],
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self._report(results)
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2))
+            self.stdout.write(f"Results written to {options['output']}")
+        if baseline is not None:
+            self._compare(results, baseline, options['max_regression'])
+
+    def _load(self, path):
+        try:
+            return json.loads(Path(path).read_text())
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Cannot read baseline {path}: {exc}")
+
+    def _report(self, results):
+        build, single, batch = results['build'], results['single'], results['batch']
+        self.stdout.write(
+            f"Fleet: {build['flights']} flights, {build['tickets']} tickets, {build['passengers']} passengers, "
+            f"{build['pilots']} pilots, {build['cabin_crew']} cabin crew (built in {build['seconds']}s)"
+        )
+        total = single['total_ms']
+        self.stdout.write(
+            f"generate_roster x{single['flights']} ({single['failed']} failed): "
+            f"p50 {total['p50']} ms, p95 {total['p95']} ms, {single['queries']['mean']} queries per flight"
+        )
+        for stage, summary in single['stages_ms'].items():
+            self.stdout.write(f"  {stage}: p50 {summary['p50']} ms, p95 {summary['p95']} ms")
+        if batch.get('flights'):
+            self.stdout.write(
+                f"generate_rosters {batch['date_from']}..{batch['date_to']}: {batch['flights']} flights "
+                f"({batch['failed']} failed) in {batch['seconds']}s, {batch['queries']} queries"
+            )
+        self.stdout.write(f"Peak RSS: {results['peak_rss_kb']} KiB")
+
+    def _compare(self, results, baseline, max_regression):
+        try:
+            rows = compare_results(results, baseline, max_regression)
+        except ValueError as exc:
+            raise CommandError(f"Baseline is not comparable: {exc}")
+        for row in rows:
+            line = f"{row['metric']}: {row['baseline']} -> {row['current']} ({row['change_pct']:+}%)"
+            self.stdout.write(self.style.ERROR(line) if row['regressed'] else line)
+        regressed = [row['metric'] for row in rows if row['regressed']]
+        if regressed:
+            raise CommandError(f"Regressed by more than {max_regression}%: {', '.join(regressed)}")
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from flights.models import Roster
+from flights.roster_engine import compact_roster_payload
+
+BATCH_SIZE = 200
+
+
+class Command(BaseCommand):
+    help = "Rewrite the payloads of rosters generated before the compact payload format"
+
+    def handle(self, *args, **options):
+        rewritten = skipped = 0
+        roster_ids = list(Roster.objects.order_by("id").values_list("id", flat=True))
+        for start in range(0, len(roster_ids), BATCH_SIZE):
+            batch = Roster.objects.select_related("flight__plane_type").in_bulk(roster_ids[start:start + BATCH_SIZE])
+            for roster in batch.values():
+                if compact_roster_payload(roster):
+                    rewritten += 1
+                else:
+                    skipped += 1
+        self.stdout.write(self.style.SUCCESS(f"Compacted {rewritten} roster payloads ({skipped} already compact or skipped)"))
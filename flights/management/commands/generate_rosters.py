@@ -0,0 +1,103 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from flights.crew_optimizer import OBJECTIVES
+from flights.roster_engine import generate_rosters, generate_rosters_parallel
+from flights.seat_map import SEATING_ENGINES
+
+
+class Command(BaseCommand):
+    help = "Generate rosters for a list of flights or every flight departing in a date range"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flight', dest='flight_ids', type=int, action='append', default=[],
+                            help='Flight id to roster (repeatable)')
+        parser.add_argument('--date-from', help='First departure date to roster (YYYY-MM-DD)')
+        parser.add_argument('--date-to', help='Last departure date to roster (YYYY-MM-DD, inclusive)')
+        parser.add_argument('--backend', default='sql', choices=['sql', 'nosql'])
+        parser.add_argument('--seating', default='python', choices=list(SEATING_ENGINES),
+                            help='Seat pool engine; numpy suits very large cabins and batches')
+        parser.add_argument('--timings', action='store_true', help='Print per-stage timings for each flight')
+        parser.add_argument('--optimize', action='store_true',
+                            help='Choose crew for all flights at once instead of flight by flight')
+        parser.add_argument('--objective', default='min_crew', choices=list(OBJECTIVES),
+                            help='Optimizer goal: fewest crew members or evenly spread duty')
+        parser.add_argument('--time-budget', type=float, default=10.0, help='Optimizer time budget in seconds')
+        parser.add_argument('--pairings', action='store_true',
+                            help='Keep one crew across chains of connecting flights')
+        parser.add_argument('--parallel', action='store_true',
+                            help='Seat and save flights on a pool of worker processes')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes for --optimize or --parallel (default: one per CPU)')
+
+    def handle(self, *args, **options):
+        date_from = self._parse(options['date_from'], '--date-from')
+        date_to = self._parse(options['date_to'], '--date-to')
+        if not options['flight_ids'] and not (date_from or date_to):
+            raise CommandError('Pass --flight or --date-from/--date-to')
+
+        if options['parallel'] and options['optimize']:
+            raise CommandError('--parallel and --optimize cannot be combined')
+        if options['pairings'] and (options['parallel'] or options['optimize']):
+            raise CommandError('--pairings cannot be combined with --parallel or --optimize')
+
+        if options['parallel']:
+            report = generate_rosters_parallel(
+                flight_ids=options['flight_ids'] or None,
+                date_from=date_from,
+                date_to=date_to,
+                backend=options['backend'],
+                workers=options['workers'],
+                seating=options['seating'],
+            )
+        else:
+            report = generate_rosters(
+                flight_ids=options['flight_ids'] or None,
+                date_from=date_from,
+                date_to=date_to,
+                backend=options['backend'],
+                optimize=options['optimize'],
+                objective=options['objective'],
+                time_budget=options['time_budget'],
+                workers=options['workers'],
+                seating=options['seating'],
+                pairings=options['pairings'],
+            )
+
+        for result in report['results']:
+            label = result['flight_number'] or f"#{result['flight_id']}"
+            if result['status'] == 'ok':
+                line = f"{label}: roster {result['roster_id']}"
+                if options['timings']:
+                    line += ' ' + self._format_timings(result['timings'])
+                self.stdout.write(line)
+            else:
+                self.stdout.write(self.style.WARNING(f"{label}: {result['error']}"))
+
+        if 'optimizer' in report:
+            opt = report['optimizer']
+            self.stdout.write(
+                f"Optimizer ({opt['objective']}): {opt['crew_used']} crew used, "
+                f"busiest {opt['max_duty_minutes']} duty minutes, {opt['restarts']} restarts"
+            )
+        if 'pairings' in report:
+            self.stdout.write(f"Built {len(report['pairings'])} multi-leg pairing(s)")
+        summary = f"Rostered {report['succeeded']} flight(s), {report['failed']} failed."
+        if options['timings']:
+            summary += ' Totals: ' + self._format_timings(report['timings'])
+        self.stdout.write(self.style.SUCCESS(summary) if not report['failed'] else self.style.WARNING(summary))
+
+    def _format_timings(self, timings):
+        return ', '.join(f'{stage}={elapsed:.1f}ms' for stage, elapsed in timings.items())
+
+    def _parse(self, value, flag):
+        if not value:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            # Well formed but not a calendar date, such as 2024-02-30
+            parsed = None
+        if parsed is None:
+            raise CommandError(f'Invalid date for {flag}: {value!r} (expected YYYY-MM-DD)')
+        return parsed
@@ -0,0 +1,44 @@
+from multiprocessing import Process
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from flights.roster_jobs import run_worker
+
+
+def _worker_main(once, poll_interval):
+    run_worker(once=once, poll_interval=poll_interval)
+
+
+class Command(BaseCommand):
+    help = "Run queued roster jobs (POST rosters/generate/ with async) in local worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes to run')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait between polls of an empty queue')
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        if processes == 1:
+            ran = run_worker(once=options['once'], poll_interval=options['poll_interval'])
+            self.stdout.write(self.style.SUCCESS(f"Ran {ran} roster job(s)."))
+            return
+
+        # Every worker opens its own database connection
+        connections.close_all()
+        workers = [
+            Process(target=_worker_main, args=(options['once'], options['poll_interval']), daemon=True)
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {processes} roster workers.")
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+        self.stdout.write(self.style.SUCCESS("Roster workers stopped."))
@@ -0,0 +1,276 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:24
+#
+# Brings the migration state in line with model options, help texts and
+# indexes that were changed in models.py without a migration.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0005_airport_menuitem_remove_flight_aircraft_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='passenger',
+            options={'ordering': ['last_name', 'first_name']},
+        ),
+        migrations.AlterModelOptions(
+            name='pilot',
+            options={'ordering': ['seniority', 'code']},
+        ),
+        migrations.AlterField(
+            model_name='airport',
+            name='city',
+            field=models.CharField(help_text='City where airport is located', max_length=120),
+        ),
+        migrations.AlterField(
+            model_name='airport',
+            name='code',
+            field=models.CharField(help_text='3-letter airport code (AAA format where A is an alphabetical letter)', max_length=3, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='airport',
+            name='country',
+            field=models.CharField(help_text='Country where airport is located', max_length=120),
+        ),
+        migrations.AlterField(
+            model_name='airport',
+            name='name',
+            field=models.CharField(help_text='Airport name', max_length=120),
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='arrival_time',
+            field=models.DateTimeField(blank=True, help_text='Flight arrival date and time (resolution up to minutes)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='connecting_flight_number',
+            field=models.CharField(blank=True, help_text='Connecting flight number in AANNNN format (only for shared flights)', max_length=6, null=True),
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='departure_time',
+            field=models.DateTimeField(blank=True, help_text='Flight departure date and time (resolution up to minutes)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='destination_airport',
+            field=models.ForeignKey(blank=True, help_text='Destination airport with country, city, name, and 3-letter code', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='arrivals', to='flights.airport'),
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='distance_km',
+            field=models.PositiveIntegerField(blank=True, help_text='Flight distance in kilometers', null=True),
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(blank=True, help_text='Flight duration in minutes', null=True),
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='flight_number',
+            field=models.CharField(help_text='Flight number in AANNNN format (2 letters + 4 digits). First 2 letters must be company prefix.', max_length=6, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='origin_airport',
+            field=models.ForeignKey(blank=True, help_text='Source airport with country, city, name, and 3-letter code', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='departures', to='flights.airport'),
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='plane_type',
+            field=models.ForeignKey(blank=True, help_text='Vehicle type with seat information, seating plan, crew limits, and standard menu', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='flights', to='flights.planetype'),
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='shared_airline',
+            field=models.CharField(blank=True, help_text='Name of the airline company if this is a shared flight', max_length=80, null=True),
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='shared_flight_number',
+            field=models.CharField(blank=True, help_text='Shared flight number in AANNNN format if flight is shared with another airline', max_length=6, null=True),
+        ),
+        migrations.AlterField(
+            model_name='passenger',
+            name='affiliated_passengers',
+            field=models.ManyToManyField(blank=True, help_text='List of 1-2 affiliated passenger IDs (used when seat number is absent for neighboring seat assignment)', related_name='affiliates', to='flights.passenger'),
+        ),
+        migrations.AlterField(
+            model_name='passenger',
+            name='age',
+            field=models.PositiveIntegerField(default=18, help_text="Passenger's age (0-2 for infants)"),
+        ),
+        migrations.AlterField(
+            model_name='passenger',
+            name='date_of_birth',
+            field=models.DateField(help_text="Passenger's date of birth"),
+        ),
+        migrations.AlterField(
+            model_name='passenger',
+            name='email',
+            field=models.EmailField(help_text="Passenger's email address", max_length=254, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='passenger',
+            name='first_name',
+            field=models.CharField(help_text="Passenger's first name", max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='passenger',
+            name='gender',
+            field=models.CharField(blank=True, default='', help_text="Passenger's gender", max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='passenger',
+            name='last_name',
+            field=models.CharField(help_text="Passenger's last name", max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='passenger',
+            name='nationality',
+            field=models.CharField(help_text="Passenger's nationality", max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='passenger',
+            name='parent',
+            field=models.ForeignKey(blank=True, help_text='Parent passenger for infant passengers (age 0-2). Infants do not have seats.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='infants', to='flights.passenger'),
+        ),
+        migrations.AlterField(
+            model_name='passenger',
+            name='passport_number',
+            field=models.CharField(help_text="Passenger's passport number (unique identifier)", max_length=50, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='passenger',
+            name='phone',
+            field=models.CharField(help_text="Passenger's phone number", max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='passenger',
+            name='seat_number',
+            field=models.CharField(blank=True, help_text='Designated seat number (may be absent, in which case affiliated passengers may be present)', max_length=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='passenger',
+            name='seat_type',
+            field=models.CharField(blank=True, choices=[('business', 'Business'), ('economy', 'Economy')], default='economy', help_text='Seat type: business or economy', max_length=20, null=True),
+        ),
+        migrations.AlterField(
+            model_name='pilot',
+            name='age',
+            field=models.PositiveIntegerField(help_text="Pilot's age"),
+        ),
+        migrations.AlterField(
+            model_name='pilot',
+            name='code',
+            field=models.CharField(help_text='Unique pilot ID designated by the API system', max_length=20, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='pilot',
+            name='first_name',
+            field=models.CharField(help_text="Pilot's first name", max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='pilot',
+            name='gender',
+            field=models.CharField(help_text="Pilot's gender", max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='pilot',
+            name='known_languages',
+            field=models.JSONField(default=list, help_text="List of language codes the pilot knows (e.g., ['EN', 'FR', 'DE'])"),
+        ),
+        migrations.AlterField(
+            model_name='pilot',
+            name='last_name',
+            field=models.CharField(help_text="Pilot's last name", max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='pilot',
+            name='max_range_km',
+            field=models.PositiveIntegerField(blank=True, help_text='Maximum allowed distance (in kilometers) that the pilot can be assigned to', null=True),
+        ),
+        migrations.AlterField(
+            model_name='pilot',
+            name='nationality',
+            field=models.CharField(help_text="Pilot's nationality", max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='pilot',
+            name='seniority',
+            field=models.CharField(blank=True, choices=[('senior', 'Senior'), ('junior', 'Junior'), ('trainee', 'Trainee')], help_text='Pilot seniority level: senior, junior, or trainee', max_length=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='pilot',
+            name='vehicle_restriction',
+            field=models.ForeignKey(blank=True, help_text='Single type of vehicle (plane type) that the pilot can operate', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='pilots', to='flights.planetype'),
+        ),
+        migrations.AlterField(
+            model_name='planetype',
+            name='business_seats',
+            field=models.PositiveIntegerField(blank=True, default=0, help_text='Number of business class seats', null=True),
+        ),
+        migrations.AlterField(
+            model_name='planetype',
+            name='code',
+            field=models.CharField(help_text='Unique code identifying the plane type', max_length=20, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='planetype',
+            name='economy_seats',
+            field=models.PositiveIntegerField(blank=True, help_text='Number of economy class seats', null=True),
+        ),
+        migrations.AlterField(
+            model_name='planetype',
+            name='max_cabin_crew',
+            field=models.PositiveIntegerField(default=20, help_text='Maximum number of cabin crew members allowed for this plane type'),
+        ),
+        migrations.AlterField(
+            model_name='planetype',
+            name='min_cabin_crew',
+            field=models.PositiveIntegerField(default=4, help_text='Minimum number of cabin crew members required for this plane type'),
+        ),
+        migrations.AlterField(
+            model_name='planetype',
+            name='name',
+            field=models.CharField(help_text='Name of the plane type', max_length=120),
+        ),
+        migrations.AlterField(
+            model_name='planetype',
+            name='seat_layout',
+            field=models.JSONField(blank=True, default=dict, help_text="JSON structure storing seat map metadata for plane view (e.g., {'business': ['1A', '1B'], 'economy': ['20A', '20B']})", null=True),
+        ),
+        migrations.AlterField(
+            model_name='planetype',
+            name='standard_menu',
+            field=models.ManyToManyField(blank=True, help_text='Standard menu items served during flights on this plane type', related_name='plane_types', to='flights.menuitem'),
+        ),
+        migrations.AlterField(
+            model_name='planetype',
+            name='total_seats',
+            field=models.PositiveIntegerField(blank=True, help_text='Total number of seats in the aircraft', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='passenger',
+            index=models.Index(fields=['seat_type', 'seat_number'], name='flights_pas_seat_ty_c78404_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passenger',
+            index=models.Index(fields=['age'], name='flights_pas_age_5eca57_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pilot',
+            index=models.Index(fields=['seniority', 'vehicle_restriction'], name='flights_pil_seniori_aea981_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pilot',
+            index=models.Index(fields=['max_range_km'], name='flights_pil_max_ran_770944_idx'),
+        ),
+    ]
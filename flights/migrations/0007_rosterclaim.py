@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0006_sync_model_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RosterClaim',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(help_text='host:pid of the process generating the roster', max_length=120)),
+                ('claimed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('flight', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='roster_claim', to='flights.flight')),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0007_rosterclaim'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RosterJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('single', 'Single flight'), ('batch', 'Batch')], max_length=10)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('params', models.JSONField(default=dict, help_text='Arguments for generate_roster / generate_rosters')),
+                ('progress', models.PositiveIntegerField(default=0, help_text='Flights processed so far')),
+                ('total', models.PositiveIntegerField(default=0, help_text='Flights to process (0 until known)')),
+                ('result', models.JSONField(blank=True, help_text='Batch report or single roster summary', null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('worker', models.CharField(blank=True, default='', help_text='host:pid of the worker running the job', max_length=120)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='roster_jobs', to=settings.AUTH_USER_MODEL)),
+                ('roster', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='flights.roster')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='flights_ros_status_8a7173_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:05
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_departure_dates(apps, schema_editor):
+    """Set departure_date on existing flights, as Flight.save() does for new ones."""
+    Flight = apps.get_model('flights', 'Flight')
+    tz = timezone.get_default_timezone()
+    batch = []
+    for flight in Flight.objects.filter(departure_time__isnull=False).only('id', 'departure_time').iterator(chunk_size=2000):
+        flight.departure_date = timezone.localtime(flight.departure_time, tz).date()
+        batch.append(flight)
+        if len(batch) >= 2000:
+            Flight.objects.bulk_update(batch, ['departure_date'])
+            batch = []
+    Flight.objects.bulk_update(batch, ['departure_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0008_rosterjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='departure_date',
+            field=models.DateField(blank=True, editable=False, help_text='Departure day in the site time zone, kept in step with departure_time by save() for route/date search', null=True),
+        ),
+        migrations.RunPython(fill_departure_dates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['origin_airport', 'destination_airport', 'departure_date', 'departure_time'], name='flight_route_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_time'], name='flight_departure_idx'),
+        ),
+    ]
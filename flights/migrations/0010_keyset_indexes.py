@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0009_flight_departure_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flightticket',
+            index=models.Index(fields=['user', 'id'], name='flights_fli_user_id_381db8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flightticket',
+            index=models.Index(fields=['flight', 'id'], name='flights_fli_flight__9c858a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roster',
+            index=models.Index(fields=['flight', 'id'], name='flights_ros_flight__79d9dc_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0010_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rosterjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last time the running worker reported in', null=True),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 import re
 
 
@@ -201,9 +202,33 @@ class Flight(models.Model):
         blank=True,
         help_text="Vehicle type with seat information, seating plan, crew limits, and standard menu"
     )
+    departure_date = models.DateField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Departure day in the site time zone, kept in step with departure_time by save() for route/date search"
+    )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Scheduled')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Route search: one (origin, destination, day) bucket is a contiguous index range,
+            # already in departure order
+            models.Index(
+                fields=['origin_airport', 'destination_airport', 'departure_date', 'departure_time'],
+                name='flight_route_day_idx',
+            ),
+            models.Index(fields=['departure_time'], name='flight_departure_idx'),
+        ]
+
+    @staticmethod
+    def departure_day(departure_time):
+        """The departure_date for a departure time (None stays None)."""
+        if departure_time is None:
+            return None
+        return timezone.localtime(departure_time, timezone.get_default_timezone()).date()
+
     def clean(self):
         """Validate flight number format and company prefix"""
         super().clean()
@@ -249,7 +274,11 @@ class Flight(models.Model):
             })
 
     def save(self, *args, **kwargs):
-        """Override save to run clean validation"""
+        """Override save to run clean validation and keep departure_date current"""
+        self.departure_date = self.departure_day(self.departure_time)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'departure_time' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'departure_date'}
         self.full_clean()
         super().save(*args, **kwargs)
 
@@ -516,6 +545,13 @@ class FlightTicket(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Booked')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pages of one user's or one flight's tickets are index range reads
+            models.Index(fields=['user', 'id']),
+            models.Index(fields=['flight', 'id']),
+        ]
+
     def __str__(self):
         return f"Ticket {self.ticket_number} ({self.flight.flight_number})"
 
@@ -532,10 +568,32 @@ class Roster(models.Model):
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='rosters')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['flight', 'id']),
+        ]
+
     def __str__(self):
         return f"Roster for {self.flight.flight_number} ({self.backend})"
 
 
+class RosterClaim(models.Model):
+    """
+    Marks a flight whose roster is being generated.
+
+    One row per flight at most, so whoever inserts it first (a batch
+    worker or a staff member clicking Generate) owns the flight until the
+    roster is written; everyone else is turned away instead of writing a
+    duplicate roster.
+    """
+    flight = models.OneToOneField(Flight, on_delete=models.CASCADE, related_name='roster_claim')
+    owner = models.CharField(max_length=120, help_text="host:pid of the process generating the roster")
+    claimed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Claim on flight {self.flight_id} by {self.owner}"
+
+
 class RosterCrewAssignment(models.Model):
     CREW_TYPE_CHOICES = [
         ('pilot', 'Pilot'),
@@ -563,3 +621,47 @@ class RosterPassengerAssignment(models.Model):
 
     def __str__(self):
         return f"Passenger {self.passenger} on {self.roster.flight.flight_number}"
+
+
+class RosterJob(models.Model):
+    """
+    A queued roster generation request.
+
+    Rows are the queue: run_roster_worker processes claim queued jobs,
+    record progress while they run and link the finished Roster.
+    """
+    KIND_CHOICES = [
+        ('single', 'Single flight'),
+        ('batch', 'Batch'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    params = models.JSONField(default=dict, help_text="Arguments for generate_roster / generate_rosters")
+    progress = models.PositiveIntegerField(default=0, help_text="Flights processed so far")
+    total = models.PositiveIntegerField(default=0, help_text="Flights to process (0 until known)")
+    result = models.JSONField(null=True, blank=True, help_text="Batch report or single roster summary")
+    error = models.TextField(blank=True, default='')
+    roster = models.ForeignKey(Roster, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    worker = models.CharField(max_length=120, blank=True, default='', help_text="host:pid of the worker running the job")
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='roster_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last time the running worker reported in")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+    def __str__(self):
+        return f"Roster job {self.id} ({self.kind}, {self.status})"
+
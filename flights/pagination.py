@@ -0,0 +1,53 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over the view's `cursor_ordering`.
+
+    Each page is a range read of an index that starts where the previous
+    page ended, so page N costs the same as page 1, and no COUNT query is
+    run. An `?ordering=` the view allows is used instead of the default,
+    with the default's leading field appended as a tiebreaker so rows
+    that tie keep a stable order.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        default = getattr(view, 'cursor_ordering', None) or (self.ordering,)
+        self.ordering = tuple(default)
+        ordering = super().get_ordering(request, queryset, view)
+        key = default[0].lstrip('-')
+        if key not in {field.lstrip('-') for field in ordering}:
+            ordering += (default[0],)
+        return ordering
+
+
+class OptInCursorPagination(PageNumberPagination):
+    """
+    Page numbers as everywhere else, unless the client asks for cursors.
+
+    `?pagination=cursor` (or a `cursor` from a previous page's next and
+    previous links) switches the request to KeysetPagination; its
+    responses have `next`, `previous` and `results` but no `count`.
+    """
+    cursor_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get('pagination') == 'cursor' or self.cursor_class.cursor_query_param in request.query_params:
+            self.cursor = self.cursor_class()
+            return self.cursor.paginate_queryset(queryset, request, view)
+        self.cursor = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor is not None:
+            return self.cursor.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor is not None:
+            return self.cursor.to_html()
+        return super().to_html()
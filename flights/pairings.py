@@ -0,0 +1,115 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Like crew_optimizer, this module works on plain tuples rather than
+# models, so schedules of tens of thousands of flights stay cheap to build.
+
+# Shortest time between landing and the next departure for a crew to change aircraft
+MIN_CONNECTION = timedelta(minutes=45)
+# Longest sit between legs; longer gaps are better spent resting
+MAX_CONNECTION = timedelta(hours=4)
+# Longest pairing, from the first departure to the last arrival
+MAX_PAIRING_DUTY = timedelta(hours=13)
+MAX_PAIRING_LEGS = 4
+
+
+class Leg(NamedTuple):
+    id: int
+    origin_id: int
+    destination_id: int
+    departure: datetime
+    arrival: datetime
+    plane_type_id: int
+
+
+def legs_from_flights(flights: Iterable) -> List[Leg]:
+    """Legs for every flight that has times, airports and a plane type; others cannot be chained."""
+    return [
+        Leg(f.id, f.origin_airport_id, f.destination_airport_id, f.departure_time, f.arrival_time, f.plane_type_id)
+        for f in flights
+        if f.departure_time and f.arrival_time and f.origin_airport_id and f.destination_airport_id
+        and f.plane_type_id is not None
+    ]
+
+
+class ConnectionGraph:
+    """
+    Feasible crew connections between legs.
+
+    Leg b follows leg a when b departs from a's destination on the same
+    plane type, between `min_connection` and `max_connection` after a
+    lands. Departures are indexed per (airport, plane type) and sorted
+    by time, so each leg's successors are one bisect-bounded slice of
+    that index: building the graph is O(n log n) plus the edges found.
+    """
+
+    def __init__(self, legs: Iterable[Leg], min_connection: timedelta = MIN_CONNECTION,
+                 max_connection: timedelta = MAX_CONNECTION):
+        self.legs: List[Leg] = sorted(legs, key=lambda leg: (leg.departure, leg.id))
+        departures: Dict[Tuple[int, int], List[int]] = {}
+        for i, leg in enumerate(self.legs):
+            departures.setdefault((leg.origin_id, leg.plane_type_id), []).append(i)
+        times = {key: [self.legs[i].departure for i in indexes] for key, indexes in departures.items()}
+
+        # successors[i] are indexes into self.legs, earliest departure first
+        self.successors: List[List[int]] = []
+        for leg in self.legs:
+            key = (leg.destination_id, leg.plane_type_id)
+            indexes = departures.get(key)
+            if not indexes:
+                self.successors.append([])
+                continue
+            lo = bisect_left(times[key], leg.arrival + min_connection)
+            hi = bisect_right(times[key], leg.arrival + max_connection)
+            self.successors.append(indexes[lo:hi])
+
+    def edge_count(self) -> int:
+        return sum(len(successors) for successors in self.successors)
+
+    def pairings(self, max_duty: timedelta = MAX_PAIRING_DUTY, max_legs: int = MAX_PAIRING_LEGS) -> List[List[Leg]]:
+        """
+        Cover every leg with exactly one pairing, in departure order.
+
+        Greedy: each leg not yet covered starts a pairing, which then
+        takes the earliest uncovered successor for as long as the pairing
+        stays within `max_duty` (first departure to last arrival) and
+        `max_legs`. Legs without a feasible connection are single-leg
+        pairings.
+        """
+        covered = [False] * len(self.legs)
+        pairings: List[List[Leg]] = []
+        for first in range(len(self.legs)):
+            if covered[first]:
+                continue
+            covered[first] = True
+            chain = [first]
+            start = self.legs[first].departure
+            while len(chain) < max_legs:
+                following = self._next(chain[-1], covered, start + max_duty)
+                if following is None:
+                    break
+                covered[following] = True
+                chain.append(following)
+            pairings.append([self.legs[i] for i in chain])
+        return pairings
+
+    def _next(self, current: int, covered: List[bool], latest_arrival: datetime) -> Optional[int]:
+        for candidate in self.successors[current]:
+            if not covered[candidate] and self.legs[candidate].arrival <= latest_arrival:
+                return candidate
+        return None
+
+
+def build_pairings(flights: Iterable, min_connection: timedelta = MIN_CONNECTION,
+                   max_connection: timedelta = MAX_CONNECTION, max_duty: timedelta = MAX_PAIRING_DUTY,
+                   max_legs: int = MAX_PAIRING_LEGS) -> List[List[int]]:
+    """Flight ids grouped into pairings (see ConnectionGraph.pairings()); flights that cannot chain stand alone."""
+    flights = list(flights)
+    legs = legs_from_flights(flights)
+    chained = {leg.id for leg in legs}
+    pairings = [
+        [leg.id for leg in pairing]
+        for pairing in ConnectionGraph(legs, min_connection, max_connection).pairings(max_duty, max_legs)
+    ]
+    return pairings + [[f.id] for f in flights if f.id not in chained]
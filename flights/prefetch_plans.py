@@ -0,0 +1,86 @@
+from django.db.models import Prefetch, QuerySet
+
+from .models import (
+    Airport,
+    CabinCrew,
+    Flight,
+    FlightTicket,
+    MenuItem,
+    Passenger,
+    PlaneType,
+    Pilot,
+    Roster,
+    RosterCrewAssignment,
+    RosterPassengerAssignment,
+)
+
+# One function per serializer: the queryset that loads everything that
+# serializer and the serializers nested in it read. A nested serializer's
+# relation is a Prefetch of the nested plan, so each level of the tree
+# costs one query per page however many rows it holds, and a change to a
+# serializer only needs its own plan updated.
+
+
+def airports() -> QuerySet:
+    """For AirportSerializer."""
+    return Airport.objects.all()
+
+
+def menu_items() -> QuerySet:
+    """For MenuItemSerializer."""
+    return MenuItem.objects.all()
+
+
+def plane_types() -> QuerySet:
+    """For PlaneTypeSerializer: the standard menu."""
+    return PlaneType.objects.prefetch_related(Prefetch('standard_menu', queryset=menu_items()))
+
+
+def flights() -> QuerySet:
+    """For FlightSerializer: both airports and the plane type with its menu."""
+    return Flight.objects.select_related('origin_airport', 'destination_airport').prefetch_related(
+        Prefetch('plane_type', queryset=plane_types()),
+    )
+
+
+def pilots() -> QuerySet:
+    """For PilotSerializer: the plane type the pilot is restricted to."""
+    return Pilot.objects.prefetch_related(Prefetch('vehicle_restriction', queryset=plane_types()))
+
+
+def cabin_crew() -> QuerySet:
+    """For CabinCrewSerializer: plane types and recipes."""
+    return CabinCrew.objects.prefetch_related(
+        Prefetch('vehicle_restrictions', queryset=plane_types()),
+        Prefetch('recipes', queryset=menu_items()),
+    )
+
+
+def passengers() -> QuerySet:
+    """For PassengerSerializer: affiliated passengers and the ticket flights behind flight_numbers."""
+    return Passenger.objects.prefetch_related(
+        'affiliated_passengers',
+        Prefetch('tickets', queryset=FlightTicket.objects.select_related('flight')),
+    )
+
+
+def tickets() -> QuerySet:
+    """For TicketSerializer: the passenger and flight plans."""
+    return FlightTicket.objects.prefetch_related(
+        Prefetch('passenger', queryset=passengers()),
+        Prefetch('flight', queryset=flights()),
+    )
+
+
+def rosters() -> QuerySet:
+    """For RosterSerializer: the flight, and the crew and passengers of both assignment lists."""
+    return Roster.objects.prefetch_related(
+        Prefetch('flight', queryset=flights()),
+        Prefetch('crew_assignments', queryset=RosterCrewAssignment.objects.prefetch_related(
+            Prefetch('pilot', queryset=pilots()),
+            Prefetch('cabin_crew', queryset=cabin_crew()),
+        )),
+        Prefetch('passenger_assignments', queryset=RosterPassengerAssignment.objects.prefetch_related(
+            Prefetch('passenger', queryset=passengers()),
+        )),
+    )
@@ -1,6 +1,13 @@
-from typing import Dict, List, Tuple
-from django.db import transaction
-import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+import logging
+import os
+import socket
 
 from .models import (
     Flight,
@@ -9,50 +16,28 @@ from .models import (
     CabinCrew,
     FlightTicket,
     Roster,
+    RosterClaim,
     RosterCrewAssignment,
     RosterPassengerAssignment,
 )
+from . import crew_optimizer
+from .crew_index import PilotRangeIndex, get_pilot_index, invalidate_pilot_index
+from .crew_schedule import CrewKey, CrewSchedule, cabin_key, pilot_key
+from .duty_rules import get_duty_limits
+from .pairings import MAX_PAIRING_DUTY, build_pairings
+from .roster_payload import (
+    PassengerEntry,
+    compact_payload,
+    decode_passengers,
+    decode_remaining,
+    is_compact,
+    passenger_entries,
+    verbose_payload,
+)
+from .roster_store import get_roster_storage
+from .seat_map import SeatPool, get_seat_map
 
-
-def _generate_seat_labels(prefix: str, count: int, start_row: int = 1, seats_per_row: int = 6) -> List[str]:
-    letters = list("ABCDEF")
-    seats: List[str] = []
-    row = start_row
-    remaining = count
-    while remaining > 0:
-        for letter in letters[:seats_per_row]:
-            if remaining <= 0:
-                break
-            seats.append(f"{row}{letter}")
-            remaining -= 1
-        row += 1
-    return seats
-
-
-def _build_seat_pools(plane: PlaneType) -> Dict[str, List[str]]:
-    layout = plane.seat_layout or {}
-    business_pool = list(layout.get("business", []))
-    economy_pool = list(layout.get("economy", []))
-
-    if not business_pool and plane.business_seats:
-        business_pool = _generate_seat_labels("B", plane.business_seats, start_row=1, seats_per_row=4)
-    if not economy_pool and plane.economy_seats:
-        economy_pool = _generate_seat_labels("E", plane.economy_seats, start_row=20, seats_per_row=6)
-
-    # Remove duplicates while preserving order
-    def dedup(seq: List[str]) -> List[str]:
-        seen = set()
-        out: List[str] = []
-        for item in seq:
-            if item not in seen:
-                seen.add(item)
-                out.append(item)
-        return out
-
-    return {
-        "business": dedup(business_pool),
-        "economy": dedup(economy_pool),
-    }
+logger = logging.getLogger(__name__)
 
 
 def _seat_type_for_ticket(ticket: FlightTicket) -> str:
@@ -60,7 +45,117 @@ def _seat_type_for_ticket(ticket: FlightTicket) -> str:
     return "business" if cls.startswith("bus") else "economy"
 
 
-def _select_pilots(flight: Flight, pilot_ids: List[int] = None) -> List[Pilot]:
+class CrewPool:
+    """
+    In-memory crew candidates for a set of plane types.
+
+    Loading the pool once lets a batch roster many flights without
+    re-running the pilot and cabin crew queries for every flight. Pilots
+    come from the process-wide PilotRangeIndex, so eligible pilots for a
+    flight are found by bisecting on range rather than by a query.
+    """
+
+    def __init__(self, pilot_index: PilotRangeIndex, plane_type_ids: Iterable[int],
+                 cabin_crew_by_plane: Dict[int, List[CabinCrew]]):
+        self.pilot_index = pilot_index
+        self.pilots_by_plane: Dict[int, List[Pilot]] = {
+            plane_type_id: pilot_index.pilots_for(plane_type_id) for plane_type_id in plane_type_ids
+        }
+        self.cabin_crew_by_plane: Dict[int, List[CabinCrew]] = {
+            plane_id: sorted(crew, key=lambda c: (c.role, c.seniority, c.code))
+            for plane_id, crew in cabin_crew_by_plane.items()
+        }
+
+    @classmethod
+    def load(cls, plane_type_ids: Iterable[int]) -> "CrewPool":
+        plane_type_ids = {pid for pid in plane_type_ids if pid is not None}
+        # Qualifications and crew in one query straight from the M2M table,
+        # not the cached index, which may lag changes made in other processes
+        qualifications = CabinCrew.vehicle_restrictions.through.objects.filter(
+            planetype_id__in=plane_type_ids,
+        ).select_related("cabincrew")
+        cabin_crew: Dict[int, CabinCrew] = {}
+        cabin_crew_by_plane: Dict[int, List[CabinCrew]] = {plane_type_id: [] for plane_type_id in plane_type_ids}
+        for row in qualifications:
+            member = cabin_crew.setdefault(row.cabincrew_id, row.cabincrew)
+            cabin_crew_by_plane[row.planetype_id].append(member)
+        return cls(get_pilot_index(), plane_type_ids, cabin_crew_by_plane)
+
+    def pilots_for(self, flight: Flight) -> List[Pilot]:
+        """Pilots qualified for the flight's plane type and range, ordered by seniority and code."""
+        return self.pilot_index.pilots_for(flight.plane_type_id, flight.distance_km or 0)
+
+    def cabin_crew_for(self, flight: Flight) -> List[CabinCrew]:
+        """Cabin crew qualified for the flight's plane type, ordered by role, seniority and code."""
+        return list(self.cabin_crew_by_plane.get(flight.plane_type_id, []))
+
+
+def _schedule_violations(flight: Flight, who: str, key: CrewKey, schedule: CrewSchedule) -> List[str]:
+    """Why `who` cannot take the flight given their booked duty: an overlap, or the duty limits it would break."""
+    if not schedule.is_free(key, flight.departure_time, flight.arrival_time):
+        return [f"{who} is already rostered on an overlapping flight"]
+    return [f"{who} {reason}" for reason in schedule.duty_violations(key, flight.departure_time, flight.arrival_time)]
+
+
+def _pilot_violations(flight: Flight, pilots: List[Pilot], schedule: Optional[CrewSchedule] = None) -> List[str]:
+    """Every rule a manually chosen set of pilots breaks for the flight, in the order they are checked."""
+    if not pilots:
+        return ["No pilots selected"]
+    violations = []
+    for pilot in pilots:
+        if pilot.vehicle_restriction_id and pilot.vehicle_restriction_id != flight.plane_type_id:
+            violations.append(f"Pilot {pilot.code} is not qualified for plane type {flight.plane_type.code}")
+        if pilot.max_range_km and flight.distance_km and pilot.max_range_km < flight.distance_km:
+            violations.append(f"Pilot {pilot.code} max range ({pilot.max_range_km}km) is less than flight distance ({flight.distance_km}km)")
+        if schedule:
+            violations.extend(_schedule_violations(flight, f"Pilot {pilot.code}", pilot_key(pilot.id), schedule))
+
+    # Flight requirements: at least 1 senior, 1 junior, at most 2 trainees
+    seniors = [p for p in pilots if p.seniority == 'senior']
+    juniors = [p for p in pilots if p.seniority == 'junior']
+    trainees = [p for p in pilots if p.seniority == 'trainee']
+    if not seniors:
+        violations.append("Flight requires at least one senior pilot")
+    if not juniors:
+        violations.append("Flight requires at least one junior pilot")
+    if len(trainees) > 2:
+        violations.append(f"Flight can have at most two trainees, but {len(trainees)} were selected")
+    return violations
+
+
+def _restriction_ids(member: CabinCrew) -> Set[int]:
+    """Plane types the crew member is qualified for, from their (prefetched) vehicle_restrictions."""
+    return {plane.id for plane in member.vehicle_restrictions.all()}
+
+
+def _cabin_crew_violations(flight: Flight, crew: List[CabinCrew], schedule: Optional[CrewSchedule] = None) -> List[str]:
+    """
+    Every rule a manually chosen cabin crew breaks for the flight, in the order they are checked.
+
+    Qualifications come from the crew's own vehicle_restrictions (prefetch
+    them), not the cached index, so a change made in another process is
+    never missed.
+    """
+    violations = []
+    for member in crew:
+        if flight.plane_type_id not in _restriction_ids(member):
+            violations.append(f"Cabin crew {member.code} is not qualified for plane type {flight.plane_type.code}")
+        if schedule:
+            violations.extend(_schedule_violations(flight, f"Cabin crew {member.code}", cabin_key(member.id), schedule))
+
+    seniors = [c for c in crew if c.seniority == "senior"]
+    if not seniors:
+        violations.append("At least one senior cabin crew required")
+    min_needed = flight.plane_type.min_cabin_crew
+    if len(crew) < min_needed:
+        violations.append(f"At least {min_needed} cabin crew members required, but only {len(crew)} provided")
+    if len(crew) > flight.plane_type.max_cabin_crew:
+        violations.append(f"Maximum {flight.plane_type.max_cabin_crew} cabin crew members allowed, but {len(crew)} provided")
+    return violations
+
+
+def _select_pilots(flight: Flight, pilot_ids: List[int] = None, pool: Optional[CrewPool] = None,
+                   schedule: Optional[CrewSchedule] = None) -> List[Pilot]:
     """
     Select pilots for a flight.
     
@@ -72,6 +167,10 @@ def _select_pilots(flight: Flight, pilot_ids: List[int] = None) -> List[Pilot]:
     Args:
         flight: The flight to assign pilots to
         pilot_ids: Optional list of pilot IDs for manual selection
+        pool: Optional preloaded crew pool used for automatic selection
+        schedule: Optional crew duty index; pilots already rostered on an
+            overlapping flight or who would break a duty limit are skipped
+            (automatic) or rejected (manual)
         
     Returns:
         List of selected pilots
@@ -82,39 +181,23 @@ def _select_pilots(flight: Flight, pilot_ids: List[int] = None) -> List[Pilot]:
     if pilot_ids:
         # Manual selection
         pilots = list(Pilot.objects.filter(id__in=pilot_ids))
-        
-        if not pilots:
-            raise ValueError("No pilots selected")
-        
-        # Validate they meet requirements
-        for pilot in pilots:
-            if pilot.vehicle_restriction and pilot.vehicle_restriction != flight.plane_type:
-                raise ValueError(f"Pilot {pilot.code} is not qualified for plane type {flight.plane_type.code}")
-            if pilot.max_range_km and pilot.max_range_km < flight.distance_km:
-                raise ValueError(f"Pilot {pilot.code} max range ({pilot.max_range_km}km) is less than flight distance ({flight.distance_km}km)")
-        
-        # Validate flight requirements: at least 1 senior, 1 junior, at most 2 trainees
-        seniors = [p for p in pilots if p.seniority == 'senior']
-        juniors = [p for p in pilots if p.seniority == 'junior']
-        trainees = [p for p in pilots if p.seniority == 'trainee']
-        
-        if not seniors:
-            raise ValueError("Flight requires at least one senior pilot")
-        if not juniors:
-            raise ValueError("Flight requires at least one junior pilot")
-        if len(trainees) > 2:
-            raise ValueError(f"Flight can have at most two trainees, but {len(trainees)} were selected")
-        
+        violations = _pilot_violations(flight, pilots, schedule)
+        if violations:
+            raise ValueError(violations[0])
         return pilots
     
     # Automatic selection
-    qs = Pilot.objects.filter(
-        vehicle_restriction=flight.plane_type,
-        max_range_km__gte=flight.distance_km,
-    ).order_by("seniority", "code")
-    seniors = list(qs.filter(seniority="senior"))
-    juniors = list(qs.filter(seniority="junior"))
-    trainees = list(qs.filter(seniority="trainee"))
+    if pool is None:
+        pool = CrewPool.load([flight.plane_type_id])
+    candidates = pool.pilots_for(flight)
+    if schedule:
+        candidates = [
+            p for p in candidates
+            if schedule.can_fly(pilot_key(p.id), flight.departure_time, flight.arrival_time)
+        ]
+    seniors = [p for p in candidates if p.seniority == "senior"]
+    juniors = [p for p in candidates if p.seniority == "junior"]
+    trainees = [p for p in candidates if p.seniority == "trainee"]
 
     if not seniors or not juniors:
         raise ValueError("Insufficient pilots to satisfy senior and junior requirements")
@@ -127,30 +210,28 @@ def _select_pilots(flight: Flight, pilot_ids: List[int] = None) -> List[Pilot]:
     return picks
 
 
-def _select_cabin_crew(flight: Flight, cabin_crew_ids: List[int] = None) -> List[CabinCrew]:
+def _select_cabin_crew(flight: Flight, cabin_crew_ids: List[int] = None, pool: Optional[CrewPool] = None,
+                       schedule: Optional[CrewSchedule] = None) -> List[CabinCrew]:
     if cabin_crew_ids:
         # Manual selection
-        crew = list(CabinCrew.objects.filter(id__in=cabin_crew_ids))
-        # Validate they meet requirements
-        for member in crew:
-            if not member.vehicle_restrictions.filter(id=flight.plane_type.id).exists():
-                raise ValueError(f"Cabin crew {member.code} is not qualified for plane type {flight.plane_type.code}")
-        # Check minimum requirements
-        seniors = [c for c in crew if c.seniority == "senior"]
-        if not seniors:
-            raise ValueError("At least one senior cabin crew required")
-        min_needed = flight.plane_type.min_cabin_crew
-        if len(crew) < min_needed:
-            raise ValueError(f"At least {min_needed} cabin crew members required, but only {len(crew)} provided")
-        if len(crew) > flight.plane_type.max_cabin_crew:
-            raise ValueError(f"Maximum {flight.plane_type.max_cabin_crew} cabin crew members allowed, but {len(crew)} provided")
+        crew = list(CabinCrew.objects.filter(id__in=cabin_crew_ids).prefetch_related("vehicle_restrictions"))
+        violations = _cabin_crew_violations(flight, crew, schedule)
+        if violations:
+            raise ValueError(violations[0])
         return crew
     
     # Automatic selection
-    qs = CabinCrew.objects.filter(vehicle_restrictions=flight.plane_type).order_by("role", "seniority", "code")
-    seniors = list(qs.filter(seniority="senior"))
-    juniors = list(qs.filter(seniority="junior"))
-    chefs = list(qs.filter(role="chef"))
+    if pool is None:
+        pool = CrewPool.load([flight.plane_type_id])
+    candidates = pool.cabin_crew_for(flight)
+    if schedule:
+        candidates = [
+            c for c in candidates
+            if schedule.can_fly(cabin_key(c.id), flight.departure_time, flight.arrival_time)
+        ]
+    seniors = [c for c in candidates if c.seniority == "senior"]
+    juniors = [c for c in candidates if c.seniority == "junior"]
+    chefs = [c for c in candidates if c.role == "chef"]
 
     if not seniors:
         raise ValueError("At least one senior cabin crew required")
@@ -165,8 +246,8 @@ def _select_cabin_crew(flight: Flight, cabin_crew_ids: List[int] = None) -> List
     extra_seniors = seniors[1:4]
     crew.extend(extra_seniors)
 
-    # Add chefs up to 2
-    crew.extend(chefs[:2])
+    # Add chefs up to 2 (a chef may already be on board as a junior)
+    crew.extend([c for c in chefs if c not in crew][:2])
 
     # If we still have fewer than min_cabin_crew, add more juniors
     min_needed = flight.plane_type.min_cabin_crew
@@ -179,77 +260,82 @@ def _select_cabin_crew(flight: Flight, cabin_crew_ids: List[int] = None) -> List
     return crew[: flight.plane_type.max_cabin_crew]
 
 
-def _assign_passenger_seats(plane: PlaneType, tickets: List[FlightTicket]) -> Tuple[List[Dict], Dict[str, List[str]]]:
-    pools = _build_seat_pools(plane)
-    assigned = {"business": {}, "economy": {}}
+def _roster_tickets():
+    """
+    Live tickets with everything seating reads about their passengers.
+
+    The whole affinity graph comes in one prefetch, so seating costs the
+    same number of queries for 3 or 300 passengers. Cancelled tickets
+    hold no seat.
+    """
+    return FlightTicket.objects.exclude(status="Cancelled").select_related(
+        "passenger"
+    ).prefetch_related("passenger__affiliated_passengers")
+
+
+def _fill_seats(unseated: List[Tuple[Dict, str]], pools: Dict[str, SeatPool]) -> None:
+    """
+    Give each assignment the first free seat of its class, in order.
+
+    A passenger whose class is full takes the first free seat of the other
+    class. Which pool serves whom is worked out by counting, then each
+    pool hands out all its seats in one take_first_n() call - the same
+    seats taking them one by one would give.
+    """
+    free = {key: len(pool) for key, pool in pools.items()}
+    served: Dict[str, List[Dict]] = {key: [] for key in pools}
+    for assignment, seat_type in unseated:
+        key = seat_type if free[seat_type] else ("economy" if seat_type == "business" else "business")
+        if not free[key]:
+            raise ValueError("No seats left to assign")
+        free[key] -= 1
+        served[key].append(assignment)
+    for key, assignments in served.items():
+        for assignment, seat in zip(assignments, pools[key].take_first_n(len(assignments))):
+            assignment["seat_number"] = seat
+
+
+def _assign_passenger_seats(plane: PlaneType, tickets: List[FlightTicket],
+                            pools: Optional[Dict[str, SeatPool]] = None,
+                            seating: str = "python") -> Tuple[List[Dict], Dict[str, List[str]]]:
+    """
+    Seat the ticketed passengers, affinity groups first.
+
+    Affiliates only join a group when they are among `tickets` themselves.
+    `pools` continues from existing free-seat state (default: an empty
+    cabin built by the `seating` engine, see CompiledSeatMap.new_pools()).
+    Both engines pick the same seats.
+    """
+    if pools is None:
+        pools = get_seat_map(plane).new_pools(seating)
 
     # Remove seats already pre-assigned in tickets to avoid double assignment
     for ticket in tickets:
-        seat = ticket.seat_number
-        target_pool = _seat_type_for_ticket(ticket)
-        if seat and seat in pools.get(target_pool, []):
-            pools[target_pool].remove(seat)
+        if ticket.seat_number:
+            pools[_seat_type_for_ticket(ticket)].take(ticket.seat_number)
 
     passenger_assignments: List[Dict] = []
     handled_affinity = set()
+    ticketed = {ticket.passenger_id for ticket in tickets}
 
     def take_seat(pool_key: str) -> str:
-        pool = pools.get(pool_key, [])
-        if not pool:
+        seat = pools[pool_key].take_first()
+        if seat is None:
             fallback_key = "economy" if pool_key == "business" else "business"
-            pool = pools.get(fallback_key, [])
-            key_to_use = fallback_key
-        else:
-            key_to_use = pool_key
-        if not pool:
+            seat = pools[fallback_key].take_first()
+        if seat is None:
             raise ValueError("No seats left to assign")
-        seat = pool.pop(0)
         return seat
 
-    def find_neighboring_seats(pool_key: str, count: int) -> List[str]:
-        """
-        Try to find neighboring seats (same row, adjacent columns) for affiliated passengers.
-        Falls back to sequential seats if neighboring not possible.
-        """
-        pool = pools.get(pool_key, [])
-        if not pool or count <= 0:
-            return []
-        
-        # Group seats by row number
-        seats_by_row: Dict[int, List[str]] = {}
-        for seat in pool:
-            row_match = re.match(r'(\d+)([A-Z]+)', seat)
-            if row_match:
-                row_num = int(row_match.group(1))
-                if row_num not in seats_by_row:
-                    seats_by_row[row_num] = []
-                seats_by_row[row_num].append(seat)
-        
-        # Try to find a row with enough adjacent seats
-        for row_num in sorted(seats_by_row.keys()):
-            row_seats = sorted(seats_by_row[row_num])
-            if len(row_seats) >= count:
-                # Found a row with enough seats, take first N seats (they're adjacent)
-                selected = row_seats[:count]
-                # Remove from pool
-                for s in selected:
-                    if s in pools[pool_key]:
-                        pools[pool_key].remove(s)
-                return selected
-        
-        # Fallback: take sequential seats from pool
-        selected = []
-        for _ in range(count):
-            if pools[pool_key]:
-                selected.append(pools[pool_key].pop(0))
-        return selected
-
     # Assign seats for affinity groups first (prioritize neighboring seats)
     for ticket in tickets:
         passenger = ticket.passenger
         if passenger.id in handled_affinity:
             continue
-        affiliates = list(passenger.affiliated_passengers.all())
+        affiliates = [
+            a for a in passenger.affiliated_passengers.all()
+            if a.id in ticketed and a.id not in handled_affinity
+        ]
         if not affiliates:
             continue
         group = [passenger] + affiliates
@@ -257,15 +343,15 @@ def _assign_passenger_seats(plane: PlaneType, tickets: List[FlightTicket]) -> Tu
         seats_needed = len([p for p in group if not p.is_infant])
         
         # Try to assign neighboring seats for affiliated passengers
-        if seat_type not in pools or not pools[seat_type]:
+        if not pools[seat_type]:
             fallback_key = "economy" if seat_type == "business" else "business"
-            if fallback_key in pools and pools[fallback_key]:
+            if pools[fallback_key]:
                 seat_type = fallback_key
             else:
                 raise ValueError("No seats left to assign")
         
         # Find neighboring seats if possible (1-2 affiliated passengers)
-        seats = find_neighboring_seats(seat_type, seats_needed)
+        seats = pools[seat_type].take_adjacent(seats_needed)
         
         # If we didn't get enough seats, fill with take_seat
         while len(seats) < seats_needed:
@@ -293,111 +379,846 @@ def _assign_passenger_seats(plane: PlaneType, tickets: List[FlightTicket]) -> Tu
                 idx += 1
             handled_affinity.add(member.id)
 
-    # Assign remaining passengers
+    # Remaining passengers keep a pre-assigned seat, infants get none and
+    # everyone else is seated in bulk below
+    unseated: List[Tuple[Dict, str]] = []
     for ticket in tickets:
         passenger = ticket.passenger
         if passenger.id in handled_affinity:
             continue
         seat_type = _seat_type_for_ticket(ticket)
-        if passenger.is_infant:
-            passenger_assignments.append({
-                "passenger": passenger,
-                "seat_number": None,
-                "seat_type": seat_type,
-                "is_infant": True,
-            })
-            continue
-
-        if ticket.seat_number:
-            seat = ticket.seat_number
-        else:
-            seat = take_seat(seat_type)
-        passenger_assignments.append({
+        assignment = {
             "passenger": passenger,
-            "seat_number": seat,
+            "seat_number": None if passenger.is_infant else ticket.seat_number,
             "seat_type": seat_type,
-            "is_infant": False,
-        })
+            "is_infant": passenger.is_infant,
+        }
+        passenger_assignments.append(assignment)
+        if not passenger.is_infant and not ticket.seat_number:
+            unseated.append((assignment, seat_type))
+    _fill_seats(unseated, pools)
 
-    return passenger_assignments, pools
+    return passenger_assignments, {key: pool.remaining() for key, pool in pools.items()}
 
 
-def generate_roster(flight_id: int, backend: str = "sql", user=None, pilot_ids: List[int] = None, cabin_crew_ids: List[int] = None) -> Roster:
-    flight = Flight.objects.select_related("plane_type", "origin_airport", "destination_airport").get(id=flight_id)
+class StageTimer:
+    """Collects wall-clock timings, in milliseconds, for named roster stages."""
 
-    with transaction.atomic():
-        pilots = _select_pilots(flight, pilot_ids)
-        cabin_crew = _select_cabin_crew(flight, cabin_crew_ids)
-        tickets = list(FlightTicket.objects.select_related("passenger").filter(flight=flight))
-        passenger_assignments, remaining_pools = _assign_passenger_seats(flight.plane_type, tickets)
-
-        crew_payload = [
-            {
-                "type": "pilot",
-                "code": p.code,
-                "name": f"{p.first_name} {p.last_name}",
-                "seniority": p.seniority,
-            }
-            for p in pilots
-        ] + [
-            {
-                "type": "cabin",
-                "code": c.code,
-                "name": f"{c.first_name} {c.last_name}",
-                "role": c.role,
-                "seniority": c.seniority,
-            }
-            for c in cabin_crew
-        ]
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
 
-        passenger_payload = [
-            {
-                "name": f"{a['passenger'].first_name} {a['passenger'].last_name}",
-                "seat": a["seat_number"],
-                "seat_type": a["seat_type"],
-                "infant": a["is_infant"],
-            }
-            for a in passenger_assignments
-        ]
+    @contextmanager
+    def stage(self, name: str):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round((perf_counter() - start) * 1000, 3)
 
-        roster_payload = {
-            "flight": flight.flight_number,
-            "backend": backend,
-            "crew": crew_payload,
-            "passengers": passenger_payload,
-            "remaining_seats": remaining_pools,
-        }
 
-        roster = Roster.objects.create(
-            flight=flight,
-            backend=backend,
-            payload=roster_payload,
-            created_by=user if user and getattr(user, "is_authenticated", False) else None,
+def _passenger_rows(roster: Roster, passenger_assignments: List[Dict]) -> List[RosterPassengerAssignment]:
+    return [
+        RosterPassengerAssignment(
+            roster=roster,
+            passenger=assignment["passenger"],
+            seat_number=assignment["seat_number"],
+            seat_type=assignment["seat_type"],
+            is_infant=assignment["is_infant"],
         )
+        for assignment in passenger_assignments
+    ]
+
 
+def _persist_roster(flight: Flight, backend: str, user, payload: Dict, pilots: List[Pilot],
+                    cabin_crew: List[CabinCrew], passenger_assignments: List[Dict]) -> Roster:
+    """
+    Write a roster and its assignments.
+
+    Each assignment table is written with one bulk INSERT (Django splits it
+    further only if the database's parameter limit requires it), so the
+    write transaction stays short regardless of cabin size. Where the
+    assignments end up is decided by the backend's storage (see
+    roster_store).
+
+    Raises:
+        ValueError: If someone on the roster was deleted in the meantime
+    """
+    storage = get_roster_storage(backend)
+    try:
+        with transaction.atomic():
+            roster = Roster.objects.create(
+                flight=flight,
+                backend=backend,
+                payload=payload,
+                created_by=user if user and getattr(user, "is_authenticated", False) else None,
+            )
+            crew_rows = [
+                RosterCrewAssignment(roster=roster, crew_type="pilot", pilot=pilot, assigned_role=pilot.seniority)
+                for pilot in pilots
+            ] + [
+                RosterCrewAssignment(roster=roster, crew_type="cabin", cabin_crew=crew, assigned_role=crew.role)
+                for crew in cabin_crew
+            ]
+            storage.save(roster, flight, crew_rows, _passenger_rows(roster, passenger_assignments))
+    except IntegrityError:
+        # Someone on the roster was deleted by another process mid-write
+        raise ValueError(f"Crew or passengers of flight {flight.flight_number} were deleted while its roster was saved")
+    return roster
+
+
+CLAIM_TIMEOUT = timedelta(minutes=15)
+
+
+class RosterInProgress(Exception):
+    """Another process is already generating a roster for the flight."""
+
+
+def _claim_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@contextmanager
+def claim_flight(flight: Flight):
+    """
+    Hold the flight's RosterClaim while its roster is generated.
+
+    The claim row is committed on its own before any work starts, so other
+    processes see it immediately; claims older than CLAIM_TIMEOUT are
+    treated as left behind by a crashed worker and taken over.
+
+    Raises:
+        RosterInProgress: If someone else holds a live claim
+    """
+    RosterClaim.objects.filter(flight=flight, claimed_at__lt=timezone.now() - CLAIM_TIMEOUT).delete()
+    try:
+        with transaction.atomic():
+            claim = RosterClaim.objects.create(flight=flight, owner=_claim_owner())
+    except IntegrityError:
+        raise RosterInProgress(f"A roster for flight {flight.flight_number} is already being generated")
+    try:
+        yield claim
+    finally:
+        RosterClaim.objects.filter(pk=claim.pk).delete()
+
+
+def _preselected_violations(flight: Flight, pilots: List[Pilot], cabin_crew: List[CabinCrew],
+                            schedule: Optional[CrewSchedule] = None) -> List[str]:
+    """
+    Rules crew chosen ahead of time (optimizer or pairing) must still meet for the flight.
+
+    With `schedule` every member must also be free and within their duty
+    limits, which the optimizer does not plan for.
+    """
+    violations = []
+    if schedule:
         for pilot in pilots:
-            RosterCrewAssignment.objects.create(
-                roster=roster,
-                crew_type="pilot",
-                pilot=pilot,
-                assigned_role=pilot.seniority,
+            violations.extend(_schedule_violations(flight, f"Pilot {pilot.code}", pilot_key(pilot.id), schedule))
+        for member in cabin_crew:
+            violations.extend(_schedule_violations(flight, f"Cabin crew {member.code}", cabin_key(member.id), schedule))
+    plane = flight.plane_type
+    if len(cabin_crew) < plane.min_cabin_crew:
+        violations.append(f"At least {plane.min_cabin_crew} cabin crew members required, but only {len(cabin_crew)} provided")
+    if len(cabin_crew) > plane.max_cabin_crew:
+        violations.append(f"Maximum {plane.max_cabin_crew} cabin crew members allowed, but {len(cabin_crew)} provided")
+    return violations
+
+
+def _recheck_indexed_pilots(flight: Flight, pilots: List[Pilot]) -> List[Pilot]:
+    """
+    Re-read pilots picked from the pilot index and check them against the flight again.
+
+    Another process may have deleted or changed a pilot since this
+    process built its index; the index is then dropped so the next
+    selection sees the change. Returns the pilots as now stored.
+
+    Raises:
+        ValueError: If a pilot no longer exists or no longer fits the flight
+    """
+    current = Pilot.objects.in_bulk([pilot.id for pilot in pilots])
+    violations = [f"Pilot {pilot.code} no longer exists" for pilot in pilots if pilot.id not in current]
+    if not violations:
+        pilots = [current[pilot.id] for pilot in pilots]
+        violations = _pilot_violations(flight, pilots)
+    if violations:
+        invalidate_pilot_index()
+        raise ValueError(violations[0])
+    return pilots
+
+
+def _book_crew(schedule: CrewSchedule, pilots: List[Pilot], cabin_crew: List[CabinCrew],
+               start: Optional[datetime], end: Optional[datetime]) -> None:
+    for pilot in pilots:
+        schedule.book(pilot_key(pilot.id), start, end)
+    for crew in cabin_crew:
+        schedule.book(cabin_key(crew.id), start, end)
+
+
+def _roster_flight(
+    flight: Flight,
+    tickets: List[FlightTicket],
+    backend: str = "sql",
+    user=None,
+    pilot_ids: List[int] = None,
+    cabin_crew_ids: List[int] = None,
+    pool: Optional[CrewPool] = None,
+    schedule: Optional[CrewSchedule] = None,
+    preselected: Optional[Tuple[List[Pilot], List[CabinCrew]]] = None,
+    seating: str = "python",
+    reserved: bool = False,
+) -> Roster:
+    if flight.plane_type_id is None:
+        raise ValueError(f"Flight {flight.flight_number} has no plane type assigned")
+    with claim_flight(flight):
+        if schedule is None:
+            schedule = CrewSchedule.load(
+                flight.departure_time, flight.arrival_time, exclude_flight_ids=[flight.id], limits=get_duty_limits(),
             )
+        if pool is None and preselected is None and not (pilot_ids and cabin_crew_ids):
+            # Shared by pilot and cabin crew selection
+            pool = CrewPool.load([flight.plane_type_id])
 
-        for crew in cabin_crew:
-            RosterCrewAssignment.objects.create(
-                roster=roster,
-                crew_type="cabin",
-                cabin_crew=crew,
-                assigned_role=crew.role,
+        timer = StageTimer()
+        if preselected is not None:
+            # Crew chosen for the whole horizon (optimizer) or pairing; rechecked against this flight
+            pilots, cabin_crew = preselected
+            # Reserved crew (a pairing's) are already booked for this flight in the schedule
+            violations = _preselected_violations(flight, pilots, cabin_crew, None if reserved else schedule)
+            if violations:
+                raise ValueError(violations[0])
+        else:
+            with timer.stage("select_pilots"):
+                pilots = _select_pilots(flight, pilot_ids, pool, schedule)
+            with timer.stage("select_cabin_crew"):
+                cabin_crew = _select_cabin_crew(flight, cabin_crew_ids, pool, schedule)
+        with timer.stage("seat_assignment"):
+            passenger_assignments, remaining_pools = _assign_passenger_seats(flight.plane_type, tickets, seating=seating)
+        with timer.stage("persist"):
+            if not pilot_ids:
+                pilots = _recheck_indexed_pilots(flight, pilots)
+            seat_map = get_seat_map(flight.plane_type)
+            payload = compact_payload(
+                flight, backend, [p.id for p in pilots], [c.id for c in cabin_crew],
+                passenger_entries(passenger_assignments, seat_map), remaining_pools, seat_map,
             )
+            roster = _persist_roster(flight, backend, user, payload, pilots, cabin_crew, passenger_assignments)
+
+        if not reserved:
+            _book_crew(schedule, pilots, cabin_crew, flight.departure_time, flight.arrival_time)
+        roster.stage_timings = timer.timings
+        logger.debug("Rostered flight %s in %s", flight.flight_number, timer.timings)
+        return roster
+
+
+def generate_roster(flight_id: int, backend: str = "sql", user=None, pilot_ids: List[int] = None,
+                    cabin_crew_ids: List[int] = None, seating: str = "python") -> Roster:
+    flight = Flight.objects.select_related("plane_type", "origin_airport", "destination_airport").get(id=flight_id)
+    tickets = list(_roster_tickets().filter(flight=flight))
+    return _roster_flight(flight, tickets, backend, user, pilot_ids, cabin_crew_ids, seating=seating)
 
-        for assignment in passenger_assignments:
-            RosterPassengerAssignment.objects.create(
-                roster=roster,
-                passenger=assignment["passenger"],
-                seat_number=assignment["seat_number"],
-                seat_type=assignment["seat_type"],
-                is_infant=assignment["is_infant"],
+
+def simulate_roster(flight_id: int, backend: str = "sql", pilot_ids: List[int] = None,
+                    cabin_crew_ids: List[int] = None, seating: str = "python") -> Dict:
+    """
+    Run crew selection and seating for a flight without writing anything.
+
+    Manual `pilot_ids`/`cabin_crew_ids` are checked against every rule
+    (instead of stopping at the first broken one); omitted ones are
+    picked automatically as generate_roster() would. No claim is taken
+    and nothing is saved, so it is safe to call on every edit.
+
+    Returns:
+        Dict with ``valid``, the ``violations`` found, the proposed
+        ``roster`` payload and per-stage ``timings``
+
+    Raises:
+        Flight.DoesNotExist: If the flight does not exist
+    """
+    flight = Flight.objects.select_related("plane_type", "origin_airport", "destination_airport").get(id=flight_id)
+    if flight.plane_type_id is None:
+        return {
+            "valid": False,
+            "violations": [f"Flight {flight.flight_number} has no plane type assigned"],
+            "roster": None,
+            "timings": {},
+        }
+
+    timer = StageTimer()
+    violations: List[str] = []
+    schedule = CrewSchedule.load(
+        flight.departure_time, flight.arrival_time, exclude_flight_ids=[flight.id], limits=get_duty_limits(),
+    )
+    pool = None if pilot_ids and cabin_crew_ids else CrewPool.load([flight.plane_type_id])
+    pilots: List[Pilot] = []
+    cabin_crew: List[CabinCrew] = []
+
+    with timer.stage("select_pilots"):
+        if pilot_ids:
+            pilots = list(Pilot.objects.filter(id__in=pilot_ids))
+            violations.extend(f"Pilot id {i} does not exist" for i in sorted(set(pilot_ids) - {p.id for p in pilots}))
+            violations.extend(_pilot_violations(flight, pilots, schedule))
+        else:
+            try:
+                pilots = _select_pilots(flight, pool=pool, schedule=schedule)
+            except ValueError as exc:
+                violations.append(str(exc))
+    with timer.stage("select_cabin_crew"):
+        if cabin_crew_ids:
+            cabin_crew = list(CabinCrew.objects.filter(id__in=cabin_crew_ids).prefetch_related("vehicle_restrictions"))
+            violations.extend(
+                f"Cabin crew id {i} does not exist" for i in sorted(set(cabin_crew_ids) - {c.id for c in cabin_crew})
+            )
+            violations.extend(_cabin_crew_violations(flight, cabin_crew, schedule))
+        else:
+            try:
+                cabin_crew = _select_cabin_crew(flight, pool=pool, schedule=schedule)
+            except ValueError as exc:
+                violations.append(str(exc))
+    with timer.stage("seat_assignment"):
+        try:
+            passenger_assignments, remaining_pools = _assign_passenger_seats(
+                flight.plane_type, list(_roster_tickets().filter(flight=flight)), seating=seating
             )
+        except ValueError as exc:
+            violations.append(str(exc))
+            passenger_assignments, remaining_pools = [], {}
+
+    return {
+        "valid": not violations,
+        "violations": violations,
+        "roster": verbose_payload(flight.flight_number, backend, pilots, cabin_crew, passenger_assignments,
+                                  remaining_pools),
+        "timings": timer.timings,
+    }
+
+
+def _current_seat_state(roster: Roster, plane: PlaneType) -> Tuple[List[PassengerEntry], Dict[str, SeatPool]]:
+    """
+    The roster's compact passenger entries and free-seat pools.
 
+    Compact payloads carry both, as long as the plane's layout is still
+    the one they were encoded against; older rosters and changed layouts
+    are rebuilt from their assignment rows once.
+    """
+    seat_map = get_seat_map(plane)
+    payload = roster.payload or {}
+    if is_compact(payload) and payload.get("layout") == seat_map.fingerprint:
+        return decode_passengers(payload), seat_map.pools_from_remaining(decode_remaining(payload, seat_map))
+
+    pools = seat_map.new_pools()
+    assignments = []
+    for row in roster.passenger_assignments.select_related("passenger").order_by("id"):
+        if row.seat_number:
+            for pool in pools.values():
+                if pool.take(row.seat_number):
+                    break
+        assignments.append({
+            "passenger": row.passenger,
+            "seat_number": row.seat_number,
+            "seat_type": row.seat_type,
+            "is_infant": row.is_infant,
+        })
+    return passenger_entries(assignments, seat_map), pools
+
+
+def _crew_ids(roster: Roster) -> Tuple[List[int], List[int]]:
+    """Pilot and cabin crew ids of a roster, from its payload when it is compact."""
+    if is_compact(roster.payload):
+        return roster.payload["pilots"], roster.payload["cabin_crew"]
+    pilot_ids, cabin_crew_ids = [], []
+    for crew_type, pilot_id, cabin_crew_id in roster.crew_assignments.order_by("id").values_list(
+        "crew_type", "pilot_id", "cabin_crew_id"
+    ):
+        if crew_type == "pilot" and pilot_id:
+            pilot_ids.append(pilot_id)
+        elif crew_type == "cabin" and cabin_crew_id:
+            cabin_crew_ids.append(cabin_crew_id)
+    return pilot_ids, cabin_crew_ids
+
+
+def update_roster(flight_id: int, user=None) -> Roster:
+    """
+    Apply the ticket delta to a flight's latest roster, in place.
+
+    Passengers whose ticket was cancelled or deleted lose their assignment
+    and free their seat, newly ticketed passengers are seated (new
+    affinity groups together) in the seats the roster left free, and
+    everyone else keeps their seat; crew are unchanged. Only the changed
+    tickets are loaded and only their assignment rows are inserted or
+    deleted, but the compact payload is decoded, its seat pools rebuilt
+    and all of it rewritten, so that part still grows with the cabin.
+    Flights without a roster get a full generate_roster().
+
+    The returned roster carries ``delta`` ({"added", "removed"} passenger
+    counts) and ``stage_timings``.
+
+    Raises:
+        Flight.DoesNotExist: If the flight does not exist
+        RosterInProgress: If the flight is being rostered elsewhere
+        ValueError: If seating the new passengers fails or the latest
+            roster is not stored in SQL
+    """
+    flight = Flight.objects.select_related("plane_type").get(id=flight_id)
+    latest = flight.rosters.order_by("-id").values_list("backend", flat=True).first()
+    if latest is None:
+        roster = generate_roster(flight_id, user=user)
+        roster.delta = {"added": roster.passenger_assignments.count(), "removed": 0}
+        return roster
+    if latest != "sql":
+        raise ValueError(f"Incremental updates need an 'sql' roster; regenerate the {latest} roster instead")
+    if flight.plane_type_id is None:
+        raise ValueError(f"Flight {flight.flight_number} has no plane type assigned")
+
+    with claim_flight(flight):
+        roster = flight.rosters.order_by("-id").first()
+        if roster is None:
+            raise ValueError(f"The roster of flight {flight.flight_number} was deleted during the update")
+        timer = StageTimer()
+        with timer.stage("ticket_delta"):
+            live = FlightTicket.objects.filter(flight=flight).exclude(status="Cancelled")
+            removed = list(
+                roster.passenger_assignments.exclude(passenger_id__in=live.values("passenger_id"))
+                .values_list("id", "passenger_id", "seat_number")
+            )
+            added = list(
+                _roster_tickets().filter(flight=flight)
+                .exclude(passenger_id__in=roster.passenger_assignments.values("passenger_id"))
+                .order_by("id")
+            )
+            removed_row_ids = [row_id for row_id, _, _ in removed]
+
+        with timer.stage("seat_assignment"):
+            passengers, pools = _current_seat_state(roster, flight.plane_type)
+            for _, _, seat in removed:
+                if seat:
+                    for pool in pools.values():
+                        if pool.release(seat):
+                            break
+            assignments, remaining_pools = _assign_passenger_seats(flight.plane_type, added, pools)
+
+        with timer.stage("persist"):
+            removed_passenger_ids = {passenger_id for _, passenger_id, _ in removed}
+            seat_map = get_seat_map(flight.plane_type)
+            entries = [
+                entry for entry in passengers if entry[0] not in removed_passenger_ids
+            ] + passenger_entries(assignments, seat_map)
+            pilot_ids, cabin_crew_ids = _crew_ids(roster)
+            payload = compact_payload(flight, roster.backend, pilot_ids, cabin_crew_ids, entries, remaining_pools, seat_map)
+            with transaction.atomic():
+                if removed_row_ids:
+                    RosterPassengerAssignment.objects.filter(id__in=removed_row_ids).delete()
+                RosterPassengerAssignment.objects.bulk_create(_passenger_rows(roster, assignments))
+                roster.payload = payload
+                roster.save(update_fields=["payload"])
+
+    roster.stage_timings = timer.timings
+    roster.delta = {"added": len(assignments), "removed": len(removed)}
+    logger.debug("Updated roster %s of flight %s: %s", roster.id, flight.flight_number, roster.delta)
     return roster
+
+
+def compact_roster_payload(roster: Roster) -> bool:
+    """
+    Rewrite an older roster's verbose payload in the compact format.
+
+    Rebuilt from the assignment rows, so rosters whose passengers only
+    live in a document are left alone. Returns whether it was rewritten.
+    """
+    if is_compact(roster.payload) or roster.flight.plane_type_id is None:
+        return False
+    if get_roster_storage(roster.backend).read(roster) is not None:
+        return False
+    seat_map = get_seat_map(roster.flight.plane_type)
+    entries, pools = _current_seat_state(roster, roster.flight.plane_type)
+    pilot_ids, cabin_crew_ids = _crew_ids(roster)
+    remaining = {cabin_class: pool.remaining() for cabin_class, pool in pools.items()}
+    roster.payload = compact_payload(roster.flight, roster.backend, pilot_ids, cabin_crew_ids, entries, remaining, seat_map)
+    roster.save(update_fields=["payload"])
+    return True
+
+
+def _flights_for_batch(flight_ids: Iterable[int] = None, date_from: date = None, date_to: date = None) -> List[Flight]:
+    qs = Flight.objects.select_related("plane_type", "origin_airport", "destination_airport")
+    if flight_ids:
+        qs = qs.filter(id__in=flight_ids)
+    else:
+        if date_from is None and date_to is None:
+            raise ValueError("flight_ids or a date range is required")
+        tz = timezone.get_current_timezone()
+        if date_from is not None:
+            qs = qs.filter(departure_time__gte=timezone.make_aware(datetime.combine(date_from, time.min), tz))
+        if date_to is not None:
+            qs = qs.filter(departure_time__lte=timezone.make_aware(datetime.combine(date_to, time.max), tz))
+        qs = qs.exclude(status="Cancelled")
+    return list(qs.order_by("departure_time", "id"))
+
+
+def _timestamp(value: Optional[datetime]) -> float:
+    return value.timestamp() if value else 0.0
+
+
+def _crew_problem(flights: List[Flight], pool: CrewPool, schedule: CrewSchedule) -> crew_optimizer.CrewProblem:
+    """Translate flights, pools and booked duty into the optimizer's plain-data problem."""
+    slots = tuple(
+        crew_optimizer.FlightSlot(
+            id=f.id,
+            plane_type_id=f.plane_type_id,
+            distance_km=f.distance_km or 0,
+            start=_timestamp(f.departure_time),
+            end=_timestamp(f.arrival_time),
+            min_cabin_crew=f.plane_type.min_cabin_crew,
+            max_cabin_crew=f.plane_type.max_cabin_crew,
+        )
+        for f in flights if f.plane_type_id is not None
+    )
+    pilots = tuple(
+        crew_optimizer.PilotCandidate(p.id, p.vehicle_restriction_id, p.max_range_km, p.seniority)
+        for candidates in pool.pilots_by_plane.values()
+        for p in candidates
+        if p.max_range_km is not None
+    )
+    planes_by_crew: Dict[int, set] = {}
+    cabin_by_id: Dict[int, CabinCrew] = {}
+    for plane_type_id, members in pool.cabin_crew_by_plane.items():
+        for member in members:
+            planes_by_crew.setdefault(member.id, set()).add(plane_type_id)
+            cabin_by_id[member.id] = member
+    cabin_crew = tuple(
+        crew_optimizer.CabinCandidate(crew_id, frozenset(plane_ids), cabin_by_id[crew_id].seniority)
+        for crew_id, plane_ids in planes_by_crew.items()
+    )
+    busy = {
+        key: [(_timestamp(start), _timestamp(end)) for start, end in schedule.duty_periods(key)]
+        for key in schedule.crew_keys()
+    }
+    return crew_optimizer.CrewProblem(slots, pilots, cabin_crew, busy)
+
+
+def _error_result(flight_id: int, flight_number: Optional[str], error: str) -> Dict:
+    return {
+        "flight_id": flight_id,
+        "flight_number": flight_number,
+        "status": "error",
+        "roster_id": None,
+        "error": error,
+        "timings": None,
+    }
+
+
+def _ok_result(flight: Flight, roster: Roster) -> Dict:
+    return {
+        "flight_id": flight.id,
+        "flight_number": flight.flight_number,
+        "status": "ok",
+        "roster_id": roster.id,
+        "error": None,
+        "timings": roster.stage_timings,
+    }
+
+
+def _missing_results(flight_ids: Optional[List[int]], flights: List[Flight]) -> List[Dict]:
+    if not flight_ids:
+        return []
+    found = {f.id for f in flights}
+    return [_error_result(missing_id, None, "flight not found") for missing_id in sorted(set(flight_ids) - found)]
+
+
+def _batch_schedule(flights: List[Flight]) -> CrewSchedule:
+    """Duty already rostered elsewhere across the batch's time span; the batch itself is about to be re-rostered."""
+    timed = [f for f in flights if f.departure_time and f.arrival_time]
+    return CrewSchedule.load(
+        min((f.departure_time for f in timed), default=None),
+        max((f.arrival_time for f in timed), default=None),
+        exclude_flight_ids=[f.id for f in flights],
+        limits=get_duty_limits(),
+    )
+
+
+def _tickets_by_flight(flight_ids: List[int]) -> Dict[int, List[FlightTicket]]:
+    tickets_by_flight: Dict[int, List[FlightTicket]] = {}
+    tickets = _roster_tickets().filter(flight_id__in=flight_ids).order_by("id")
+    for ticket in tickets:
+        tickets_by_flight.setdefault(ticket.flight_id, []).append(ticket)
+    return tickets_by_flight
+
+
+def _batch_report(results: List[Dict]) -> Dict:
+    succeeded = sum(1 for r in results if r["status"] == "ok")
+    stage_totals: Dict[str, float] = {}
+    for result in results:
+        for stage, elapsed in (result["timings"] or {}).items():
+            stage_totals[stage] = round(stage_totals.get(stage, 0.0) + elapsed, 3)
+    return {
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "timings": stage_totals,
+    }
+
+
+def generate_rosters(
+    flight_ids: Iterable[int] = None,
+    date_from: date = None,
+    date_to: date = None,
+    backend: str = "sql",
+    user=None,
+    optimize: bool = False,
+    objective: str = "min_crew",
+    time_budget: float = 10.0,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    seating: str = "python",
+    pairings: bool = False,
+) -> Dict:
+    """
+    Generate rosters for many flights in a single pass.
+
+    Flights are given either as explicit ids or as a departure date range
+    (inclusive, cancelled flights skipped). Crew pools and tickets are loaded
+    once for the whole batch and each flight is rostered in its own
+    transaction, so one failing flight does not roll back the others.
+    Crew already on an overlapping flight (rostered earlier or earlier in
+    this batch) are never double-booked, nor booked past their flight
+    duty limits (settings.CREW_DUTY_LIMITS, see duty_rules).
+
+    With ``optimize`` the crew for all flights is chosen up front by
+    crew_optimizer.optimize() (``objective``, ``time_budget`` seconds,
+    ``workers`` processes) instead of greedily flight by flight; its
+    summary is returned under ``optimizer``. Optimized crews carry no
+    trainees; the optimizer only keeps them from overlapping, so each is
+    checked against the duty limits when its flight is rostered and the
+    flights whose crew would break them are reported as errors.
+
+    With ``pairings`` connecting flights are chained into multi-leg
+    pairings (see pairings.build_pairings()) and every pairing gets one
+    crew, chosen for the whole chain when its first leg is rostered and
+    booked from its first departure to its last arrival; if nobody can
+    cover the chain its legs are crewed one by one. The
+    pairings of more than one leg are returned under ``pairings``.
+
+    ``progress(done, total)`` is called after every flight. ``seating``
+    picks the seat pool engine ("python" or "numpy"); both choose the
+    same seats.
+
+    Returns:
+        Report dict with a per-flight ``results`` list (including stage
+        timings in milliseconds), ``succeeded``/``failed`` counts and
+        ``timings`` summed per stage across the batch.
+
+    Raises:
+        ValueError: If neither flight ids nor a date range are given, or
+            both ``optimize`` and ``pairings`` are
+    """
+    if optimize and pairings:
+        raise ValueError("optimize and pairings cannot be combined")
+    flight_ids = list(flight_ids) if flight_ids else None
+    flights = _flights_for_batch(flight_ids, date_from, date_to)
+    results = _missing_results(flight_ids, flights)
+
+    pool = CrewPool.load(f.plane_type_id for f in flights)
+    schedule = _batch_schedule(flights)
+    tickets_by_flight = _tickets_by_flight([f.id for f in flights])
+
+    chains: List[List[int]] = []
+    chain_of: Dict[int, List[Flight]] = {}
+    chain_crew: Dict[int, Tuple[List[Pilot], List[CabinCrew]]] = {}
+    if pairings:
+        limits = get_duty_limits()
+        by_id = {f.id: f for f in flights}
+        chains = [
+            chain for chain in build_pairings(flights, max_duty=limits.max_duty_period if limits else MAX_PAIRING_DUTY)
+            if len(chain) > 1
+        ]
+        for chain in chains:
+            legs = [by_id[i] for i in chain]
+            for leg in legs:
+                chain_of[leg.id] = legs
+
+    plan = None
+    if optimize:
+        plan = crew_optimizer.optimize(_crew_problem(flights, pool, schedule), objective, time_budget, workers)
+        pilots_by_id = {p.id: p for candidates in pool.pilots_by_plane.values() for p in candidates}
+        cabin_by_id = {c.id: c for members in pool.cabin_crew_by_plane.values() for c in members}
+
+    for done, flight in enumerate(flights, 1):
+        preselected = None
+        legs = chain_of.get(flight.id)
+        if legs and legs[0] is flight:
+            crew = _select_pairing_crew(legs, pool, schedule)
+            if crew is not None:
+                chain_crew.update((leg.id, crew) for leg in legs)
+                # Booked from the first departure to the last arrival, so flights
+                # in the connection gaps cannot take the pairing's crew
+                _book_crew(schedule, *crew, legs[0].departure_time, legs[-1].arrival_time)
+        if legs:
+            preselected = chain_crew.get(flight.id)
+        if plan is not None:
+            picked = plan["assignments"].get(flight.id)
+            if picked is not None:
+                preselected = (
+                    [pilots_by_id[i] for i in picked["pilot_ids"]],
+                    [cabin_by_id[i] for i in picked["cabin_crew_ids"]],
+                )
+        if plan is not None and picked is None and flight.id in plan["unassigned"]:
+            results.append(_error_result(flight.id, flight.flight_number, plan["unassigned"][flight.id]))
+        else:
+            try:
+                roster = _roster_flight(
+                    flight, tickets_by_flight.get(flight.id, []), backend, user,
+                    pool=pool, schedule=schedule, preselected=preselected, seating=seating,
+                    reserved=flight.id in chain_crew,
+                )
+            except (ValueError, RosterInProgress) as exc:
+                results.append(_error_result(flight.id, flight.flight_number, str(exc)))
+            else:
+                results.append(_ok_result(flight, roster))
+        if progress is not None:
+            progress(done, len(flights))
+
+    report = _batch_report(results)
+    if plan is not None:
+        report["optimizer"] = {
+            "objective": objective,
+            "crew_used": plan["crew_used"],
+            "max_duty_minutes": plan["max_duty_minutes"],
+            "restarts": plan["restarts"],
+        }
+    if pairings:
+        report["pairings"] = chains
+    return report
+
+
+def _select_pairing_crew(legs: List[Flight], pool: CrewPool,
+                         schedule: CrewSchedule) -> Optional[Tuple[List[Pilot], List[CabinCrew]]]:
+    """
+    One crew for every leg of a pairing, or None if nobody covers it all.
+
+    Crew are picked as for a single flight spanning the whole pairing,
+    from the first departure to the last arrival and as long as its
+    longest leg, so they are free and within their duty limits for all
+    of it, sits included.
+    """
+    span = Flight(
+        flight_number=legs[0].flight_number,
+        plane_type=legs[0].plane_type,
+        distance_km=max(leg.distance_km or 0 for leg in legs),
+        departure_time=legs[0].departure_time,
+        arrival_time=legs[-1].arrival_time,
+    )
+    try:
+        return _select_pilots(span, pool=pool, schedule=schedule), _select_cabin_crew(span, pool=pool, schedule=schedule)
+    except ValueError:
+        return None
+
+
+def _roster_shard(jobs: List[Tuple[int, List[int], List[int]]], backend: str, user_id: Optional[int],
+                  seating: str = "python") -> List[Dict]:
+    """
+    Seat and persist a shard of flights whose crew was already chosen.
+
+    Runs in a worker process: everything the shard needs is loaded with a
+    handful of queries, then each flight is written in its own transaction
+    under its RosterClaim.
+    """
+    from django.contrib.auth import get_user_model
+
+    flight_ids = [flight_id for flight_id, _, _ in jobs]
+    flights = Flight.objects.select_related("plane_type", "origin_airport", "destination_airport").in_bulk(flight_ids)
+    pilots = Pilot.objects.in_bulk({i for _, pilot_ids, _ in jobs for i in pilot_ids})
+    cabin_crew = CabinCrew.objects.in_bulk({i for _, _, cabin_ids in jobs for i in cabin_ids})
+    tickets_by_flight = _tickets_by_flight(flight_ids)
+    user = get_user_model().objects.filter(pk=user_id).first() if user_id else None
+    # Crew were checked against the whole batch up front; the shard only
+    # needs a schedule to book into, not a fresh look at the database
+    schedule = CrewSchedule()
+
+    results = []
+    for flight_id, pilot_ids, cabin_ids in jobs:
+        flight = flights[flight_id]
+        try:
+            roster = _roster_flight(
+                flight, tickets_by_flight.get(flight_id, []), backend, user, schedule=schedule,
+                preselected=([pilots[i] for i in pilot_ids], [cabin_crew[i] for i in cabin_ids]), seating=seating,
+            )
+        except (ValueError, RosterInProgress) as exc:
+            results.append(_error_result(flight.id, flight.flight_number, str(exc)))
+        else:
+            results.append(_ok_result(flight, roster))
+    return results
+
+
+def _init_roster_worker() -> None:
+    import django
+
+    django.setup()
+
+
+def generate_rosters_parallel(
+    flight_ids: Iterable[int] = None,
+    date_from: date = None,
+    date_to: date = None,
+    backend: str = "sql",
+    user=None,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    seating: str = "python",
+) -> Dict:
+    """
+    Generate rosters for many flights on a pool of worker processes.
+
+    Crew are chosen in this process, flight by flight in departure order
+    against one CrewSchedule, so shards can never double-book anyone.
+    Seat assignment, payload building and persistence - the bulk of the
+    work - are then sharded across `workers` processes (default: one per
+    CPU) in chunks of `chunk_size` flights. Every flight is written in its
+    own transaction while holding its RosterClaim, so a flight that is
+    being generated elsewhere is reported as an error rather than rostered
+    twice.
+
+    Returns:
+        The same report as generate_rosters(), results in departure order
+
+    Raises:
+        ValueError: If neither flight ids nor a date range are given
+    """
+    flight_ids = list(flight_ids) if flight_ids else None
+    flights = _flights_for_batch(flight_ids, date_from, date_to)
+    results = _missing_results(flight_ids, flights)
+
+    pool = CrewPool.load(f.plane_type_id for f in flights)
+    schedule = _batch_schedule(flights)
+    jobs: List[Tuple[int, List[int], List[int]]] = []
+    for flight in flights:
+        try:
+            if flight.plane_type_id is None:
+                raise ValueError(f"Flight {flight.flight_number} has no plane type assigned")
+            pilots = _select_pilots(flight, pool=pool, schedule=schedule)
+            cabin_crew = _select_cabin_crew(flight, pool=pool, schedule=schedule)
+        except ValueError as exc:
+            results.append(_error_result(flight.id, flight.flight_number, str(exc)))
+            continue
+        for pilot in pilots:
+            schedule.book(pilot_key(pilot.id), flight.departure_time, flight.arrival_time)
+        for crew in cabin_crew:
+            schedule.book(cabin_key(crew.id), flight.departure_time, flight.arrival_time)
+        jobs.append((flight.id, [p.id for p in pilots], [c.id for c in cabin_crew]))
+
+    workers = workers or os.cpu_count() or 1
+    user_id = user.pk if user is not None and getattr(user, "is_authenticated", False) else None
+    if workers <= 1 or len(jobs) <= 1:
+        results.extend(_roster_shard(jobs, backend, user_id, seating))
+    else:
+        # Several chunks per worker keeps the pool busy when flights differ in size
+        chunk_size = chunk_size or max(1, -(-len(jobs) // (workers * 4)))
+        chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+        # Forked workers must open their own connections, not share ours
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_roster_worker) as executor:
+            shards = executor.map(
+                _roster_shard, chunks, [backend] * len(chunks), [user_id] * len(chunks), [seating] * len(chunks),
+            )
+            for shard_results in shards:
+                results.extend(shard_results)
+
+    order = {f.id: i for i, f in enumerate(flights)}
+    results.sort(key=lambda r: order.get(r["flight_id"], -1))
+    return _batch_report(results)
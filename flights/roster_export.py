@@ -0,0 +1,225 @@
+from datetime import date, datetime, time
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Max
+from django.utils import timezone
+import csv
+import json
+
+from .models import Roster
+from .roster_store import get_roster_storage
+
+# Rows fetched per round trip when streaming passenger manifests
+EXPORT_CHUNK_SIZE = 2000
+# Approximate size of the chunks handed to the response
+BUFFER_SIZE = 64 * 1024
+
+CREW_FIELDS = (
+    "crew_type", "assigned_role",
+    "pilot__code", "pilot__first_name", "pilot__last_name",
+    "cabin_crew__code", "cabin_crew__first_name", "cabin_crew__last_name",
+)
+PASSENGER_FIELDS = (
+    "seat_number", "seat_type",
+    "passenger__first_name", "passenger__last_name", "passenger__email", "passenger__passport_number",
+)
+CSV_COLUMNS = (
+    "roster_id", "flight_number", "origin", "destination", "departure",
+    "record", "type", "code", "name", "role", "seat", "seat_type", "email", "passport",
+)
+
+
+def export_rosters(roster_ids: Iterable[int] = None, date_from: date = None, date_to: date = None):
+    """
+    Rosters to export, with their flight and airports joined in.
+
+    Either explicit `roster_ids`, or the latest roster of every flight
+    departing between `date_from` and `date_to` (inclusive).
+
+    Raises:
+        ValueError: If neither roster ids nor a date is given
+    """
+    qs = Roster.objects.select_related("flight__origin_airport", "flight__destination_airport")
+    if roster_ids is not None:
+        return qs.filter(id__in=roster_ids).order_by("id")
+    if date_from is None and date_to is None:
+        raise ValueError("roster ids or a date range is required")
+    tz = timezone.get_current_timezone()
+    in_range = Roster.objects.all()
+    if date_from is not None:
+        in_range = in_range.filter(flight__departure_time__gte=timezone.make_aware(datetime.combine(date_from, time.min), tz))
+    if date_to is not None:
+        in_range = in_range.filter(flight__departure_time__lte=timezone.make_aware(datetime.combine(date_to, time.max), tz))
+    latest = in_range.order_by().values("flight_id").annotate(latest=Max("id")).values("latest")
+    return qs.filter(id__in=latest).order_by("flight__departure_time", "id")
+
+
+def _header(roster: Roster) -> Dict:
+    flight = roster.flight
+    return {
+        "roster_id": roster.id,
+        "flight": {
+            "flight_number": flight.flight_number,
+            "origin": flight.origin_airport.code if flight.origin_airport else None,
+            "destination": flight.destination_airport.code if flight.destination_airport else None,
+            "departure": flight.departure_time.isoformat() if flight.departure_time else None,
+            "arrival": flight.arrival_time.isoformat() if flight.arrival_time else None,
+        },
+        "backend": roster.backend,
+        "created_at": roster.created_at.isoformat(),
+    }
+
+
+def _crew_record(crew_type: str, member: Optional[Dict], role: str) -> Optional[Dict]:
+    if not member:
+        return None
+    return {
+        "type": crew_type,
+        "code": member["code"],
+        "name": f"{member['first_name']} {member['last_name']}",
+        "role": role,
+    }
+
+
+def _passenger_record(passenger: Dict, seat_number: Optional[str], seat_type: str) -> Dict:
+    return {
+        "name": f"{passenger['first_name']} {passenger['last_name']}",
+        "seat": seat_number,
+        "seat_type": seat_type,
+        "email": passenger["email"],
+        "passport": passenger["passport_number"],
+    }
+
+
+def _prefixed(row: Dict, prefix: str) -> Dict:
+    return {key[len(prefix):]: value for key, value in row.items() if key.startswith(prefix)}
+
+
+def roster_records(roster: Roster) -> Tuple[Iterator[Dict], Iterator[Dict]]:
+    """
+    Crew and passenger export records of a roster, produced lazily.
+
+    SQL rosters cost one query for the crew and one streamed query for the
+    passengers, each joining in the people they reference; document-backed
+    rosters are read from their document without touching the database.
+    """
+    document = get_roster_storage(roster.backend).read(roster)
+    if document is not None:
+        crew = (
+            _crew_record(a["crew_type"], a["pilot"] if a["crew_type"] == "pilot" else a["cabin_crew"], a["assigned_role"])
+            for a in document["crew_assignments"]
+        )
+        passengers = (
+            _passenger_record(a["passenger"], a["seat_number"], a["seat_type"])
+            for a in document["passenger_assignments"]
+        )
+    else:
+        crew = (
+            _crew_record(row["crew_type"], _prefixed(row, f"{'pilot' if row['crew_type'] == 'pilot' else 'cabin_crew'}__"),
+                         row["assigned_role"])
+            for row in roster.crew_assignments.order_by("id").values(*CREW_FIELDS)
+        )
+        passengers = (
+            _passenger_record(_prefixed(row, "passenger__"), row["seat_number"], row["seat_type"])
+            for row in roster.passenger_assignments.filter(passenger__isnull=False)
+            .order_by("id").values(*PASSENGER_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+    return (record for record in crew if record and record["code"]), passengers
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, cls=DjangoJSONEncoder)
+
+
+def _json_roster(roster: Roster) -> Iterator[str]:
+    header = _dumps(_header(roster))
+    crew, passengers = roster_records(roster)
+    yield header[:-1] + ', "crew": ['
+    for i, record in enumerate(crew):
+        yield ("," if i else "") + _dumps(record)
+    yield '], "passengers": ['
+    for i, record in enumerate(passengers):
+        yield ("," if i else "") + _dumps(record)
+    yield "]}"
+
+
+def stream_json(rosters, single: bool = False) -> Iterator[str]:
+    """One JSON object for a single roster, or {"rosters": [...]}."""
+    if single:
+        for roster in rosters.iterator():
+            yield from _json_roster(roster)
+        return
+    yield '{"rosters": ['
+    for i, roster in enumerate(rosters.iterator()):
+        if i:
+            yield ","
+        yield from _json_roster(roster)
+    yield "]}"
+
+
+def stream_ndjson(rosters, single: bool = False) -> Iterator[str]:
+    """One line per roster, crew member and passenger, tagged by ``record``."""
+    for roster in rosters.iterator():
+        yield _dumps({"record": "roster", **_header(roster)}) + "\n"
+        crew, passengers = roster_records(roster)
+        for record in crew:
+            yield _dumps({"record": "crew", "roster_id": roster.id, **record}) + "\n"
+        for record in passengers:
+            yield _dumps({"record": "passenger", "roster_id": roster.id, **record}) + "\n"
+
+
+class _Echo:
+    """File-like object handing back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rosters, single: bool = False) -> Iterator[str]:
+    """One row per crew member and passenger, with the roster's flight repeated on each row."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for roster in rosters.iterator():
+        flight = _header(roster)["flight"]
+        prefix = [roster.id, flight["flight_number"], flight["origin"], flight["destination"], flight["departure"]]
+        crew, passengers = roster_records(roster)
+        for record in crew:
+            yield writer.writerow(prefix + ["crew", record["type"], record["code"], record["name"], record["role"],
+                                            "", "", "", ""])
+        for record in passengers:
+            yield writer.writerow(prefix + ["passenger", "", "", record["name"], "", record["seat"],
+                                            record["seat_type"], record["email"], record["passport"]])
+
+
+EXPORT_FORMATS = {
+    "json": ("application/json", stream_json),
+    "ndjson": ("application/x-ndjson", stream_ndjson),
+    "csv": ("text/csv", stream_csv),
+}
+
+
+def _buffered(pieces: Iterator[str]) -> Iterator[str]:
+    """Join small pieces into chunks of about BUFFER_SIZE characters."""
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= BUFFER_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream_export(rosters, fmt: str, single: bool = False) -> Tuple[str, Iterator[str]]:
+    """
+    Content type and lazily produced body of an export.
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    try:
+        content_type, stream = EXPORT_FORMATS[fmt]
+    except KeyError:
+        raise ValueError(f"Unknown export format '{fmt}'; use one of {', '.join(EXPORT_FORMATS)}")
+    return content_type, _buffered(stream(rosters, single=single))
@@ -0,0 +1,209 @@
+from datetime import timedelta
+from threading import Event, Thread
+from time import monotonic, sleep
+from typing import Callable, Dict, Iterator, Optional
+from django.db import close_old_connections, connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+import logging
+import os
+import socket
+
+from .models import Flight, RosterJob
+from .roster_engine import RosterInProgress, generate_roster, generate_rosters
+
+logger = logging.getLogger(__name__)
+
+# A running job's worker refreshes heartbeat_at this often...
+HEARTBEAT_INTERVAL = 30.0
+# ...so a running job it hasn't refreshed for this long was left behind by a dead worker
+JOB_TIMEOUT = timedelta(minutes=5)
+# Live workers put jobs abandoned by dead ones back in the queue this often
+REQUEUE_INTERVAL = JOB_TIMEOUT / 2
+FINISHED_STATUSES = ("succeeded", "failed")
+
+
+def enqueue_roster_job(kind: str, params: Dict, user=None) -> RosterJob:
+    """
+    Queue a roster generation.
+
+    `params` are generate_roster() arguments for 'single' jobs and
+    generate_rosters() arguments for 'batch' jobs (dates as YYYY-MM-DD).
+    """
+    if kind not in dict(RosterJob.KIND_CHOICES):
+        raise ValueError(f"Unknown roster job kind '{kind}'")
+    return RosterJob.objects.create(
+        kind=kind,
+        params=params,
+        total=1 if kind == "single" else 0,
+        created_by=user if user and getattr(user, "is_authenticated", False) else None,
+    )
+
+
+def claim_next_job(worker: str) -> Optional[RosterJob]:
+    """
+    Take the oldest queued job for `worker`, or None if the queue is empty.
+
+    The claim is a conditional UPDATE (queued -> running), so two workers
+    polling at the same time can never both take the same job.
+    """
+    candidates = RosterJob.objects.filter(status="queued").order_by("id").values_list("id", flat=True)[:10]
+    for job_id in candidates:
+        now = timezone.now()
+        claimed = RosterJob.objects.filter(id=job_id, status="queued").update(
+            status="running", worker=worker, started_at=now, heartbeat_at=now,
+        )
+        if claimed:
+            return RosterJob.objects.select_related("created_by").get(id=job_id)
+    return None
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Put jobs whose worker died mid-run back in the queue; returns how many.
+
+    A job is stale when its heartbeat is older than JOB_TIMEOUT, however
+    long ago it started, so a long batch whose worker is alive stays put.
+    """
+    cutoff = timezone.now() - JOB_TIMEOUT
+    return RosterJob.objects.filter(status="running").filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+    ).update(status="queued", worker="", started_at=None, heartbeat_at=None, progress=0)
+
+
+class JobHeartbeat(Thread):
+    """
+    Refreshes a job's heartbeat_at every HEARTBEAT_INTERVAL seconds while
+    it runs, covering stages that report no progress (crew optimisation,
+    pairing search).
+    """
+
+    def __init__(self, job_id: int, interval: float = HEARTBEAT_INTERVAL):
+        super().__init__(name=f"roster-job-{job_id}-heartbeat", daemon=True)
+        self.job_id = job_id
+        self.interval = interval
+        self._stopped = Event()
+
+    def run(self) -> None:
+        try:
+            while not self._stopped.wait(self.interval):
+                RosterJob.objects.filter(id=self.job_id, status="running").update(heartbeat_at=timezone.now())
+        finally:
+            # Connections are per thread; don't leave this one open
+            connections.close_all()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+def _run_single(job: RosterJob) -> None:
+    params = job.params
+    roster = generate_roster(
+        flight_id=params["flight_id"],
+        backend=params.get("backend", "sql"),
+        user=job.created_by,
+        pilot_ids=params.get("pilot_ids") or None,
+        cabin_crew_ids=params.get("cabin_crew_ids") or None,
+        seating=params.get("seating", "python"),
+    )
+    job.roster = roster
+    job.result = {"roster_id": roster.id, "timings": roster.stage_timings}
+    job.progress = job.total = 1
+
+
+def _run_batch(job: RosterJob) -> None:
+    params = job.params
+
+    def report_progress(done: int, total: int) -> None:
+        RosterJob.objects.filter(id=job.id).update(progress=done, total=total, heartbeat_at=timezone.now())
+
+    report = generate_rosters(
+        flight_ids=params.get("flight_ids") or None,
+        date_from=parse_date(params["date_from"]) if params.get("date_from") else None,
+        date_to=parse_date(params["date_to"]) if params.get("date_to") else None,
+        backend=params.get("backend", "sql"),
+        user=job.created_by,
+        optimize=params.get("optimize", False),
+        objective=params.get("objective", "min_crew"),
+        time_budget=params.get("time_budget", 10.0),
+        progress=report_progress,
+        seating=params.get("seating", "python"),
+        pairings=params.get("pairings", False),
+    )
+    job.result = report
+    job.progress = job.total = len(report["results"])
+
+
+def run_job(job: RosterJob) -> RosterJob:
+    """Run a claimed job and record how it ended; errors fail the job rather than the worker."""
+    heartbeat = JobHeartbeat(job.id)
+    heartbeat.start()
+    try:
+        if job.kind == "single":
+            _run_single(job)
+        else:
+            _run_batch(job)
+        job.status = "succeeded"
+    except Flight.DoesNotExist:
+        job.status, job.error = "failed", "flight not found"
+    except (ValueError, RosterInProgress) as exc:
+        job.status, job.error = "failed", str(exc)
+    except Exception as exc:
+        logger.exception("Roster job %s crashed", job.id)
+        job.status, job.error = "failed", f"{type(exc).__name__}: {exc}"
+    finally:
+        heartbeat.stop()
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "error", "result", "roster", "progress", "total", "finished_at"])
+    return job
+
+
+def run_worker(once: bool = False, poll_interval: float = 1.0, max_jobs: Optional[int] = None) -> int:
+    """
+    Process queued jobs until stopped.
+
+    With `once` the worker exits as soon as the queue is empty; `max_jobs`
+    caps how many jobs it runs. Every REQUEUE_INTERVAL the worker also
+    requeues jobs whose worker stopped sending heartbeats. Returns the
+    number of jobs run.
+    """
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    ran = 0
+    next_requeue = 0.0
+    while max_jobs is None or ran < max_jobs:
+        close_old_connections()
+        if monotonic() >= next_requeue:
+            requeue_stale_jobs()
+            next_requeue = monotonic() + REQUEUE_INTERVAL.total_seconds()
+        job = claim_next_job(worker)
+        if job is None:
+            if once:
+                break
+            sleep(poll_interval)
+            continue
+        logger.info("Worker %s running roster job %s", worker, job.id)
+        run_job(job)
+        ran += 1
+    return ran
+
+
+def job_events(job_id: int, render: Callable[[RosterJob], str], interval: float = 0.5,
+               timeout: float = 300.0) -> Iterator[str]:
+    """
+    Server-sent events for a job: one ``data:`` message whenever its status
+    or progress changes, ending when the job finishes or after `timeout`
+    seconds.
+    """
+    deadline = monotonic() + timeout
+    last = None
+    while True:
+        job = RosterJob.objects.select_related("roster").get(id=job_id)
+        snapshot = (job.status, job.progress, job.total)
+        if snapshot != last:
+            last = snapshot
+            yield f"data: {render(job)}\n\n"
+        if job.status in FINISHED_STATUSES or monotonic() >= deadline:
+            return
+        sleep(interval)
@@ -0,0 +1,189 @@
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from .models import CabinCrew, Flight, Passenger, Pilot, Roster
+from .roster_store import get_roster_storage
+from .seat_map import CABIN_CLASSES, CompiledSeatMap, get_seat_map
+
+# Version of the compact payload written by the roster engine. Payloads
+# without a version are the verbose format older rosters were stored in.
+PAYLOAD_VERSION = 2
+
+INFANT_FLAG = 2
+
+# (passenger id, seat index or - for seats missing from the map - label, flags)
+PassengerEntry = Tuple[int, Union[int, str, None], int]
+
+
+def passenger_entries(passenger_assignments: List[Dict], seat_map: CompiledSeatMap) -> List[PassengerEntry]:
+    """Compact entries for seat assignments; flags hold the cabin class index and INFANT_FLAG."""
+    entries = []
+    for a in passenger_assignments:
+        seat = a["seat_number"]
+        if seat is not None:
+            seat = seat_map.index.get(seat, seat)
+        flags = CABIN_CLASSES.index(a["seat_type"]) if a["seat_type"] in CABIN_CLASSES else 1
+        entries.append((a["passenger"].id, seat, flags | (INFANT_FLAG if a["is_infant"] else 0)))
+    return entries
+
+
+def compact_payload(flight: Flight, backend: str, pilot_ids: List[int], cabin_crew_ids: List[int],
+                    entries: List[PassengerEntry], remaining: Dict[str, List[str]],
+                    seat_map: CompiledSeatMap) -> Dict:
+    """
+    The stored form of a roster.
+
+    Crew and passengers are referenced by id, seats by their index in the
+    compiled seat map (`layout` identifies that map) and the free seats
+    are one bitset in hex. Names and labels are looked up again by
+    expand_payload() when a client asks for them.
+    """
+    return {
+        "v": PAYLOAD_VERSION,
+        "flight": flight.flight_number,
+        "backend": backend,
+        "layout": seat_map.fingerprint,
+        "pilots": list(pilot_ids),
+        "cabin_crew": list(cabin_crew_ids),
+        "passengers": [entry[0] for entry in entries],
+        "seats": [entry[1] for entry in entries],
+        "flags": [entry[2] for entry in entries],
+        "free": format(seat_map.free_bits(remaining), "x"),
+    }
+
+
+def is_compact(payload: Optional[Dict]) -> bool:
+    return bool(payload) and payload.get("v") == PAYLOAD_VERSION
+
+
+def decode_passengers(payload: Dict) -> List[PassengerEntry]:
+    return list(zip(payload["passengers"], payload["seats"], payload["flags"]))
+
+
+def decode_remaining(payload: Dict, seat_map: CompiledSeatMap) -> Dict[str, List[str]]:
+    return seat_map.remaining_from_bits(int(payload["free"] or "0", 16))
+
+
+def seat_label(seat: Union[int, str, None], seat_map: CompiledSeatMap) -> Optional[str]:
+    if isinstance(seat, int):
+        return seat_map.seats[seat].label if seat < len(seat_map.seats) else None
+    return seat
+
+
+def passenger_payload(passenger_assignments: List[Dict]) -> List[Dict]:
+    return [
+        {
+            "passenger_id": a["passenger"].id,
+            "name": f"{a['passenger'].first_name} {a['passenger'].last_name}",
+            "seat": a["seat_number"],
+            "seat_type": a["seat_type"],
+            "infant": a["is_infant"],
+        }
+        for a in passenger_assignments
+    ]
+
+
+def verbose_payload(flight_number: str, backend: str, pilots: List[Pilot], cabin_crew: List[CabinCrew],
+                    passenger_assignments: List[Dict], remaining_pools: Dict[str, List[str]]) -> Dict:
+    """Fully expanded roster: crew and passengers with names, free seats as label lists."""
+    crew_payload = [
+        {
+            "type": "pilot",
+            "code": p.code,
+            "name": f"{p.first_name} {p.last_name}",
+            "seniority": p.seniority,
+        }
+        for p in pilots
+    ] + [
+        {
+            "type": "cabin",
+            "code": c.code,
+            "name": f"{c.first_name} {c.last_name}",
+            "role": c.role,
+            "seniority": c.seniority,
+        }
+        for c in cabin_crew
+    ]
+
+    return {
+        "flight": flight_number,
+        "backend": backend,
+        "crew": crew_payload,
+        "passengers": passenger_payload(passenger_assignments),
+        "remaining_seats": remaining_pools,
+    }
+
+
+def expand_payload(roster: Roster) -> Dict:
+    """The verbose form of a roster's payload (see expand_payloads)."""
+    return expand_payloads([roster])[roster.id]
+
+
+def expand_payloads(rosters: Iterable[Roster]) -> Dict[int, Dict]:
+    """
+    The verbose form of each roster's payload, by roster id.
+
+    Compact payloads cost one query each for pilots, cabin crew and
+    passengers however many rosters are expanded (plus the plane type
+    when a flight's is not loaded); verbose payloads of older rosters are
+    returned as stored. Crew or passengers deleted since are left out. If
+    a plane's seat layout changed after generation, seats are read from
+    the stored assignments.
+    """
+    expanded, compact = {}, []
+    for roster in rosters:
+        payload = roster.payload or {}
+        if is_compact(payload):
+            compact.append(roster)
+        else:
+            expanded[roster.id] = payload
+    if not compact:
+        return expanded
+
+    pilots = Pilot.objects.in_bulk({i for roster in compact for i in roster.payload["pilots"]})
+    cabin_crew = CabinCrew.objects.in_bulk({i for roster in compact for i in roster.payload["cabin_crew"]})
+    passengers = Passenger.objects.in_bulk({i for roster in compact for i in roster.payload["passengers"]})
+    for roster in compact:
+        payload = roster.payload
+        seat_map = get_seat_map(roster.flight.plane_type)
+        entries = decode_passengers(payload)
+        if payload.get("layout") == seat_map.fingerprint:
+            seats = {passenger_id: seat_label(seat, seat_map) for passenger_id, seat, _ in entries}
+            remaining = decode_remaining(payload, seat_map)
+        else:
+            # The plane's layout changed since, so the indices no longer resolve:
+            # use the stored assignments and free whatever they do not occupy
+            seats = _assigned_seats(roster)
+            pools = seat_map.new_pools()
+            for label in seats.values():
+                if label:
+                    for pool in pools.values():
+                        if pool.take(label):
+                            break
+            remaining = {cabin_class: pool.remaining() for cabin_class, pool in pools.items()}
+
+        assignments = [
+            {
+                "passenger": passengers[passenger_id],
+                "seat_number": seats.get(passenger_id),
+                "seat_type": CABIN_CLASSES[flags & 1],
+                "is_infant": bool(flags & INFANT_FLAG),
+            }
+            for passenger_id, _, flags in entries
+            if passenger_id in passengers
+        ]
+        expanded[roster.id] = verbose_payload(
+            payload["flight"],
+            payload["backend"],
+            [pilots[i] for i in payload["pilots"] if i in pilots],
+            [cabin_crew[i] for i in payload["cabin_crew"] if i in cabin_crew],
+            assignments,
+            remaining,
+        )
+    return expanded
+
+
+def _assigned_seats(roster: Roster) -> Dict[int, Optional[str]]:
+    document = get_roster_storage(roster.backend).read(roster)
+    if document is not None:
+        return {a["passenger"]["id"]: a["seat_number"] for a in document["passenger_assignments"]}
+    return dict(roster.passenger_assignments.values_list("passenger_id", "seat_number"))
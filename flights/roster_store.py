@@ -0,0 +1,178 @@
+from threading import Lock, local
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+import json
+import sqlite3
+
+from .models import Flight, Roster, RosterCrewAssignment, RosterPassengerAssignment
+
+
+class RosterDocumentStore:
+    """
+    Embedded, file-backed document store for rosters.
+
+    Every roster is one JSON document keyed by (flight id, version), where
+    the version is the id of the Roster row it belongs to. Documents live
+    in a SQLite file of their own, outside the Django database, so reading
+    a whole roster is a single primary-key lookup rather than a join over
+    the assignment tables. Connections are per thread and the file runs in
+    WAL mode, so worker processes can write while the API reads.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS roster_documents ("
+                " flight_id INTEGER NOT NULL,"
+                " version INTEGER NOT NULL,"
+                " body TEXT NOT NULL,"
+                " PRIMARY KEY (flight_id, version)"
+                ") WITHOUT ROWID"
+            )
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS roster_documents_version ON roster_documents (version)")
+            self._local.conn = conn
+        return conn
+
+    def put(self, flight_id: int, version: int, document: Dict) -> None:
+        """Store (or replace) the document for a flight's roster version."""
+        body = json.dumps(document, cls=DjangoJSONEncoder)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO roster_documents (flight_id, version, body) VALUES (?, ?, ?)",
+            (flight_id, version, body),
+        )
+
+    def get(self, version: int) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT body FROM roster_documents WHERE version = ?", (version,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def latest(self, flight_id: int) -> Optional[Dict]:
+        """The newest roster document of a flight."""
+        row = self._connection().execute(
+            "SELECT body FROM roster_documents WHERE flight_id = ? ORDER BY version DESC LIMIT 1", (flight_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def versions(self, flight_id: int) -> List[int]:
+        rows = self._connection().execute(
+            "SELECT version FROM roster_documents WHERE flight_id = ? ORDER BY version", (flight_id,)
+        )
+        return [version for (version,) in rows]
+
+    def delete(self, version: int) -> None:
+        self._connection().execute("DELETE FROM roster_documents WHERE version = ?", (version,))
+
+
+_stores: Dict[str, RosterDocumentStore] = {}
+_stores_lock = Lock()
+
+
+def get_document_store() -> RosterDocumentStore:
+    """The store at settings.ROSTER_DOCUMENT_STORE, one instance per path and process."""
+    path = str(settings.ROSTER_DOCUMENT_STORE)
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(path, RosterDocumentStore(path))
+    return store
+
+
+class SQLRosterStorage:
+    """Rosters live in the Roster / assignment tables and are read through RosterSerializer."""
+
+    name = "sql"
+
+    def save(self, roster: Roster, flight: Flight, crew_rows: List[RosterCrewAssignment],
+             passenger_rows: List[RosterPassengerAssignment]) -> None:
+        RosterCrewAssignment.objects.bulk_create(crew_rows)
+        RosterPassengerAssignment.objects.bulk_create(passenger_rows)
+
+    def read(self, roster: Roster) -> Optional[Dict]:
+        return None
+
+    def forget(self, roster: Roster) -> None:
+        pass
+
+
+class DocumentRosterStorage:
+    """
+    Rosters live as one document in the RosterDocumentStore.
+
+    The Roster row and its crew assignments are still written to SQL: they
+    are what the crew duty index and the roster list are built from. The
+    passenger assignments - the bulk of a roster - only exist in the
+    document, which is built with RosterSerializer's nested serializers
+    and so has the same fields as an 'sql' roster. Documents are written
+    and deleted when the surrounding transaction commits.
+    """
+
+    name = "nosql"
+
+    def save(self, roster: Roster, flight: Flight, crew_rows: List[RosterCrewAssignment],
+             passenger_rows: List[RosterPassengerAssignment]) -> None:
+        from . import prefetch_plans
+        from .serializers import RosterCrewAssignmentSerializer, RosterPassengerAssignmentSerializer, RosterSerializer
+
+        RosterCrewAssignment.objects.bulk_create(crew_rows)
+        # Reload the people through the serializers' prefetch plans, so the
+        # nested crew and passenger objects cost a query per relation, not per row
+        pilots = prefetch_plans.pilots().in_bulk({row.pilot_id for row in crew_rows if row.pilot_id})
+        cabin_crew = prefetch_plans.cabin_crew().in_bulk({row.cabin_crew_id for row in crew_rows if row.cabin_crew_id})
+        passengers = prefetch_plans.passengers().in_bulk({row.passenger_id for row in passenger_rows})
+        for row in crew_rows:
+            row.pilot = pilots.get(row.pilot_id)
+            row.cabin_crew = cabin_crew.get(row.cabin_crew_id)
+        for row in passenger_rows:
+            # Never saved to SQL: no id, assigned with the roster
+            row.passenger = passengers[row.passenger_id]
+            row.assigned_at = roster.created_at
+
+        fields = RosterSerializer().fields
+        document = {
+            "id": roster.id,
+            "flight": fields["flight"].to_representation(flight),
+            "backend": roster.backend,
+            "payload": roster.payload,
+            "created_by": roster.created_by_id,
+            "created_at": fields["created_at"].to_representation(roster.created_at),
+            "crew_assignments": RosterCrewAssignmentSerializer(crew_rows, many=True).data,
+            "passenger_assignments": RosterPassengerAssignmentSerializer(passenger_rows, many=True).data,
+        }
+        # The document store is not part of the Django transaction: write
+        # only once the Roster row is committed, so a rollback leaves no orphan
+        transaction.on_commit(lambda: get_document_store().put(flight.id, document["id"], document))
+
+    def read(self, roster: Roster) -> Optional[Dict]:
+        return get_document_store().get(roster.id)
+
+    def forget(self, roster: Roster) -> None:
+        # Deferred like save(), so it runs after a save pending in the same
+        # transaction; the id is read now, as a deleted instance has none by then
+        version = roster.id
+        transaction.on_commit(lambda: get_document_store().delete(version))
+
+
+ROSTER_STORAGES = {storage.name: storage for storage in (SQLRosterStorage(), DocumentRosterStorage())}
+
+
+def get_roster_storage(backend: str):
+    """
+    Storage for a roster backend name.
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    try:
+        return ROSTER_STORAGES[backend]
+    except KeyError:
+        raise ValueError(f"Unknown roster backend '{backend}'; use one of {', '.join(ROSTER_STORAGES)}")
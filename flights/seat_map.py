@@ -0,0 +1,471 @@
+from copy import deepcopy
+from threading import Lock
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import re
+import zlib
+
+SEAT_LABEL_RE = re.compile(r'^(\d+)([A-Z]+)$')
+
+CABIN_CLASSES = ("business", "economy")
+
+# Seat pool implementations: "python" (SeatPool) or "numpy" (NumpySeatPool)
+SEATING_ENGINES = ("python", "numpy")
+
+# Aisle positions (number of columns before each aisle) for layouts whose
+# column letters are contiguous, keyed by seats abreast.
+STANDARD_AISLES = {
+    3: (1,),
+    4: (2,),
+    5: (2,),
+    6: (3,),
+    7: (2, 5),
+    8: (2, 6),
+    9: (3, 6),
+    10: (3, 7),
+}
+
+
+def parse_seat_label(label: str) -> Optional[Tuple[int, str]]:
+    """Split a seat label such as '23C' into (23, 'C'); None if it does not match."""
+    match = SEAT_LABEL_RE.match(label)
+    if not match:
+        return None
+    return int(match.group(1)), match.group(2)
+
+
+class SeatPool:
+    """
+    Free-seat state for one cabin class.
+
+    Seat labels are parsed once into rows (ordered by row number) and
+    columns (ordered by letter). Each row keeps its free seats as an
+    integer bitset, so taking a given seat, the first free seat or a run
+    of adjacent free seats are bit operations instead of list scans.
+    Labels that do not look like '<row><letter>' get a row of their own
+    after the numbered rows.
+
+    When `columns` (the cabin's column letters in order) and
+    `aisles_after` (letters with an aisle to their right) are given,
+    adjacent runs never span an aisle or a missing seat.
+    """
+
+    def __init__(self, labels: Iterable[str], columns: Iterable[str] = None, aisles_after: Iterable[str] = ()):
+        rows: Dict[Tuple[int, object], List[str]] = {}
+        seen = set()
+        for position, label in enumerate(labels):
+            if label in seen:
+                continue
+            seen.add(label)
+            parsed = parse_seat_label(label)
+            key = (0, parsed[0]) if parsed else (1, position)
+            rows.setdefault(key, []).append(label)
+
+        self._rows: List[List[str]] = []
+        self._index: Dict[str, Tuple[int, int]] = {}
+        for key in sorted(rows):
+            row_labels = sorted(rows[key])
+            row = len(self._rows)
+            self._rows.append(row_labels)
+            for bit, label in enumerate(row_labels):
+                self._index[label] = (row, bit)
+        self._free: List[int] = [(1 << len(row_labels)) - 1 for row_labels in self._rows]
+        self._joinable: List[int] = [
+            _joinable_mask(row_columns, columns, aisles_after) for row_columns in self._rows
+        ]
+        self._free_count = len(self._index)
+        # Every row before this one is known to be full
+        self._first_row = 0
+
+    def __len__(self) -> int:
+        return self._free_count
+
+    def copy(self) -> "SeatPool":
+        """Independent free-seat state sharing this pool's parsed layout."""
+        clone = SeatPool.__new__(SeatPool)
+        clone._rows = self._rows
+        clone._index = self._index
+        clone._joinable = self._joinable
+        clone._free = list(self._free)
+        clone._free_count = self._free_count
+        clone._first_row = self._first_row
+        return clone
+
+    def __contains__(self, label: str) -> bool:
+        position = self._index.get(label)
+        return position is not None and bool(self._free[position[0]] >> position[1] & 1)
+
+    def take(self, label: str) -> bool:
+        """Mark a specific seat as taken; False if it is unknown or already taken."""
+        if label not in self:
+            return False
+        row, bit = self._index[label]
+        self._free[row] &= ~(1 << bit)
+        self._free_count -= 1
+        return True
+
+    def release(self, label: str) -> bool:
+        """Mark a specific seat as free again; False if it is unknown or already free."""
+        position = self._index.get(label)
+        if position is None or label in self:
+            return False
+        row, bit = position
+        self._free[row] |= 1 << bit
+        self._free_count += 1
+        self._first_row = min(self._first_row, row)
+        return True
+
+    def restrict(self, labels: Iterable[str]) -> None:
+        """Make exactly `labels` the free seats; every other seat is taken. Unknown labels are ignored."""
+        free = [0] * len(self._rows)
+        count = 0
+        for label in labels:
+            position = self._index.get(label)
+            if position is not None and not free[position[0]] >> position[1] & 1:
+                free[position[0]] |= 1 << position[1]
+                count += 1
+        self._free = free
+        self._free_count = count
+        self._first_row = 0
+
+    def take_first(self) -> Optional[str]:
+        """Take the first free seat in row/column order, or None if the pool is full."""
+        row = self._next_free_row(self._first_row)
+        if row is None:
+            return None
+        mask = self._free[row]
+        bit = (mask & -mask).bit_length() - 1
+        self._free[row] = mask & ~(1 << bit)
+        self._free_count -= 1
+        return self._rows[row][bit]
+
+    def take_first_n(self, count: int) -> List[str]:
+        """Take up to `count` free seats in row/column order."""
+        taken: List[str] = []
+        row = self._next_free_row(self._first_row) if count > 0 else None
+        while row is not None:
+            mask = self._free[row]
+            while mask and len(taken) < count:
+                low = mask & -mask
+                mask ^= low
+                taken.append(self._rows[row][low.bit_length() - 1])
+            self._free[row] = mask
+            if len(taken) == count:
+                break
+            row = self._next_free_row(row + 1)
+        self._free_count -= len(taken)
+        return taken
+
+    def take_adjacent(self, count: int) -> List[str]:
+        """
+        Take `count` seats in the same row, preferring neighbouring columns.
+
+        Returns the first run of `count` neighbouring free seats (same
+        block of the row, no aisle in between); failing that,
+        the first `count` free seats of the first row that has enough of them.
+        Returns an empty list (taking nothing) if no row can hold the group.
+        """
+        if count <= 0 or count > self._free_count:
+            return []
+        fallback_row = None
+        row = self._next_free_row(self._first_row)
+        while row is not None:
+            mask = self._free[row]
+            joinable = self._joinable[row]
+            run = mask
+            for shift in range(1, count):
+                run &= (mask >> shift) & (joinable >> (shift - 1))
+            if run:
+                start = (run & -run).bit_length() - 1
+                return self._take_bits(row, ((1 << count) - 1) << start)
+            if fallback_row is None and bin(mask).count("1") >= count:
+                fallback_row = row
+            row = self._next_free_row(row + 1)
+        if fallback_row is None:
+            return []
+        mask = self._free[fallback_row]
+        bits = 0
+        for _ in range(count):
+            low = mask & -mask
+            bits |= low
+            mask ^= low
+        return self._take_bits(fallback_row, bits)
+
+    def remaining(self) -> List[str]:
+        """Free seat labels in row/column order."""
+        return [
+            label
+            for row, columns in enumerate(self._rows)
+            for bit, label in enumerate(columns)
+            if self._free[row] >> bit & 1
+        ]
+
+    def _next_free_row(self, start: int) -> Optional[int]:
+        free = self._free
+        row = start
+        while row < len(free) and not free[row]:
+            row += 1
+        if start == self._first_row:
+            self._first_row = row
+        return row if row < len(free) else None
+
+    def _take_bits(self, row: int, bits: int) -> List[str]:
+        self._free[row] &= ~bits
+        taken = [label for bit, label in enumerate(self._rows[row]) if bits >> bit & 1]
+        self._free_count -= len(taken)
+        return taken
+
+
+def _joinable_mask(row_columns: List[str], cabin_columns: Optional[Iterable[str]], aisles_after: Iterable[str]) -> int:
+    """Bit i is set when seat i and seat i+1 of a row sit side by side."""
+    if cabin_columns is None:
+        return (1 << max(len(row_columns) - 1, 0)) - 1
+    position = {column: i for i, column in enumerate(cabin_columns)}
+    aisles = set(aisles_after)
+    mask = 0
+    for i in range(len(row_columns) - 1):
+        left = parse_seat_label(row_columns[i])
+        right = parse_seat_label(row_columns[i + 1])
+        if not left or not right or left[1] in aisles:
+            continue
+        if left[1] in position and position.get(right[1]) == position[left[1]] + 1:
+            mask |= 1 << i
+    return mask
+
+
+def _generate_seat_labels(count: int, start_row: int = 1, seats_per_row: int = 6) -> List[str]:
+    letters = list("ABCDEF")
+    seats: List[str] = []
+    row = start_row
+    remaining = count
+    while remaining > 0:
+        for letter in letters[:seats_per_row]:
+            if remaining <= 0:
+                break
+            seats.append(f"{row}{letter}")
+            remaining -= 1
+        row += 1
+    return seats
+
+
+def _aisles_after(columns: List[str]) -> List[str]:
+    """
+    Column letters that have an aisle to their right.
+
+    Skipped letters mark aisles (business 'A C D F' is A | C D | F; 'I' is
+    never used so H-J is not a gap). Contiguous layouts fall back to the
+    usual arrangement for their width, e.g. 6 abreast is ABC | DEF.
+    """
+    def ordinal(letter: str) -> int:
+        value = ord(letter[-1]) - ord("A")
+        return value - 1 if letter[-1] > "I" else value
+
+    gaps = [
+        columns[i] for i in range(len(columns) - 1)
+        if len(columns[i]) == 1 and len(columns[i + 1]) == 1 and ordinal(columns[i + 1]) - ordinal(columns[i]) > 1
+    ]
+    if gaps:
+        return gaps
+    return [columns[i - 1] for i in STANDARD_AISLES.get(len(columns), ())]
+
+
+class Seat(NamedTuple):
+    index: int
+    label: str
+    row: Optional[int]
+    column: Optional[str]
+    cabin_class: str
+    is_window: bool
+    is_aisle: bool
+
+
+class CompiledSeatMap:
+    """
+    Parsed seat layout of one PlaneType.
+
+    Holds every seat with a stable index (business first, then economy, in
+    row/column order), its cabin class zone and window/aisle flags, plus
+    the column grid of each class. Build it through get_seat_map() so the
+    roster engine and the API share one cached copy per plane type.
+    """
+
+    def __init__(self, plane_type_id: int, zones: Dict[str, List[str]]):
+        self.plane_type_id = plane_type_id
+        self.seats: List[Seat] = []
+        self.index: Dict[str, int] = {}
+        self.columns: Dict[str, List[str]] = {}
+        self.aisles_after: Dict[str, List[str]] = {}
+        self.rows: Dict[str, List[int]] = {}
+        self._dict: Optional[Dict] = None
+        # The PlaneType fields the map was compiled from (see layout_source())
+        self.source: Optional[Tuple] = None
+
+        for cabin_class in CABIN_CLASSES:
+            labels = [label for label in dict.fromkeys(zones.get(cabin_class, [])) if label not in self.index]
+            parsed = [(label, parse_seat_label(label)) for label in labels]
+            columns = sorted({p[1] for _, p in parsed if p})
+            aisles = _aisles_after(columns)
+            self.columns[cabin_class] = columns
+            self.aisles_after[cabin_class] = aisles
+            self.rows[cabin_class] = sorted({p[0] for _, p in parsed if p})
+
+            window = {columns[0], columns[-1]} if columns else set()
+            aisle_seats = set(aisles) | {columns[columns.index(c) + 1] for c in aisles}
+            ordered = sorted(
+                enumerate(parsed),
+                key=lambda item: (0, item[1][1][0], item[1][1][1]) if item[1][1] else (1, item[0], ""),
+            )
+            for _, (label, p) in ordered:
+                seat = Seat(
+                    index=len(self.seats),
+                    label=label,
+                    row=p[0] if p else None,
+                    column=p[1] if p else None,
+                    cabin_class=cabin_class,
+                    is_window=bool(p) and p[1] in window,
+                    is_aisle=bool(p) and p[1] in aisle_seats,
+                )
+                self.index[label] = seat.index
+                self.seats.append(seat)
+
+        # Identifies the layout the seat indices refer to
+        self.fingerprint = zlib.crc32(
+            "|".join(f"{seat.cabin_class}:{seat.label}" for seat in self.seats).encode()
+        )
+        self._pools = {
+            cabin_class: SeatPool(self.labels(cabin_class), self.columns[cabin_class], self.aisles_after[cabin_class])
+            for cabin_class in CABIN_CLASSES
+        }
+
+    @classmethod
+    def from_plane_type(cls, plane) -> "CompiledSeatMap":
+        layout = plane.seat_layout or {}
+        zones = {
+            "business": list(layout.get("business", [])),
+            "economy": list(layout.get("economy", [])),
+        }
+        if not zones["business"] and plane.business_seats:
+            zones["business"] = _generate_seat_labels(plane.business_seats, start_row=1, seats_per_row=4)
+        if not zones["economy"] and plane.economy_seats:
+            zones["economy"] = _generate_seat_labels(plane.economy_seats, start_row=20, seats_per_row=6)
+        seat_map = cls(plane.id, zones)
+        seat_map.source = layout_source(plane)
+        return seat_map
+
+    def labels(self, cabin_class: str) -> List[str]:
+        return [seat.label for seat in self.seats if seat.cabin_class == cabin_class]
+
+    def new_pools(self, engine: str = "python") -> Dict[str, SeatPool]:
+        """
+        Fresh, fully free seat pool per cabin class.
+
+        `engine` "numpy" gives NumpySeatPools (same interface and choices),
+        which needs NumPy installed.
+
+        Raises:
+            ValueError: If the engine is unknown or NumPy is missing
+        """
+        if engine == "numpy":
+            try:
+                from .seat_numpy import numpy_pools
+            except ImportError:
+                raise ValueError("The numpy seating engine needs NumPy installed")
+            return numpy_pools(self)
+        if engine != "python":
+            raise ValueError(f"Unknown seating engine '{engine}'; use one of {', '.join(SEATING_ENGINES)}")
+        return {cabin_class: pool.copy() for cabin_class, pool in self._pools.items()}
+
+    def pools_from_remaining(self, remaining: Dict[str, List[str]], engine: str = "python") -> Dict[str, SeatPool]:
+        """Seat pools in the state a roster left them: only the `remaining` labels per class are free."""
+        pools = self.new_pools(engine)
+        for cabin_class, pool in pools.items():
+            pool.restrict(remaining.get(cabin_class, []))
+        return pools
+
+    def free_bits(self, remaining: Dict[str, List[str]]) -> int:
+        """Free seats as a bitset over seat indices (bit i set when seat i is free)."""
+        bits = 0
+        for labels in remaining.values():
+            for label in labels:
+                index = self.index.get(label)
+                if index is not None:
+                    bits |= 1 << index
+        return bits
+
+    def remaining_from_bits(self, bits: int) -> Dict[str, List[str]]:
+        """Inverse of free_bits(): free seat labels per cabin class, in seat index order."""
+        remaining: Dict[str, List[str]] = {cabin_class: [] for cabin_class in CABIN_CLASSES}
+        while bits:
+            low = bits & -bits
+            index = low.bit_length() - 1
+            bits ^= low
+            if index < len(self.seats):
+                seat = self.seats[index]
+                remaining[seat.cabin_class].append(seat.label)
+        return remaining
+
+    def to_dict(self) -> Dict:
+        """The map as plain data for the API; built once per compiled map, so treat it as read-only."""
+        if self._dict is None:
+            self._dict = self._build_dict()
+        return self._dict
+
+    def _build_dict(self) -> Dict:
+        return {
+            "plane_type": self.plane_type_id,
+            "classes": {
+                cabin_class: {
+                    "rows": self.rows[cabin_class],
+                    "columns": self.columns[cabin_class],
+                    "aisles_after": self.aisles_after[cabin_class],
+                }
+                for cabin_class in CABIN_CLASSES
+            },
+            "seats": [
+                {
+                    "index": seat.index,
+                    "label": seat.label,
+                    "row": seat.row,
+                    "column": seat.column,
+                    "class": seat.cabin_class,
+                    "window": seat.is_window,
+                    "aisle": seat.is_aisle,
+                }
+                for seat in self.seats
+            ],
+        }
+
+
+_seat_map_cache: Dict[int, CompiledSeatMap] = {}
+_seat_map_lock = Lock()
+
+
+def layout_source(plane) -> Tuple:
+    """The PlaneType fields a compiled map depends on, copied so later edits to `plane` do not change them."""
+    return deepcopy(plane.seat_layout), plane.business_seats, plane.economy_seats
+
+
+def get_seat_map(plane) -> CompiledSeatMap:
+    """
+    Compiled seat map for a PlaneType, cached per process.
+
+    The cache entry is dropped by invalidate_seat_map(), which the
+    PlaneType save/delete signals call. Those only fire in the process
+    that saved the plane, so the cached map is also recompiled whenever
+    the layout fields of the `plane` passed in differ from the ones it
+    was compiled from.
+    """
+    seat_map = _seat_map_cache.get(plane.id)
+    if seat_map is None or seat_map.source != (plane.seat_layout, plane.business_seats, plane.economy_seats):
+        seat_map = CompiledSeatMap.from_plane_type(plane)
+        with _seat_map_lock:
+            _seat_map_cache[plane.id] = seat_map
+    return seat_map
+
+
+def invalidate_seat_map(plane_type_id: int = None) -> None:
+    """Forget the compiled map of one plane type, or of all of them."""
+    with _seat_map_lock:
+        if plane_type_id is None:
+            _seat_map_cache.clear()
+        else:
+            _seat_map_cache.pop(plane_type_id, None)
@@ -0,0 +1,161 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+from .seat_map import CABIN_CLASSES
+
+
+class NumpySeatPool:
+    """
+    Free-seat state for one cabin class as a NumPy occupancy matrix.
+
+    Rows are the cabin's seat rows in order, columns its column letters in
+    order, and a cell is True while that seat is free (seats missing from
+    the layout are never free). Labels that do not look like
+    '<row><letter>' get a single-cell row of their own after the numbered
+    rows, as in SeatPool. Searches for runs of adjacent free seats and
+    bulk fills are array operations over the whole cabin.
+
+    Offers the same interface and picks the same seats as SeatPool, so
+    the roster engine can use either.
+    """
+
+    def __init__(self, labels: List[List[Optional[str]]], aisle_starts: np.ndarray):
+        self._labels = labels
+        self._flat_labels = [label for row in labels for label in row]
+        self._index: Dict[str, Tuple[int, int]] = {
+            label: (r, c) for r, row in enumerate(labels) for c, label in enumerate(row) if label is not None
+        }
+        self._exists = np.array(
+            [[label is not None for label in row] for row in labels], dtype=bool,
+        ).reshape(len(labels), len(labels[0]) if labels else 0)
+        self._free = self._exists.copy()
+        # _aisle_after[c] is True when there is an aisle between column c and c + 1
+        self._aisle_after = aisle_starts
+        self._free_count = int(self._free.sum())
+
+    @classmethod
+    def from_seat_map(cls, seat_map, cabin_class: str) -> "NumpySeatPool":
+        columns = seat_map.columns[cabin_class]
+        position = {column: i for i, column in enumerate(columns)}
+        rows: Dict[int, List[Optional[str]]] = {}
+        unparsed: List[str] = []
+        for seat in seat_map.seats:
+            if seat.cabin_class != cabin_class:
+                continue
+            if seat.row is None:
+                unparsed.append(seat.label)
+                continue
+            rows.setdefault(seat.row, [None] * len(columns))[position[seat.column]] = seat.label
+        width = max(len(columns), 1)
+        grid = [row + [None] * (width - len(row)) for _, row in sorted(rows.items())]
+        grid += [[label] + [None] * (width - 1) for label in unparsed]
+        aisles = set(seat_map.aisles_after[cabin_class])
+        aisle_after = np.array([column in aisles for column in columns] + [False] * (width - len(columns)), dtype=bool)
+        return cls(grid, aisle_after)
+
+    def copy(self) -> "NumpySeatPool":
+        clone = NumpySeatPool.__new__(NumpySeatPool)
+        clone._labels = self._labels
+        clone._flat_labels = self._flat_labels
+        clone._index = self._index
+        clone._exists = self._exists
+        clone._aisle_after = self._aisle_after
+        clone._free = self._free.copy()
+        clone._free_count = self._free_count
+        return clone
+
+    def __len__(self) -> int:
+        return self._free_count
+
+    def __contains__(self, label: str) -> bool:
+        position = self._index.get(label)
+        return position is not None and bool(self._free[position])
+
+    def take(self, label: str) -> bool:
+        """Mark a specific seat as taken; False if it is unknown or already taken."""
+        if label not in self:
+            return False
+        self._free[self._index[label]] = False
+        self._free_count -= 1
+        return True
+
+    def release(self, label: str) -> bool:
+        """Mark a specific seat as free again; False if it is unknown or already free."""
+        position = self._index.get(label)
+        if position is None or self._free[position]:
+            return False
+        self._free[position] = True
+        self._free_count += 1
+        return True
+
+    def restrict(self, labels: Iterable[str]) -> None:
+        """Make exactly `labels` the free seats; every other seat is taken. Unknown labels are ignored."""
+        self._free = np.zeros_like(self._exists)
+        for label in labels:
+            position = self._index.get(label)
+            if position is not None:
+                self._free[position] = True
+        self._free_count = int(self._free.sum())
+
+    def take_first(self) -> Optional[str]:
+        """Take the first free seat in row/column order, or None if the pool is full."""
+        taken = self.take_first_n(1)
+        return taken[0] if taken else None
+
+    def take_first_n(self, count: int) -> List[str]:
+        """Take up to `count` free seats in row/column order."""
+        if count <= 0 or not self._free_count:
+            return []
+        flat = np.flatnonzero(self._free)[:count]
+        self._free.flat[flat] = False
+        self._free_count -= len(flat)
+        return [self._flat_labels[i] for i in flat]
+
+    def take_adjacent(self, count: int) -> List[str]:
+        """
+        Take `count` seats in the same row, preferring neighbouring columns.
+
+        Same choice as SeatPool.take_adjacent(): the first run of `count`
+        neighbouring free seats not crossing an aisle, else the first
+        `count` free seats of the first row with enough of them, else
+        nothing.
+        """
+        if count <= 0 or count > self._free_count:
+            return []
+        free = self._free
+        width = free.shape[1]
+        if count <= width:
+            starts = width - count + 1
+            runs = free[:, :starts].copy()
+            crossing = np.zeros(starts, dtype=bool)
+            for shift in range(1, count):
+                runs &= free[:, shift:shift + starts]
+                crossing |= self._aisle_after[shift - 1:shift - 1 + starts]
+            runs &= ~crossing
+            hits = np.flatnonzero(runs)
+            if hits.size:
+                row, start = divmod(int(hits[0]), starts)
+                return self._take_cells(row, np.arange(start, start + count))
+        rows = np.flatnonzero(free.sum(axis=1) >= count)
+        if not rows.size:
+            return []
+        row = int(rows[0])
+        return self._take_cells(row, np.flatnonzero(free[row])[:count])
+
+    def remaining(self) -> List[str]:
+        """Free seat labels in row/column order."""
+        return [self._flat_labels[i] for i in np.flatnonzero(self._free)]
+
+    def _take_cells(self, row: int, columns: np.ndarray) -> List[str]:
+        self._free[row, columns] = False
+        self._free_count -= len(columns)
+        return [self._labels[row][c] for c in columns]
+
+
+def numpy_pools(seat_map) -> Dict[str, NumpySeatPool]:
+    """Fresh, fully free NumpySeatPool per cabin class; the parsed grids are cached on the seat map."""
+    templates = getattr(seat_map, "_numpy_pools", None)
+    if templates is None:
+        templates = {cabin_class: NumpySeatPool.from_seat_map(seat_map, cabin_class) for cabin_class in CABIN_CLASSES}
+        seat_map._numpy_pools = templates
+    return {cabin_class: pool.copy() for cabin_class, pool in templates.items()}
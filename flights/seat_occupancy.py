@@ -0,0 +1,153 @@
+from collections import Counter
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+import time
+
+from .models import Flight, FlightTicket
+from .seat_map import CABIN_CLASSES, CompiledSeatMap, get_seat_map
+
+# Cached occupancy is rebuilt after this many seconds, which bounds how
+# stale it can get from ticket writes that send no signals (bulk updates,
+# rolled back transactions, other processes)
+OCCUPANCY_MAX_AGE = 60.0
+
+# (flight id, seat label, status) of a ticket as last loaded or saved
+SeatState = Tuple[Optional[int], Optional[str], Optional[str]]
+
+
+class FlightOccupancy:
+    """
+    Taken seats of one flight as a bitmap over the compiled seat map.
+
+    Bit i is set when seat index i of the plane's CompiledSeatMap is held
+    by a live (not cancelled) ticket. Labels the map does not know are
+    kept as a list. Each label is reference counted, so a seat two
+    tickets claim stays taken until both let go of it.
+    """
+
+    def __init__(self, flight_id: int, seat_map: CompiledSeatMap, labels: List[str]):
+        self.flight_id = flight_id
+        self.seat_map = seat_map
+        self.built_at = time.monotonic()
+        self.bits = 0
+        self._holders: Counter = Counter()
+        for label in labels:
+            self.take(label)
+
+    @classmethod
+    def build(cls, flight: Flight) -> "FlightOccupancy":
+        """Read the seats of the flight's live tickets in one query."""
+        labels = FlightTicket.objects.filter(flight=flight, seat_number__isnull=False).exclude(
+            status="Cancelled",
+        ).values_list("seat_number", flat=True)
+        return cls(flight.id, get_seat_map(flight.plane_type), list(labels))
+
+    def take(self, label: Optional[str]) -> None:
+        label = (label or "").strip()
+        if not label:
+            return
+        self._holders[label] += 1
+        index = self.seat_map.index.get(label)
+        if index is not None:
+            self.bits |= 1 << index
+
+    def release(self, label: Optional[str]) -> None:
+        label = (label or "").strip()
+        if self._holders[label] <= 0:
+            return
+        self._holders[label] -= 1
+        if not self._holders[label]:
+            del self._holders[label]
+            index = self.seat_map.index.get(label)
+            if index is not None:
+                self.bits &= ~(1 << index)
+
+    def unmapped(self) -> List[str]:
+        """Taken labels that are not seats of the compiled map (e.g. 'AUTO' or an unmodelled cabin)."""
+        return sorted(label for label in self._holders if label not in self.seat_map.index)
+
+    def taken_labels(self) -> List[str]:
+        return [seat.label for seat in self.seat_map.seats if self.bits >> seat.index & 1] + self.unmapped()
+
+    def free_counts(self) -> Dict[str, int]:
+        counts = {cabin_class: 0 for cabin_class in CABIN_CLASSES}
+        for seat in self.seat_map.seats:
+            if not self.bits >> seat.index & 1:
+                counts[seat.cabin_class] += 1
+        return counts
+
+    def to_dict(self, as_list: bool = False) -> Dict:
+        """
+        The seat map with its occupancy.
+
+        `taken` is a hex bitmap over seat indices, or with `as_list` the
+        taken labels; `layout` fingerprints the seat map so clients can
+        keep it and only re-read the occupancy.
+        """
+        return {
+            "flight": self.flight_id,
+            "layout": self.seat_map.fingerprint,
+            **self.seat_map.to_dict(),
+            "taken": self.taken_labels() if as_list else format(self.bits, "x"),
+            "taken_unmapped": self.unmapped(),
+            "free": self.free_counts(),
+        }
+
+
+_occupancy_cache: Dict[int, FlightOccupancy] = {}
+_occupancy_lock = Lock()
+
+
+def get_occupancy(flight_id: int) -> FlightOccupancy:
+    """
+    Seat occupancy of a flight, cached per process.
+
+    Kept current by apply_ticket_change(), which the FlightTicket signals
+    call; dropped by invalidate_occupancy() and rebuilt once older than
+    OCCUPANCY_MAX_AGE.
+
+    Raises:
+        Flight.DoesNotExist: If the flight does not exist
+    """
+    occupancy = _occupancy_cache.get(flight_id)
+    if occupancy is None or time.monotonic() - occupancy.built_at > OCCUPANCY_MAX_AGE:
+        flight = Flight.objects.select_related("plane_type").get(id=flight_id)
+        occupancy = FlightOccupancy.build(flight) if flight.plane_type_id else FlightOccupancy(
+            flight.id, CompiledSeatMap(None, {}), [],
+        )
+        with _occupancy_lock:
+            _occupancy_cache[flight_id] = occupancy
+    return occupancy
+
+
+def apply_ticket_change(before: Optional[SeatState], after: Optional[SeatState]) -> None:
+    """
+    Move a ticket's seat in the cached occupancy of its flight(s).
+
+    `before`/`after` are the ticket's (flight id, seat, status) before and
+    after the write, None when it did not exist before or was deleted.
+    Flights that are not cached are left alone; they are built fresh on
+    their next read.
+    """
+    if before == after:
+        return
+    with _occupancy_lock:
+        for state, apply in ((before, FlightOccupancy.release), (after, FlightOccupancy.take)):
+            if state is None or state[2] == "Cancelled":
+                continue
+            occupancy = _occupancy_cache.get(state[0])
+            if occupancy is not None:
+                apply(occupancy, state[1])
+
+
+def invalidate_occupancy(flight_id: int = None, plane_type_id: int = None) -> None:
+    """Forget the occupancy of one flight, of every flight of a plane type, or of all flights."""
+    with _occupancy_lock:
+        if flight_id is not None:
+            _occupancy_cache.pop(flight_id, None)
+        elif plane_type_id is not None:
+            for cached_id, occupancy in list(_occupancy_cache.items()):
+                if occupancy.seat_map.plane_type_id == plane_type_id:
+                    del _occupancy_cache[cached_id]
+        else:
+            _occupancy_cache.clear()
@@ -1,3 +1,7 @@
+from typing import Dict, Iterable
+
+from django.db.models.manager import BaseManager
+from django.urls import reverse
 from rest_framework import serializers
 from .models import (
     Airport,
@@ -11,7 +15,10 @@ from .models import (
     Roster,
     RosterCrewAssignment,
     RosterPassengerAssignment,
+    RosterJob,
 )
+from .roster_payload import expand_payload, expand_payloads
+from .roster_store import get_roster_storage
 
 
 class AirportSerializer(serializers.ModelSerializer):
@@ -352,6 +359,21 @@ class RosterPassengerAssignmentSerializer(serializers.ModelSerializer):
         fields = ['id', 'passenger', 'passenger_id', 'seat_number', 'seat_type', 'is_infant', 'assigned_at']
 
 
+def _verbose_payload_requested(context) -> bool:
+    request = context.get('request')
+    return request is not None and request.query_params.get('payload') == 'verbose'
+
+
+class RosterListSerializer(serializers.ListSerializer):
+    """Expands the verbose payloads of a whole page at once rather than roster by roster."""
+
+    def to_representation(self, data):
+        rosters = list(data.all() if isinstance(data, BaseManager) else data)
+        if _verbose_payload_requested(self.context):
+            self.context['expanded_payloads'] = expand_payloads(rosters)
+        return super().to_representation(rosters)
+
+
 class RosterSerializer(serializers.ModelSerializer):
     flight = FlightSerializer(read_only=True)
     flight_id = serializers.PrimaryKeyRelatedField(queryset=Flight.objects.all(), source='flight', write_only=True)
@@ -362,3 +384,89 @@ class RosterSerializer(serializers.ModelSerializer):
         model = Roster
         fields = ['id', 'flight', 'flight_id', 'backend', 'payload', 'created_by', 'created_at', 'crew_assignments', 'passenger_assignments']
         read_only_fields = ['created_by', 'created_at']
+        list_serializer_class = RosterListSerializer
+
+    def to_representation(self, instance):
+        # Document-backed rosters are stored already serialized: one lookup, no joins
+        document = get_roster_storage(instance.backend).read(instance)
+        data = document if document is not None else super().to_representation(instance)
+        if _verbose_payload_requested(self.context):
+            # The stored payload is compact; names and seat labels only on request
+            expanded = self.context.get('expanded_payloads', {})
+            payload = expanded[instance.id] if instance.id in expanded else expand_payload(instance)
+            data = dict(data, payload=payload)
+        return data
+
+
+class PlaneTypeLiteSerializer(serializers.ModelSerializer):
+    """Plane type without its menu and seat layout (see the seatmap endpoint for seats)."""
+
+    class Meta:
+        model = PlaneType
+        fields = ['id', 'code', 'name', 'total_seats', 'business_seats', 'economy_seats', 'max_cabin_crew', 'min_cabin_crew']
+
+
+class FlightLiteSerializer(serializers.ModelSerializer):
+    """Flight with airport and plane type ids in place of nested objects; read only."""
+
+    class Meta:
+        model = Flight
+        fields = [
+            'id', 'flight_number', 'shared_flight_number', 'shared_airline', 'connecting_flight_number',
+            'origin_airport', 'destination_airport', 'departure_time', 'arrival_time', 'duration_minutes',
+            'distance_km', 'plane_type', 'status'
+        ]
+        read_only_fields = fields
+
+
+class TicketLiteSerializer(serializers.ModelSerializer):
+    """Ticket with flight and passenger ids in place of nested objects; read only."""
+
+    class Meta:
+        model = FlightTicket
+        fields = ['id', 'ticket_number', 'flight', 'passenger', 'seat_number', 'ticket_class', 'price', 'booking_date', 'status', 'user']
+        read_only_fields = fields
+
+
+class RosterLiteSerializer(serializers.ModelSerializer):
+    """Roster row with its stored (compact) payload and no flight or assignment objects; read only."""
+
+    class Meta:
+        model = Roster
+        fields = ['id', 'flight', 'backend', 'payload', 'created_by', 'created_at']
+        read_only_fields = fields
+
+
+def sideload_flight_references(flights: Iterable[Flight]) -> Dict[str, list]:
+    """
+    The airports and plane types `flights` refer to, each serialized once.
+
+    Two queries however many flights share them; lite responses carry
+    these next to their rows instead of repeating them inside every row.
+    """
+    airport_ids, plane_type_ids = set(), set()
+    for flight in flights:
+        airport_ids.update((flight.origin_airport_id, flight.destination_airport_id))
+        plane_type_ids.add(flight.plane_type_id)
+    airport_ids.discard(None)
+    plane_type_ids.discard(None)
+    airports = Airport.objects.filter(id__in=airport_ids).order_by('id') if airport_ids else []
+    plane_types = PlaneType.objects.filter(id__in=plane_type_ids).order_by('id') if plane_type_ids else []
+    return {
+        'airports': AirportSerializer(airports, many=True).data,
+        'plane_types': PlaneTypeLiteSerializer(plane_types, many=True).data,
+    }
+
+
+class RosterJobSerializer(serializers.ModelSerializer):
+    roster_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RosterJob
+        fields = ['id', 'kind', 'status', 'params', 'progress', 'total', 'result', 'error', 'roster', 'roster_url',
+                  'created_by', 'created_at', 'started_at', 'heartbeat_at', 'finished_at']
+        read_only_fields = fields
+
+    def get_roster_url(self, obj):
+        return reverse('roster-detail', args=[obj.roster_id]) if obj.roster_id else None
+
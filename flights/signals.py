@@ -0,0 +1,88 @@
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .crew_index import invalidate_pilot_index, invalidate_qualification_index
+from .models import CabinCrew, Flight, FlightTicket, Pilot, PlaneType, Roster
+from .roster_store import get_roster_storage
+from .seat_map import invalidate_seat_map
+from .seat_occupancy import apply_ticket_change, invalidate_occupancy
+
+
+@receiver([post_save, post_delete], sender=PlaneType)
+def plane_type_changed(sender, instance, **kwargs):
+    """Drop the cached compiled seat map so the next read re-parses the layout."""
+    invalidate_seat_map(instance.id)
+    invalidate_occupancy(plane_type_id=instance.id)
+
+
+@receiver([post_save, post_delete], sender=Flight)
+def flight_changed(sender, instance, **kwargs):
+    """The flight's plane type, and with it the seat map its occupancy is indexed by, may have changed."""
+    invalidate_occupancy(instance.id)
+
+
+def _seat_state(ticket):
+    """(flight id, seat, status) of a ticket, or None if any of them was not loaded."""
+    values = ticket.__dict__
+    if not all(field in values for field in ("flight_id", "seat_number", "status")):
+        return None
+    return values["flight_id"], values["seat_number"], values["status"]
+
+
+@receiver(post_init, sender=FlightTicket)
+def ticket_loaded(sender, instance, **kwargs):
+    """Remember where the ticket sat, so a later save knows which seat it leaves."""
+    instance._seat_state = _seat_state(instance)
+
+
+@receiver(post_save, sender=FlightTicket)
+def ticket_saved(sender, instance, created, **kwargs):
+    """Move the ticket's seat in the cached occupancy of its flight."""
+    before = None if created else instance._seat_state
+    after = _seat_state(instance)
+    if not created and before is None:
+        # Loaded with deferred fields: where it sat before is unknown
+        invalidate_occupancy(instance.flight_id)
+    else:
+        apply_ticket_change(before, after)
+    instance._seat_state = after
+
+
+@receiver(post_delete, sender=FlightTicket)
+def ticket_deleted(sender, instance, **kwargs):
+    """Free the deleted ticket's seat in the cached occupancy of its flight."""
+    if instance._seat_state is None:
+        invalidate_occupancy(instance.flight_id)
+    else:
+        apply_ticket_change(instance._seat_state, None)
+
+
+@receiver([post_save, post_delete], sender=Pilot)
+@receiver(post_delete, sender=CabinCrew)
+@receiver(post_delete, sender=PlaneType)
+def qualifications_changed(sender, instance, **kwargs):
+    """
+    Drop the cached qualification index: a pilot's vehicle_restriction may
+    have changed, or deleted crew / plane types took their qualifications
+    with them.
+    """
+    invalidate_qualification_index()
+
+
+@receiver([post_save, post_delete], sender=Pilot)
+def pilot_changed(sender, instance, **kwargs):
+    """Drop the cached pilot range index; the pilot's plane type, seniority or range may have changed."""
+    invalidate_pilot_index()
+
+
+@receiver(m2m_changed, sender=CabinCrew.vehicle_restrictions.through)
+def cabin_crew_qualifications_changed(sender, action, **kwargs):
+    """Cabin crew vehicle_restrictions were added, removed or cleared."""
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_qualification_index()
+
+
+@receiver(post_delete, sender=Roster)
+def roster_deleted(sender, instance, **kwargs):
+    """Remove the roster's document, if its backend keeps one outside the database."""
+    get_roster_storage(instance.backend).forget(instance)
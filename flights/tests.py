@@ -1,5 +1,16 @@
 from datetime import timedelta
+from io import StringIO
+from importlib.util import find_spec
+from tempfile import TemporaryDirectory
+from unittest import mock, skipUnless
+import csv
+import json
+import random
 
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
@@ -14,16 +25,51 @@ from .models import (
     CabinCrew,
     Passenger,
     FlightTicket,
+    MenuItem,
+    Roster,
+    RosterClaim,
+    RosterCrewAssignment,
+    RosterJob,
+    RosterPassengerAssignment,
 )
+from .crew_index import (
+    INDEX_MAX_AGE,
+    get_pilot_index,
+    get_qualification_index,
+    invalidate_pilot_index,
+    invalidate_qualification_index,
+)
+from .crew_schedule import CrewSchedule, pilot_key
+from .duty_rules import DutyLimits
+from .pairings import ConnectionGraph, Leg
+from .fleet_bench import NOISE_FLOOR_MS, FleetScale, compare_results, run_benchmark
+from .roster_engine import (
+    CLAIM_TIMEOUT,
+    CrewPool,
+    RosterInProgress,
+    generate_roster,
+    generate_rosters,
+    generate_rosters_parallel,
+    update_roster,
+)
+from .roster_export import export_rosters, stream_export
+from . import roster_jobs
+from .roster_jobs import JOB_TIMEOUT, REQUEUE_INTERVAL, enqueue_roster_job, requeue_stale_jobs, run_worker
+from .roster_payload import compact_payload, decode_remaining, expand_payload
+from .roster_store import get_document_store
+from .serializers import RosterSerializer
+from .seat_map import SeatPool, get_seat_map
 
 User = get_user_model()
 
+# Queries generate_roster() may issue for one flight, however full it is
+ROSTER_QUERY_BUDGET = 17
 
-class RosterGenerationTests(APITestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(username="tester", password="password")
-        self.client.force_authenticate(user=self.user)
 
+class RosterFixtureMixin:
+    """Airports, a plane type, crew pools and one ticketed flight for roster tests."""
+
+    def create_roster_fixture(self):
         self.origin = Airport.objects.create(code="AAA", name="Alpha Airport", city="Alpha", country="Wonderland")
         self.destination = Airport.objects.create(code="BBB", name="Beta Airport", city="Beta", country="Wonderland")
 
@@ -167,6 +213,28 @@ class RosterGenerationTests(APITestCase):
             status="Booked",
         )
 
+    def _add_passengers(self, prefix, count):
+        passengers = []
+        for i in range(count):
+            passenger = Passenger.objects.create(
+                first_name=f"{prefix}{i}", last_name="Traveller", email=f"{prefix.lower()}{i}@example.com",
+                phone="555-0100", passport_number=f"{prefix}{i}", nationality="WL",
+                date_of_birth="1990-01-01", age=30, gender="F", seat_type="economy",
+            )
+            FlightTicket.objects.create(
+                ticket_number=f"T{prefix}{i}", flight=self.flight, passenger=passenger,
+                ticket_class="Economy", price="100.00", status="Booked",
+            )
+            passengers.append(passenger)
+        return passengers
+
+
+class RosterGenerationTests(RosterFixtureMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="password")
+        self.client.force_authenticate(user=self.user)
+        self.create_roster_fixture()
+
     def test_generate_roster_success(self):
         url = reverse("roster-generate")
         resp = self.client.post(url, {"flight_id": self.flight.id}, format="json")
@@ -187,6 +255,1320 @@ class RosterGenerationTests(APITestCase):
         self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
 
 
+class BatchRosterGenerationTests(RosterFixtureMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="opsuser", password="password", is_staff=True)
+        self.client.force_authenticate(user=self.user)
+        self.create_roster_fixture()
+        # Second flight on a plane type nobody is qualified for
+        self.unstaffed_plane = PlaneType.objects.create(code="PT9", name="Unstaffed", business_seats=0, economy_seats=4)
+        self.unstaffed_flight = Flight.objects.create(
+            flight_number="FA0002",
+            origin_airport=self.origin,
+            destination_airport=self.destination,
+            departure_time=self.flight.departure_time,
+            arrival_time=self.flight.arrival_time,
+            distance_km=1000,
+            plane_type=self.unstaffed_plane,
+        )
+
+    def test_batch_reports_each_flight(self):
+        url = reverse("roster-generate-batch")
+        resp = self.client.post(url, {"flight_ids": [self.flight.id, self.unstaffed_flight.id, 99999]}, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data["succeeded"], 1)
+        self.assertEqual(resp.data["failed"], 2)
+        by_flight = {r["flight_id"]: r for r in resp.data["results"]}
+        self.assertEqual(by_flight[self.flight.id]["status"], "ok")
+        self.assertTrue(Roster.objects.filter(id=by_flight[self.flight.id]["roster_id"]).exists())
+        self.assertEqual(
+            set(by_flight[self.flight.id]["timings"]),
+            {"select_pilots", "select_cabin_crew", "seat_assignment", "persist"},
+        )
+        self.assertIn("Insufficient pilots", by_flight[self.unstaffed_flight.id]["error"])
+        self.assertEqual(by_flight[99999]["error"], "flight not found")
+
+    def test_pairings_keep_one_crew_across_connecting_flights(self):
+        Pilot.objects.create(
+            code="P0", first_name="Short", last_name="Haul", age=30, gender="F", nationality="WL",
+            vehicle_restriction=self.plane, max_range_km=800, seniority="senior",
+        )
+        Flight.objects.filter(pk=self.flight.pk).update(distance_km=500)
+        back = Flight.objects.create(
+            flight_number="FA0005",
+            origin_airport=self.destination,
+            destination_airport=self.origin,
+            departure_time=self.flight.arrival_time + timedelta(hours=1),
+            arrival_time=self.flight.arrival_time + timedelta(hours=3),
+            distance_km=1000,
+            plane_type=self.plane,
+        )
+
+        def senior_pilots(report):
+            roster_ids = [r["roster_id"] for r in report["results"]]
+            return [
+                Roster.objects.get(id=i).crew_assignments.get(pilot__seniority="senior").pilot.code
+                for i in roster_ids
+            ]
+
+        report = generate_rosters(flight_ids=[self.flight.id, back.id])
+        # Flight by flight, the short-haul pilot takes the first leg
+        self.assertEqual(senior_pilots(report), ["P0", "P1"])
+        report = generate_rosters(flight_ids=[self.flight.id, back.id], pairings=True)
+        self.assertEqual(report["pairings"], [[self.flight.id, back.id]])
+        self.assertEqual(senior_pilots(report), ["P1", "P1"])
+
+        resp = self.client.post(
+            reverse("roster-generate-batch"),
+            {"flight_ids": [self.flight.id], "pairings": True, "optimize": True},
+            format="json",
+        )
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pairing_crew_is_booked_through_connection_gaps(self):
+        start = self.flight.departure_time
+        hours = lambda h: start + timedelta(hours=h)  # noqa: E731
+        Flight.objects.filter(pk=self.flight.pk).update(departure_time=hours(0), arrival_time=hours(2))
+        elsewhere = Airport.objects.create(code="DDD", name="Delta Airport", city="Delta", country="Wonderland")
+        gap = Flight.objects.create(
+            flight_number="FA0006", origin_airport=elsewhere, destination_airport=self.origin,
+            departure_time=hours(2.5), arrival_time=hours(4.5), distance_km=1000, plane_type=self.plane,
+        )
+        back = Flight.objects.create(
+            flight_number="FA0005", origin_airport=self.destination, destination_airport=self.origin,
+            departure_time=hours(3), arrival_time=hours(5), distance_km=1000, plane_type=self.plane,
+        )
+
+        report = generate_rosters(flight_ids=[self.flight.id, gap.id, back.id], pairings=True)
+        self.assertEqual(report["pairings"], [[self.flight.id, back.id]])
+        by_flight = {r["flight_id"]: r for r in report["results"]}
+        self.assertEqual((by_flight[self.flight.id]["status"], by_flight[back.id]["status"]), ("ok", "ok"))
+        # The only crew is on the pairing from 00:00 to 05:00
+        self.assertIn("Insufficient pilots", by_flight[gap.id]["error"])
+        crews = [
+            set(Roster.objects.get(id=by_flight[f.id]["roster_id"]).crew_assignments.values_list("pilot_id", "cabin_crew_id"))
+            for f in (self.flight, back)
+        ]
+        self.assertEqual(crews[0], crews[1])
+
+    def test_incremental_generate_updates_latest_roster(self):
+        url = reverse("roster-generate")
+        self.client.post(url, {"flight_id": self.flight.id}, format="json")
+        FlightTicket.objects.filter(passenger=self.passenger2).update(status="Cancelled")
+        resp = self.client.post(url, {"flight_id": self.flight.id, "incremental": True}, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data["delta"], {"added": 0, "removed": 1})
+        self.assertEqual(Roster.objects.filter(flight=self.flight).count(), 1)
+
+    def test_simulate_reports_all_violations_without_writing(self):
+        url = reverse("roster-simulate")
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post(url, {
+                "flight_id": self.flight.id,
+                "pilot_ids": [self.junior_pilot.id, 99999],
+                "cabin_crew_ids": [self.chef.id],
+            }, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertFalse(resp.data["valid"])
+        self.assertEqual(resp.data["violations"], [
+            "Pilot id 99999 does not exist",
+            "Flight requires at least one senior pilot",
+            "At least one senior cabin crew required",
+            "At least 4 cabin crew members required, but only 1 provided",
+        ])
+        self.assertEqual(len(resp.data["roster"]["passengers"]), 2)
+        self.assertFalse([q for q in ctx.captured_queries if not q["sql"].startswith("SELECT")])
+        self.assertFalse(Roster.objects.exists())
+
+        resp = self.client.post(url, {"flight_id": self.flight.id}, format="json")
+        self.assertTrue(resp.data["valid"])
+        self.assertEqual(len(resp.data["roster"]["crew"]), 7)
+
+    def test_async_generate_is_run_by_worker(self):
+        resp = self.client.post(reverse("roster-generate"), {"flight_id": self.flight.id, "async": True}, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_202_ACCEPTED)
+        job_url = reverse("roster-job", kwargs={"job_id": resp.data["id"]})
+        self.assertEqual(self.client.get(job_url).data["status"], "queued")
+        self.assertFalse(Roster.objects.exists())
+
+        self.assertEqual(run_worker(once=True), 1)
+        job = self.client.get(job_url).data
+        roster = Roster.objects.get(flight=self.flight)
+        self.assertEqual((job["status"], job["progress"], job["roster"]), ("succeeded", 1, roster.id))
+        self.assertEqual(job["roster_url"], reverse("roster-detail", args=[roster.id]))
+        stream = self.client.get(job_url, {"stream": 1})
+        self.assertEqual(stream["Content-Type"], "text/event-stream")
+        self.assertIn(b'"status":"succeeded"', b"".join(stream.streaming_content))
+
+    def test_async_batch_records_progress_and_report(self):
+        url = reverse("roster-generate-batch")
+        resp = self.client.post(url, {"flight_ids": [self.flight.id, self.unstaffed_flight.id], "async": True}, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_202_ACCEPTED)
+        run_worker(once=True)
+        job = self.client.get(reverse("roster-job", kwargs={"job_id": resp.data["id"]})).data
+        self.assertEqual((job["status"], job["progress"], job["total"]), ("succeeded", 2, 2))
+        self.assertEqual((job["result"]["succeeded"], job["result"]["failed"]), (1, 1))
+
+    def test_only_jobs_with_stale_heartbeats_are_requeued(self):
+        long_ago = timezone.now() - 3 * JOB_TIMEOUT
+        alive = enqueue_roster_job("batch", {})
+        dead = enqueue_roster_job("batch", {})
+        RosterJob.objects.filter(id=alive.id).update(
+            status="running", worker="a:1", started_at=long_ago, heartbeat_at=timezone.now(),
+        )
+        RosterJob.objects.filter(id=dead.id).update(
+            status="running", worker="b:2", started_at=long_ago, heartbeat_at=long_ago,
+        )
+        self.assertEqual(requeue_stale_jobs(), 1)
+        self.assertEqual(RosterJob.objects.get(id=alive.id).status, "running")
+        dead.refresh_from_db()
+        self.assertEqual((dead.status, dead.worker, dead.heartbeat_at), ("queued", "", None))
+
+    def test_worker_requeues_jobs_abandoned_while_it_runs(self):
+        first = enqueue_roster_job("single", {"flight_id": self.flight.id})
+        # Another worker is running this one, until it dies while `first` runs
+        orphan = enqueue_roster_job("batch", {"flight_ids": [self.flight.id]})
+        RosterJob.objects.filter(id=orphan.id).update(
+            status="running", worker="b:2", started_at=timezone.now(), heartbeat_at=timezone.now(),
+        )
+        run_job = roster_jobs.run_job
+
+        def run_while_other_worker_dies(job):
+            if job.id == first.id:
+                RosterJob.objects.filter(id=orphan.id).update(heartbeat_at=timezone.now() - 2 * JOB_TIMEOUT)
+            return run_job(job)
+
+        clock = iter(range(0, 10**6, int(REQUEUE_INTERVAL.total_seconds())))
+        with mock.patch("flights.roster_jobs.run_job", side_effect=run_while_other_worker_dies):
+            with mock.patch("flights.roster_jobs.monotonic", side_effect=lambda: next(clock)):
+                self.assertEqual(run_worker(once=True), 2)
+        orphan.refresh_from_db()
+        self.assertEqual(orphan.status, "succeeded")
+        self.assertNotEqual(orphan.worker, "b:2")
+
+    def test_generate_conflicts_while_flight_is_claimed(self):
+        RosterClaim.objects.create(flight=self.flight, owner="elsewhere:1")
+        resp = self.client.post(reverse("roster-generate"), {"flight_id": self.flight.id}, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Roster.objects.filter(flight=self.flight).exists())
+
+    def test_batch_by_date_range_command(self):
+        day = timezone.localdate(self.flight.departure_time).isoformat()
+        call_command("generate_rosters", date_from=day, date_to=day, stdout=StringIO())
+        self.assertEqual(Roster.objects.filter(flight=self.flight).count(), 1)
+        self.assertFalse(Roster.objects.filter(flight=self.unstaffed_flight).exists())
+
+    def test_batch_command_rejects_invalid_dates(self):
+        for option, value in (("date_from", "2024-13-01"), ("date_to", "2024-02-30"), ("date_from", "tomorrow")):
+            with self.assertRaisesMessage(CommandError, f"Invalid date for --{option.replace('_', '-')}: '{value}'"):
+                call_command("generate_rosters", stdout=StringIO(), **{option: value})
+        self.assertFalse(Roster.objects.exists())
+
+
+class InlineProcessPool:
+    """
+    Stands in for ProcessPoolExecutor: runs the initializer and every call
+    in this process (and on the test database), recording each call's
+    first argument length.
+    """
+    calls = []
+
+    def __init__(self, max_workers=None, initializer=None):
+        InlineProcessPool.calls = []
+        if initializer is not None:
+            initializer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def map(self, fn, *iterables):
+        results = []
+        for args in zip(*iterables):
+            InlineProcessPool.calls.append(len(args[0]))
+            results.append(fn(*args))
+        return iter(results)
+
+
+class RosterEngineTests(RosterFixtureMixin, TestCase):
+    def setUp(self):
+        self.create_roster_fixture()
+
+    def test_assignments_are_inserted_in_bulk(self):
+        with CaptureQueriesContext(connection) as ctx:
+            roster = generate_roster(self.flight.id)
+        inserts = [
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].startswith("INSERT") and "flights_rosterclaim" not in q["sql"]
+        ]
+        # One INSERT each for the roster, crew assignments and passenger assignments
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(roster.crew_assignments.count(), 7)
+        self.assertEqual(roster.passenger_assignments.count(), 2)
+
+    @skipUnless(find_spec("numpy"), "numpy is not installed")
+    def test_numpy_seating_matches_python(self):
+        families = self._add_passengers("NUM", 5)
+        families[0].affiliated_passengers.add(families[1], families[2])
+        seats = []
+        for seating in ("python", "numpy"):
+            roster = generate_roster(self.flight.id, seating=seating)
+            seats.append(dict(roster.passenger_assignments.values_list("passenger_id", "seat_number")))
+            seats.append(expand_payload(roster)["remaining_seats"])
+            roster.delete()
+        self.assertEqual(seats[0], seats[2])
+        self.assertEqual(seats[1], seats[3])
+
+    def test_query_count_does_not_grow_with_passengers(self):
+        invalidate_qualification_index()
+        invalidate_pilot_index()
+        with CaptureQueriesContext(connection) as small:
+            generate_roster(self.flight.id)
+
+        families = self._add_passengers("FAM", 6)
+        for parent, partner in zip(families[::2], families[1::2]):
+            parent.affiliated_passengers.add(partner)
+        for i, parent in enumerate(families[:2]):
+            infant = Passenger.objects.create(
+                first_name=f"Baby{i}", last_name="Traveller", email=f"baby{i}@example.com", phone="555-0100",
+                passport_number=f"BABY{i}", nationality="WL", date_of_birth="2025-01-01", age=1, parent=parent,
+            )
+            FlightTicket.objects.create(
+                ticket_number=f"TBABY{i}", flight=self.flight, passenger=infant,
+                ticket_class="Economy", price="0.00", status="Booked",
+            )
+        invalidate_qualification_index()
+        invalidate_pilot_index()
+        with CaptureQueriesContext(connection) as large:
+            roster = generate_roster(self.flight.id)
+
+        self.assertEqual(roster.passenger_assignments.count(), 10)
+        self.assertEqual(len(large), len(small))
+        self.assertLessEqual(len(large), ROSTER_QUERY_BUDGET)
+
+    def test_update_roster_applies_ticket_delta_only(self):
+        roster = generate_roster(self.flight.id)
+        seats = dict(roster.passenger_assignments.values_list("passenger_id", "seat_number"))
+        newcomer, = self._add_passengers("NEW", 1)
+        FlightTicket.objects.filter(passenger=self.passenger2).delete()
+
+        updated = update_roster(self.flight.id)
+        self.assertEqual(updated.id, roster.id)
+        self.assertEqual(updated.delta, {"added": 1, "removed": 1})
+        after = dict(updated.passenger_assignments.values_list("passenger_id", "seat_number"))
+        self.assertEqual(set(after), {self.passenger1.id, newcomer.id})
+        self.assertEqual(after[self.passenger1.id], seats[self.passenger1.id])
+        self.assertNotIn(after[newcomer.id], seats.values())
+        updated.refresh_from_db()
+        self.assertEqual(set(updated.payload["passengers"]), {self.passenger1.id, newcomer.id})
+        # The removed passenger's seat is free again, the newcomer's is not
+        remaining = decode_remaining(updated.payload, get_seat_map(self.plane))["economy"]
+        self.assertIn(seats[self.passenger2.id], remaining)
+        self.assertNotIn(after[newcomer.id], remaining)
+
+    def test_update_roster_queries_do_not_grow_with_cabin(self):
+        generate_roster(self.flight.id)
+        self._add_passengers("LATE", 1)
+        with CaptureQueriesContext(connection) as small:
+            update_roster(self.flight.id)
+        self._add_passengers("ALSO", 1)
+        generate_roster(self.flight.id)
+        self._add_passengers("LAST", 1)
+        with CaptureQueriesContext(connection) as large:
+            update_roster(self.flight.id)
+        self.assertEqual(len(large), len(small))
+
+    def _overlapping_flight(self):
+        return Flight.objects.create(
+            flight_number="FA0003",
+            origin_airport=self.destination,
+            destination_airport=self.origin,
+            departure_time=self.flight.departure_time + timedelta(hours=1),
+            arrival_time=self.flight.arrival_time + timedelta(hours=1),
+            distance_km=1000,
+            plane_type=self.plane,
+        )
+
+    def test_crew_is_not_double_booked(self):
+        generate_roster(self.flight.id)
+        overlapping = self._overlapping_flight()
+        with self.assertRaisesMessage(ValueError, "Insufficient pilots"):
+            generate_roster(overlapping.id)
+        with self.assertRaisesMessage(ValueError, "already rostered on an overlapping flight"):
+            generate_roster(overlapping.id, pilot_ids=[self.senior_pilot.id, self.junior_pilot.id])
+        # Regenerating the same flight does not conflict with its own previous roster
+        generate_roster(self.flight.id)
+
+    def test_duty_limits_are_checked_when_picking_crew(self):
+        generate_roster(self.flight.id)
+        # Three hours after landing: a 9 hour flight would make a 14 hour duty period
+        late = Flight.objects.create(
+            flight_number="FA0004",
+            origin_airport=self.destination,
+            destination_airport=self.origin,
+            departure_time=self.flight.arrival_time + timedelta(hours=3),
+            arrival_time=self.flight.arrival_time + timedelta(hours=12),
+            distance_km=1000,
+            plane_type=self.plane,
+        )
+        with self.assertRaisesMessage(ValueError, "Insufficient pilots"):
+            generate_roster(late.id)
+        with self.assertRaisesMessage(ValueError, "would be on duty for 14h without 10h rest"):
+            generate_roster(late.id, pilot_ids=[self.senior_pilot.id, self.junior_pilot.id])
+        with override_settings(CREW_DUTY_LIMITS=None):
+            generate_roster(late.id)
+
+    def test_claim_prevents_duplicate_rosters(self):
+        claim = RosterClaim.objects.create(flight=self.flight, owner="elsewhere:1")
+        with self.assertRaises(RosterInProgress):
+            generate_roster(self.flight.id)
+        report = generate_rosters(flight_ids=[self.flight.id])
+        self.assertIn("already being generated", report["results"][0]["error"])
+        self.assertFalse(Roster.objects.filter(flight=self.flight).exists())
+
+        # A claim left behind by a crashed worker expires
+        RosterClaim.objects.filter(pk=claim.pk).update(claimed_at=timezone.now() - CLAIM_TIMEOUT - timedelta(minutes=1))
+        generate_roster(self.flight.id)
+        self.assertFalse(RosterClaim.objects.exists())
+
+    def test_parallel_batch_matches_serial_rules(self):
+        overlapping = self._overlapping_flight()
+        report = generate_rosters_parallel(flight_ids=[self.flight.id, overlapping.id, 99999], workers=1)
+        by_flight = {r["flight_id"]: r for r in report["results"]}
+        self.assertEqual(by_flight[self.flight.id]["status"], "ok")
+        self.assertEqual(Roster.objects.get(id=by_flight[self.flight.id]["roster_id"]).passenger_assignments.count(), 2)
+        # The only pilots are on the first flight already
+        self.assertIn("Insufficient pilots", by_flight[overlapping.id]["error"])
+        self.assertEqual(by_flight[99999]["error"], "flight not found")
+        self.assertFalse(RosterClaim.objects.exists())
+
+    def test_parallel_batch_shards_and_reorders_results(self):
+        # Created latest-first, so id order and departure order disagree
+        later = [
+            Flight.objects.create(
+                flight_number=f"FA{i + 10:04d}", origin_airport=self.origin, destination_airport=self.destination,
+                departure_time=self.flight.departure_time + timedelta(days=i), distance_km=1000, plane_type=self.plane,
+                arrival_time=self.flight.arrival_time + timedelta(days=i),
+            )
+            for i in (4, 3, 2)
+        ]
+        overlapping = self._overlapping_flight()
+        with mock.patch("flights.roster_engine.ProcessPoolExecutor", InlineProcessPool):
+            report = generate_rosters_parallel(
+                flight_ids=[f.id for f in later] + [overlapping.id, self.flight.id], workers=2, chunk_size=2,
+            )
+        # Crew selection fails on the overlapping flight before sharding; four flights make two chunks
+        self.assertEqual(InlineProcessPool.calls, [2, 2])
+        self.assertEqual(
+            [r["flight_id"] for r in report["results"]],
+            [self.flight.id, overlapping.id, later[2].id, later[1].id, later[0].id],
+        )
+        self.assertEqual([r["status"] for r in report["results"]], ["ok", "error", "ok", "ok", "ok"])
+        self.assertEqual(Roster.objects.count(), 4)
+
+    def test_batch_spreads_crew_over_overlapping_flights(self):
+        overlapping = self._overlapping_flight()
+        for code, seniority in (("P3", "senior"), ("P4", "junior")):
+            Pilot.objects.create(
+                code=code, first_name="Extra", last_name="Pilot", age=40, gender="F", nationality="WL",
+                vehicle_restriction=self.plane, max_range_km=5000, seniority=seniority,
+            )
+        # The first flight takes up to four seniors, so leave one over
+        for i in range(6):
+            crew = CabinCrew.objects.create(
+                code=f"X{i}", first_name="Extra", last_name="Crew", age=30, gender="F", nationality="WL",
+                role="chief" if i < 4 else "regular", seniority="senior" if i < 4 else "junior",
+            )
+            crew.vehicle_restrictions.add(self.plane)
+
+        report = generate_rosters(flight_ids=[self.flight.id, overlapping.id])
+        self.assertEqual(report["failed"], 0, report)
+        crew_sets = [
+            set(Roster.objects.get(id=r["roster_id"]).crew_assignments.values_list("pilot_id", "cabin_crew_id"))
+            for r in report["results"]
+        ]
+        self.assertFalse(crew_sets[0] & crew_sets[1])
+
+    def test_optimizer_staffs_flights_greedy_selection_fails(self):
+        long_haul = self._overlapping_flight()
+        long_haul.distance_km = 3000
+        long_haul.save()
+        # A short-range senior and a spare junior; greedy gives P1 (long range) to the short flight
+        Pilot.objects.create(
+            code="P5", first_name="Short", last_name="Range", age=50, gender="M", nationality="WL",
+            vehicle_restriction=self.plane, max_range_km=1500, seniority="senior",
+        )
+        Pilot.objects.create(
+            code="P6", first_name="Spare", last_name="Junior", age=30, gender="M", nationality="WL",
+            vehicle_restriction=self.plane, max_range_km=5000, seniority="junior",
+        )
+        for i in range(4):
+            crew = CabinCrew.objects.create(
+                code=f"Y{i}", first_name="Extra", last_name="Crew", age=30, gender="F", nationality="WL",
+                role="chief" if i == 0 else "regular", seniority="senior" if i == 0 else "junior",
+            )
+            crew.vehicle_restrictions.add(self.plane)
+
+        with transaction.atomic():
+            greedy = generate_rosters(flight_ids=[self.flight.id, long_haul.id])
+            transaction.set_rollback(True)
+        self.assertEqual(greedy["failed"], 1)
+
+        report = generate_rosters(
+            flight_ids=[self.flight.id, long_haul.id], optimize=True, time_budget=1.0, workers=1,
+        )
+        self.assertEqual(report["failed"], 0, report)
+        self.assertEqual(report["optimizer"]["crew_used"], 14)
+        long_haul_roster = Roster.objects.filter(flight=long_haul).latest("id")
+        self.assertIn(
+            self.senior_pilot.id,
+            long_haul_roster.crew_assignments.filter(crew_type="pilot").values_list("pilot_id", flat=True),
+        )
+
+
+    def test_optimizer_respects_cabin_crew_limits(self):
+        self.plane.max_cabin_crew = 4
+        self.plane.min_cabin_crew = 3
+        self.plane.save()
+        report = generate_rosters(flight_ids=[self.flight.id], optimize=True, time_budget=0.5, workers=1)
+        self.assertEqual(report["failed"], 0, report)
+        roster = Roster.objects.get(id=report["results"][0]["roster_id"])
+        cabin = roster.crew_assignments.filter(crew_type="cabin")
+        self.assertEqual(cabin.count(), 4)
+        self.assertEqual(cabin.filter(cabin_crew__seniority="senior").count(), 1)
+
+        self.plane.min_cabin_crew = 5
+        self.plane.save()
+        report = generate_rosters(flight_ids=[self.flight.id], optimize=True, time_budget=0.5, workers=1)
+        self.assertEqual(report["failed"], 1)
+        self.assertIn("Cabin crew limits cannot be met", report["results"][0]["error"])
+
+
+    def test_optimized_crews_are_held_to_duty_limits(self):
+        # Three hours after landing: the only crew would make a 14 hour duty period
+        late = Flight.objects.create(
+            flight_number="FA0004", origin_airport=self.destination, destination_airport=self.origin,
+            departure_time=self.flight.arrival_time + timedelta(hours=3),
+            arrival_time=self.flight.arrival_time + timedelta(hours=12),
+            distance_km=1000, plane_type=self.plane,
+        )
+        report = generate_rosters(flight_ids=[self.flight.id, late.id], optimize=True, time_budget=0.5, workers=1)
+        by_flight = {r["flight_id"]: r for r in report["results"]}
+        self.assertEqual(by_flight[self.flight.id]["status"], "ok")
+        self.assertIn("would be on duty for 14h without 10h rest", by_flight[late.id]["error"])
+        self.assertFalse(Roster.objects.filter(flight=late).exists())
+
+
+class CrewScheduleTests(SimpleTestCase):
+    def test_merged_intervals_and_lookup(self):
+        base = timezone.now()
+        hours = lambda h: base + timedelta(hours=h)  # noqa: E731
+        schedule = CrewSchedule()
+        key = pilot_key(1)
+        schedule.book(key, hours(0), hours(2))
+        schedule.book(key, hours(5), hours(6))
+        schedule.book(key, hours(1), hours(3))
+        self.assertEqual(schedule.duty_periods(key), [(hours(0), hours(3)), (hours(5), hours(6))])
+        self.assertTrue(schedule.is_free(key, hours(3), hours(5)))
+        self.assertFalse(schedule.is_free(key, hours(4), hours(5.5)))
+        self.assertFalse(schedule.is_free(key, hours(-1), hours(7)))
+        self.assertTrue(schedule.is_free(pilot_key(2), hours(0), hours(1)))
+
+
+class DutyRulesTests(SimpleTestCase):
+    def setUp(self):
+        base = timezone.now()
+        self.hours = lambda h: base + timedelta(hours=h)  # noqa: E731
+        self.schedule = CrewSchedule(DutyLimits())
+        self.key = pilot_key(1)
+
+    def test_short_rest_extends_the_duty_period(self):
+        hours, schedule = self.hours, self.schedule
+        # A lone flight longer than a limit is an augmented crew operation, not a violation
+        self.assertEqual(schedule.duty_violations(self.key, hours(0), hours(15)), [])
+        schedule.book(self.key, hours(0), hours(5))
+        self.assertTrue(schedule.can_fly(self.key, hours(7), hours(12)))
+        self.assertEqual(
+            schedule.duty_violations(self.key, hours(7), hours(14.5)),
+            ["would be on duty for 14.5h without 10h rest (limit 13h)"],
+        )
+        # After ten hours of rest a new duty period starts
+        self.assertTrue(schedule.can_fly(self.key, hours(15), hours(23)))
+        schedule.book(self.key, hours(15), hours(23))
+        self.assertEqual(schedule.duty_between(self.key, hours(4), hours(16)), timedelta(hours=2))
+        self.assertEqual(
+            schedule.duty_violations(self.key, hours(33), hours(39)),
+            ["would have 14h of duty in 24 hours (limit 13h)"],
+        )
+
+    def test_rolling_week_limit(self):
+        hours, schedule = self.hours, self.schedule
+        for day in range(6):
+            schedule.book(self.key, hours(24 * day), hours(24 * day + 9))
+        self.assertEqual(
+            schedule.duty_violations(self.key, hours(144), hours(153)),
+            ["would have 63h of duty in 7 days (limit 60h)"],
+        )
+        # Shorter, or once the first day has left the window, it fits
+        self.assertTrue(schedule.can_fly(self.key, hours(144), hours(150)))
+        self.assertTrue(schedule.can_fly(self.key, hours(168), hours(177)))
+        self.assertTrue(CrewSchedule().can_fly(self.key, hours(144), hours(153)))
+
+
+
+class ConnectionGraphTests(SimpleTestCase):
+    def test_legs_chain_on_airport_plane_type_and_connection_time(self):
+        base = timezone.now()
+        hours = lambda h: base + timedelta(hours=h)  # noqa: E731
+        legs = [
+            Leg(1, 10, 20, hours(0), hours(2), 1),
+            Leg(2, 20, 30, hours(2.25), hours(4), 1),  # 15 minutes: too short a connection
+            Leg(3, 20, 30, hours(3), hours(5), 1),
+            Leg(4, 20, 10, hours(3), hours(5), 2),  # another plane type
+            Leg(5, 30, 10, hours(6), hours(8), 1),
+            Leg(6, 30, 10, hours(10), hours(12), 1),  # 5 hours later: rest, not a connection
+        ]
+        graph = ConnectionGraph(legs)
+        successors = {graph.legs[i].id: [graph.legs[j].id for j in out] for i, out in enumerate(graph.successors)}
+        self.assertEqual(successors[1], [3])
+        self.assertEqual(successors[3], [5])
+        self.assertEqual(graph.edge_count(), 3)
+        self.assertEqual(
+            [[leg.id for leg in pairing] for pairing in graph.pairings()],
+            [[1, 3, 5], [2], [4], [6]],
+        )
+        self.assertEqual(
+            [[leg.id for leg in pairing] for pairing in graph.pairings(max_duty=timedelta(hours=6))],
+            [[1, 3], [2, 5], [4], [6]],
+        )
+
+
+
+class SeatPoolTests(SimpleTestCase):
+    def test_take_first_follows_row_and_column_order(self):
+        pool = SeatPool(["2A", "1B", "1A", "2B", "1A"])
+        self.assertEqual(len(pool), 4)
+        self.assertTrue(pool.take("1A"))
+        self.assertFalse(pool.take("1A"))
+        self.assertEqual(pool.take_first(), "1B")
+        self.assertEqual(pool.take_first(), "2A")
+        self.assertEqual(pool.remaining(), ["2B"])
+
+    def test_take_adjacent_prefers_contiguous_run(self):
+        pool = SeatPool(["1A", "1B", "1C", "2A", "2B", "2C"])
+        pool.take("1B")
+        # Row 1 has two free seats but they are not neighbours
+        self.assertEqual(pool.take_adjacent(2), ["2A", "2B"])
+        # No contiguous pair left: fall back to the first row with room
+        self.assertEqual(pool.take_adjacent(2), ["1A", "1C"])
+        self.assertEqual(pool.take_adjacent(2), [])
+        self.assertEqual(pool.remaining(), ["2C"])
+
+
+class CompiledSeatMapTests(APITestCase):
+    def setUp(self):
+        self.plane = PlaneType.objects.create(
+            code="MAP1",
+            name="Mapped",
+            seat_layout={
+                "business": ["1A", "1C", "1D", "1F"],
+                "economy": [f"{r}{c}" for r in (10, 11) for c in "ABCDEF"],
+            },
+        )
+
+    def test_zones_aisles_and_windows(self):
+        seat_map = get_seat_map(self.plane)
+        self.assertEqual(seat_map.aisles_after, {"business": ["A", "D"], "economy": ["C"]})
+        first = seat_map.seats[seat_map.index["1A"]]
+        self.assertEqual((first.index, first.cabin_class, first.is_window, first.is_aisle), (0, "business", True, True))
+        middle = seat_map.seats[seat_map.index["10B"]]
+        self.assertEqual((middle.cabin_class, middle.is_window, middle.is_aisle), ("economy", False, False))
+
+    def test_adjacent_groups_do_not_span_the_aisle(self):
+        pools = get_seat_map(self.plane).new_pools()
+        for label in ("10A", "10B", "10E"):
+            pools["economy"].take(label)
+        # 10C-10D are side by side in letters but split by the aisle
+        self.assertEqual(pools["economy"].take_adjacent(2), ["11A", "11B"])
+        # Pools handed out by the map are independent copies
+        self.assertEqual(len(get_seat_map(self.plane).new_pools()["economy"]), 12)
+
+    @skipUnless(find_spec("numpy"), "numpy is not installed")
+    def test_numpy_pools_pick_the_same_seats(self):
+        seat_map = get_seat_map(self.plane)
+        rng = random.Random(7)
+        for _ in range(20):
+            python_pools, numpy_pools = seat_map.new_pools(), seat_map.new_pools("numpy")
+            for _ in range(12):
+                cabin_class = rng.choice(["business", "economy"])
+                label = rng.choice(seat_map.seats).label
+                count = rng.randint(1, 4)
+                op = rng.choice([
+                    lambda pool: pool.take(label),
+                    lambda pool: pool.release(label),
+                    lambda pool: pool.take_first_n(count),
+                    lambda pool: pool.take_adjacent(count),
+                ])
+                self.assertEqual(op(python_pools[cabin_class]), op(numpy_pools[cabin_class]))
+                self.assertEqual(python_pools[cabin_class].remaining(), numpy_pools[cabin_class].remaining())
+
+    def test_unknown_seating_engine_is_rejected(self):
+        with self.assertRaises(ValueError):
+            get_seat_map(self.plane).new_pools("fortran")
+
+    def test_cache_is_invalidated_on_save(self):
+        self.assertIs(get_seat_map(self.plane), get_seat_map(self.plane))
+        self.plane.seat_layout = {"business": [], "economy": ["5A", "5B"]}
+        self.plane.save()
+        self.assertEqual(get_seat_map(self.plane).labels("economy"), ["5A", "5B"])
+
+    def test_cache_follows_layout_edits_made_elsewhere(self):
+        cached = get_seat_map(self.plane)
+        # As another process would: no signals reach this process's cache
+        PlaneType.objects.filter(id=self.plane.id).update(seat_layout={"business": [], "economy": ["7A", "7B"]})
+        self.assertIs(get_seat_map(self.plane), cached)
+        reloaded = PlaneType.objects.get(id=self.plane.id)
+        self.assertEqual(get_seat_map(reloaded).labels("economy"), ["7A", "7B"])
+        self.assertIs(get_seat_map(reloaded), get_seat_map(reloaded))
+
+    def test_seatmap_endpoint(self):
+        resp = self.client.get(reverse("plane-type-seatmap", args=[self.plane.id]))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(resp.data["seats"]), 16)
+        self.assertEqual(resp.data["classes"]["business"]["columns"], ["A", "C", "D", "F"])
+
+
+class FlightSeatMapTests(RosterFixtureMixin, APITestCase):
+    def setUp(self):
+        self.create_roster_fixture()
+        self.url = reverse("flight-seatmap", args=[self.flight.id])
+
+    def _taken(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        bits = int(resp.data["taken"] or "0", 16)
+        return [seat["label"] for seat in resp.data["seats"] if bits >> seat["index"] & 1] + resp.data["taken_unmapped"]
+
+    def test_occupancy_follows_ticket_writes_from_the_cache(self):
+        ticket = FlightTicket.objects.get(ticket_number="TKT1")
+        ticket.seat_number = "20A"
+        ticket.save()
+        self.assertEqual(self._taken(), ["20A"])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self._taken(), ["20A"])
+        ticket.seat_number = "21B"
+        ticket.save()
+        other = FlightTicket.objects.get(ticket_number="TKT2")
+        other.seat_number = "1A"
+        other.save()
+        FlightTicket.objects.create(
+            ticket_number="TKT3", flight=self.flight, passenger=self.passenger1, seat_number="AUTO",
+            ticket_class="Economy", price="100.00", status="Booked",
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(self._taken(), ["1A", "21B", "AUTO"])
+
+        ticket.status = "Cancelled"
+        ticket.save()
+        other.delete()
+        resp = self.client.get(self.url, {"occupancy": "list"})
+        self.assertEqual(resp.data["taken"], ["AUTO"])
+        self.assertEqual(resp.data["free"], {"business": 4, "economy": 10})
+
+    def test_cache_is_rebuilt_when_the_plane_changes(self):
+        FlightTicket.objects.filter(ticket_number="TKT1").update(seat_number="5A")
+        self.assertEqual(self._taken(), ["5A"])
+        self.plane.seat_layout = {"business": [], "economy": ["5A", "5B"]}
+        self.plane.save()
+        self.assertEqual(self._taken(), ["5A"])
+        seats = self.client.get(self.url).data["seats"]
+        self.assertEqual([seat["label"] for seat in seats if seat["class"] == "economy"], ["5A", "5B"])
+
+    def test_missing_flight(self):
+        resp = self.client.get(reverse("flight-seatmap", args=[99999]))
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class FlightSearchTests(RosterFixtureMixin, APITestCase):
+    def setUp(self):
+        self.create_roster_fixture()
+        self.url = reverse("flight-search")
+        self.day = Flight.departure_day(self.flight.departure_time)
+
+    def _flight(self, number, origin, destination, departure, **fields):
+        return Flight.objects.create(
+            flight_number=number, origin_airport=origin, destination_airport=destination,
+            departure_time=departure, arrival_time=departure + timedelta(hours=2), duration_minutes=120,
+            distance_km=1000, plane_type=self.plane, status=fields.pop("status", "Scheduled"), **fields,
+        )
+
+    def test_departure_date_follows_departure_time(self):
+        self.assertEqual(self.flight.departure_date, self.day)
+        self.flight.departure_time += timedelta(days=3)
+        self.flight.save(update_fields=["departure_time"])
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.departure_date, self.day + timedelta(days=3))
+
+    def test_search_by_route_and_dates(self):
+        later = self._flight("FA0002", self.origin, self.destination, self.flight.departure_time + timedelta(days=2))
+        self._flight("FA0003", self.destination, self.origin, self.flight.departure_time, status="Boarding")
+        self._flight("FA0004", self.origin, self.destination, self.flight.departure_time + timedelta(days=40))
+
+        resp = self.client.get(self.url, {"origin": "aaa", "destination": "BBB", "date": self.day.isoformat()})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual([f["flight_number"] for f in resp.data["results"]], ["FA0001"])
+
+        window = {"origin": "AAA", "destination": "BBB", "date_from": self.day.isoformat(),
+                  "date_to": (self.day + timedelta(days=5)).isoformat()}
+        resp = self.client.get(self.url, window)
+        self.assertEqual([f["id"] for f in resp.data["results"]], [self.flight.id, later.id])
+        resp = self.client.get(self.url, {**window, "status": "Boarding"})
+        self.assertEqual(resp.data["results"], [])
+        resp = self.client.get(self.url, {"origin": "BBB", "destination": "AAA", "date": self.day.isoformat(),
+                                          "status": "Boarding", "plane_type": "PT1"})
+        self.assertEqual([f["flight_number"] for f in resp.data["results"]], ["FA0003"])
+        resp = self.client.get(self.url, {**window, "origin": "ZZZ"})
+        self.assertEqual(resp.data["results"], [])
+
+    def test_bad_search_parameters(self):
+        day = self.day.isoformat()
+        for params in (
+            {"destination": "BBB", "date": day},
+            {"origin": "AAA", "destination": "BBB"},
+            {"origin": "AAA", "destination": "BBB", "date": "2025-13-01"},
+            {"origin": "AAA", "destination": "BBB", "date_from": day, "date_to": (self.day - timedelta(days=1)).isoformat()},
+            {"origin": "AAA", "destination": "BBB", "date_from": day, "date_to": (self.day + timedelta(days=31)).isoformat()},
+        ):
+            resp = self.client.get(self.url, params)
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    @skipUnless(connection.vendor == "sqlite", "query plan text is SQLite's")
+    def test_search_uses_route_day_index(self):
+        plan = Flight.objects.filter(
+            origin_airport=self.origin, destination_airport=self.destination, departure_date__range=(self.day, self.day),
+        ).order_by("departure_date", "departure_time").explain()
+        self.assertIn("flight_route_day_idx", plan)
+
+
+class KeysetPaginationTests(RosterFixtureMixin, APITestCase):
+    def setUp(self):
+        self.create_roster_fixture()
+        self.user = User.objects.create_user(username="pager", password="password", is_staff=True)
+        self.client.force_authenticate(self.user)
+        FlightTicket.objects.bulk_create([
+            FlightTicket(ticket_number=f"KS{i:03d}", flight=self.flight, passenger=self.passenger1,
+                         ticket_class="Economy", price="100.00", status="Booked")
+            for i in range(45)
+        ])
+
+    def _walk(self, url, params):
+        seen, queries, resp = [], [], self.client.get(url, params)
+        while True:
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", resp.data)
+            seen += [row["id"] for row in resp.data["results"]]
+            if not resp.data["next"]:
+                return seen, queries
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.get(resp.data["next"])
+            queries.append(ctx.captured_queries)
+
+    def test_cursor_pages_cover_every_ticket_once_without_counting(self):
+        url = reverse("ticket-list")
+        ids, pages = self._walk(url, {"pagination": "cursor", "page_size": 10})
+        self.assertEqual(ids, sorted(FlightTicket.objects.values_list("id", flat=True)))
+        self.assertEqual(len(pages), 4)
+        sql = [q["sql"] for queries in pages for q in queries]
+        self.assertFalse([q for q in sql if "COUNT(" in q or "OFFSET" in q])
+
+        self.assertIn("count", self.client.get(url).data)
+
+    def test_cursor_with_client_ordering_and_other_viewsets(self):
+        ids, _ = self._walk(reverse("ticket-list"), {"pagination": "cursor", "page_size": 7, "ordering": "-ticket_number"})
+        self.assertEqual(ids, list(FlightTicket.objects.order_by("-ticket_number").values_list("id", flat=True)))
+        for name in ("flight-list", "passenger-list", "roster-list"):
+            resp = self.client.get(reverse(name), {"pagination": "cursor"})
+            self.assertEqual(resp.status_code, status.HTTP_200_OK, name)
+            self.assertEqual(set(resp.data), {"next", "previous", "results"})
+
+
+class LiteViewTests(RosterFixtureMixin, APITestCase):
+    def setUp(self):
+        self.create_roster_fixture()
+        self.client.force_authenticate(User.objects.create_user(username="lite", password="password", is_staff=True))
+
+    def _add_flights(self, count):
+        for i in range(count):
+            Flight.objects.create(
+                flight_number=f"FA{i + 100:04d}", origin_airport=self.origin, destination_airport=self.destination,
+                departure_time=self.flight.departure_time + timedelta(days=i + 1),
+                arrival_time=self.flight.arrival_time + timedelta(days=i + 1),
+                duration_minutes=120, distance_km=1000, plane_type=self.plane, status="Scheduled",
+            )
+
+    def _queries(self, url, params):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url, params)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        return resp, len(ctx.captured_queries)
+
+    def test_flights_are_flat_with_sideloaded_airports_and_plane_types(self):
+        url = reverse("flight-list")
+        _, few = self._queries(url, {"view": "lite"})
+        self._add_flights(8)
+        resp, many = self._queries(url, {"view": "lite"})
+        self.assertEqual(few, many)
+
+        row = resp.data["results"][0]
+        self.assertEqual((row["origin_airport"], row["plane_type"]), (self.origin.id, self.plane.id))
+        self.assertEqual([a["code"] for a in resp.data["airports"]], ["AAA", "BBB"])
+        self.assertEqual([p["code"] for p in resp.data["plane_types"]], ["PT1"])
+        self.assertNotIn("standard_menu", resp.data["plane_types"][0])
+        self.assertIsInstance(self.client.get(url).data["results"][0]["plane_type"], dict)
+
+        resp = self.client.get(reverse("flight-search"), {
+            "origin": "AAA", "destination": "BBB", "date": Flight.departure_day(self.flight.departure_time).isoformat(),
+            "view": "lite", "pagination": "cursor",
+        })
+        self.assertEqual([f["id"] for f in resp.data["results"]], [self.flight.id])
+        self.assertEqual(len(resp.data["airports"]), 2)
+
+    def test_tickets_and_rosters_sideload_their_flights(self):
+        resp, before = self._queries(reverse("ticket-list"), {"view": "lite"})
+        self.assertEqual({t["flight"] for t in resp.data["results"]}, {self.flight.id})
+        self.assertEqual([f["flight_number"] for f in resp.data["flights"]], ["FA0001"])
+        self.assertEqual(len(resp.data["plane_types"]), 1)
+        FlightTicket.objects.bulk_create([
+            FlightTicket(ticket_number=f"LT{i}", flight=self.flight, passenger=self.passenger1, status="Booked")
+            for i in range(6)
+        ])
+        self.assertEqual(self._queries(reverse("ticket-list"), {"view": "lite"})[1], before)
+
+        Roster.objects.create(flight=self.flight, backend="sql", payload={"v": 1})
+        resp = self.client.get(reverse("roster-list"), {"view": "lite"})
+        self.assertEqual(resp.data["results"][0]["flight"], self.flight.id)
+        self.assertEqual(resp.data["results"][0]["payload"], {"v": 1})
+        self.assertEqual([f["id"] for f in resp.data["flights"]], [self.flight.id])
+
+
+class ConstantQueryTests(APITestCase):
+    """Every list and detail endpoint runs the same number of queries however many rows it serves."""
+
+    ENDPOINTS = ["airport", "menu-item", "plane-type", "flight", "pilot", "cabin-crew", "passenger", "ticket", "roster"]
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username="planner", password="password", is_staff=True))
+        self.latest = {}
+
+    def grow(self):
+        """One more of everything; each new object has more related rows than the one before."""
+        n = len(self.latest.get("rows", [])) + 1
+        self.latest["rows"] = self.latest.get("rows", []) + [n]
+        letter = "ABCDEFGH"[n]
+        menu = [MenuItem.objects.create(name=f"Dish {n}.{i}") for i in range(n)]
+        origin = Airport.objects.create(code=f"{letter}OR", name="Origin", city="Origin", country="Wonderland")
+        destination = Airport.objects.create(code=f"{letter}DE", name="Destination", city="Destination", country="Wonderland")
+        plane = PlaneType.objects.create(code=f"CQ{n}", name="Plane", total_seats=10, business_seats=2, economy_seats=8)
+        plane.standard_menu.set(menu)
+        departure = timezone.now() + timedelta(days=n)
+        flight = Flight.objects.create(
+            flight_number=f"FA{n + 200:04d}", origin_airport=origin, destination_airport=destination,
+            departure_time=departure, arrival_time=departure + timedelta(hours=2), duration_minutes=120,
+            distance_km=1000, plane_type=plane, status="Scheduled",
+        )
+        pilot = Pilot.objects.create(
+            code=f"CQP{n}", first_name="Pat", last_name="Pilot", age=40, gender="F", nationality="WL",
+            known_languages=["EN"], vehicle_restriction=plane, max_range_km=5000, seniority="senior",
+        )
+        crew = CabinCrew.objects.create(
+            code=f"CQC{n}", first_name="Cam", last_name="Crew", age=30, gender="M", nationality="WL",
+            known_languages=["EN"], role="chef", seniority="senior",
+        )
+        crew.vehicle_restrictions.set(PlaneType.objects.all())
+        crew.recipes.set(menu)
+        passengers = [
+            Passenger.objects.create(
+                first_name="Pax", last_name=f"{n}.{i}", email=f"pax{n}.{i}@example.com", phone="555",
+                passport_number=f"CQ{n}.{i}", nationality="WL", date_of_birth="1990-01-01", age=34,
+            )
+            for i in range(n + 1)
+        ]
+        passengers[0].affiliated_passengers.set(passengers[1:])
+        tickets = [
+            FlightTicket.objects.create(ticket_number=f"CQ{n}.{i}", flight=flight, passenger=passenger, status="Booked")
+            for i, passenger in enumerate(passengers)
+        ]
+        seat_map = get_seat_map(plane)
+        remaining = {cabin_class: pool.remaining() for cabin_class, pool in seat_map.new_pools().items()}
+        payload = compact_payload(flight, "sql", [pilot.id], [crew.id], [(p.id, None, 1) for p in passengers], remaining, seat_map)
+        roster = Roster.objects.create(flight=flight, backend="sql", payload=payload)
+        RosterCrewAssignment.objects.create(roster=roster, crew_type="pilot", pilot=pilot)
+        RosterCrewAssignment.objects.create(roster=roster, crew_type="cabin", cabin_crew=crew)
+        for passenger in passengers:
+            RosterPassengerAssignment.objects.create(roster=roster, passenger=passenger, seat_type="economy")
+        self.latest.update({
+            "airport": origin, "menu-item": menu[-1], "plane-type": plane, "flight": flight, "pilot": pilot,
+            "cabin-crew": crew, "passenger": passengers[0], "ticket": tickets[0], "roster": roster,
+        })
+
+    def query_counts(self):
+        counts = {}
+        for name in self.ENDPOINTS:
+            for kind, url in (("list", reverse(f"{name}-list")), ("detail", reverse(f"{name}-detail", args=[self.latest[name].pk]))):
+                with CaptureQueriesContext(connection) as ctx:
+                    resp = self.client.get(url)
+                self.assertEqual(resp.status_code, status.HTTP_200_OK, url)
+                counts[f"{name} {kind}"] = len(ctx.captured_queries)
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse("roster-list"), {"payload": "verbose"})
+        self.assertEqual(
+            sorted(len(roster["payload"]["passengers"]) for roster in resp.data["results"]),
+            [n + 1 for n in self.latest["rows"]],
+        )
+        counts["roster list ?payload=verbose"] = len(ctx.captured_queries)
+        return counts
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        self.grow()
+        small = self.query_counts()
+        self.grow()
+        self.grow()
+        self.assertEqual(self.query_counts(), small)
+
+
+class QualificationIndexTests(RosterFixtureMixin, APITestCase):
+    def setUp(self):
+        self.create_roster_fixture()
+        self.client.force_authenticate(User.objects.create_user(username="crewops", password="password"))
+
+    def test_index_is_built_in_one_query_and_follows_changes(self):
+        invalidate_qualification_index()
+        with self.assertNumQueries(1):
+            index = get_qualification_index()
+            self.assertIs(get_qualification_index(), index)
+        self.assertEqual(index.pilot_ids(self.plane.id), {self.senior_pilot.id, self.junior_pilot.id})
+        self.assertIn(self.chef.id, index.cabin_crew_ids(self.plane.id))
+
+        self.chef.vehicle_restrictions.remove(self.plane)
+        self.assertNotIn(self.chef.id, get_qualification_index().cabin_crew_ids(self.plane.id))
+        self.junior_pilot.vehicle_restriction = None
+        self.junior_pilot.save()
+        self.assertEqual(get_qualification_index().pilot_ids(self.plane.id), {self.senior_pilot.id})
+
+    def test_manual_cabin_crew_validation_does_not_query_per_member(self):
+        crew_ids = [self.cabin_senior.id] + [c.id for c in self.cabin_juniors] + [self.chef.id]
+        get_qualification_index()
+        with CaptureQueriesContext(connection) as ctx:
+            generate_roster(self.flight.id, cabin_crew_ids=crew_ids)
+        # One read for the crew pool (the pilots are automatic) and one prefetch for the chosen crew
+        self.assertEqual(len([q for q in ctx.captured_queries if "vehicle_restrictions" in q["sql"]]), 2)
+
+        self.chef.vehicle_restrictions.clear()
+        with self.assertRaisesMessage(ValueError, "CHEF1 is not qualified"):
+            generate_roster(self.flight.id, cabin_crew_ids=crew_ids)
+
+    def test_qualification_changes_from_other_processes_are_not_missed(self):
+        crew_ids = [self.cabin_senior.id] + [c.id for c in self.cabin_juniors] + [self.chef.id]
+        index = get_qualification_index()
+        # As another process would: no signal reaches this process's index
+        CabinCrew.vehicle_restrictions.through.objects.filter(cabincrew_id=self.chef.id).delete()
+        self.assertIs(get_qualification_index(), index)
+        with self.assertRaisesMessage(ValueError, "CHEF1 is not qualified"):
+            generate_roster(self.flight.id, cabin_crew_ids=crew_ids)
+        self.assertNotIn(self.chef, CrewPool.load([self.plane.id]).cabin_crew_for(self.flight))
+
+        index.built_at -= INDEX_MAX_AGE + 1
+        self.assertNotIn(self.chef.id, get_qualification_index().cabin_crew_ids(self.plane.id))
+
+    def test_cabin_crew_filter_uses_index(self):
+        other = PlaneType.objects.create(code="PT2", name="Other")
+        self.chef.vehicle_restrictions.add(other)
+        url = reverse("cabin-crew-list")
+        resp = self.client.get(url, {"vehicle_restrictions": other.id})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        results = resp.data["results"] if isinstance(resp.data, dict) else resp.data
+        self.assertEqual([c["code"] for c in results], ["CHEF1"])
+        resp = self.client.get(url, {"vehicle_restrictions": "abc"})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PilotRangeIndexTests(RosterFixtureMixin, APITestCase):
+    def setUp(self):
+        self.create_roster_fixture()
+        self.client.force_authenticate(User.objects.create_user(username="crewops", password="password"))
+        self.short_haul = Pilot.objects.create(
+            code="P0", first_name="Short", last_name="Haul", age=30, gender="F", nationality="WL",
+            vehicle_restriction=self.plane, max_range_km=800, seniority="senior",
+        )
+
+    def test_pilots_are_found_by_range_and_follow_changes(self):
+        invalidate_pilot_index()
+        with self.assertNumQueries(1):
+            index = get_pilot_index()
+            self.assertIs(get_pilot_index(), index)
+        self.assertEqual([p.code for p in index.pilots(self.plane.id, "senior")], ["P0", "P1"])
+        self.assertEqual([p.code for p in index.pilots(self.plane.id, "senior", 801)], ["P1"])
+        self.assertEqual([p.code for p in index.pilots_for(self.plane.id, 800)], ["P2", "P0", "P1"])
+        self.assertEqual(index.pilot_ids(min_range_km=5001), set())
+
+        self.short_haul.max_range_km = 9000
+        self.short_haul.save()
+        self.assertEqual([p.code for p in get_pilot_index().pilots(self.plane.id, "senior", 6000)], ["P0"])
+        self.short_haul.delete()
+        self.assertEqual(get_pilot_index().pilots(self.plane.id, "senior", 6000), [])
+
+    def test_automatic_selection_reads_pilots_from_the_index(self):
+        self.flight.distance_km = 1000
+        self.flight.save()
+        get_pilot_index()
+        get_qualification_index()
+        with CaptureQueriesContext(connection) as ctx:
+            roster = generate_roster(self.flight.id)
+        # Only the re-read of the picked pilots before saving touches the table
+        pilot_queries = [q["sql"] for q in ctx.captured_queries if 'FROM "flights_pilot"' in q["sql"]]
+        self.assertEqual(len(pilot_queries), 1)
+        self.assertIn('"flights_pilot"."id" IN', pilot_queries[0])
+        # P0 sorts first by code but cannot fly 1000 km
+        self.assertEqual(
+            sorted(roster.crew_assignments.filter(pilot__isnull=False).values_list("pilot__code", flat=True)),
+            ["P1", "P2"],
+        )
+
+    def test_pilots_changed_by_other_processes_are_not_rostered(self):
+        self.flight.distance_km = 500
+        self.flight.save()
+        get_pilot_index()
+        # Neither change fires the signals that would drop this process's index
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM "flights_pilot" WHERE "id" = %s', [self.short_haul.id])
+        with self.assertRaisesMessage(ValueError, "Pilot P0 no longer exists"):
+            generate_roster(self.flight.id)
+        self.assertFalse(Roster.objects.exists())
+        roster = generate_roster(self.flight.id)
+        self.assertIn("P1", roster.crew_assignments.values_list("pilot__code", flat=True))
+
+        Pilot.objects.filter(id=self.senior_pilot.id).update(max_range_km=100)
+        with self.assertRaisesMessage(ValueError, "Pilot P1 max range (100km) is less than flight distance (500km)"):
+            generate_roster(self.flight.id)
+        self.assertEqual(get_pilot_index().pilots(self.plane.id, "senior", 500), [])
+
+    def test_pilot_filters_use_the_index(self):
+        url = reverse("pilot-list")
+        resp = self.client.get(url, {"min_range_km": 1000, "seniority": "senior"})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        results = resp.data["results"] if isinstance(resp.data, dict) else resp.data
+        self.assertEqual([p["code"] for p in results], ["P1"])
+        self.flight.distance_km = 500
+        self.flight.save()
+        resp = self.client.get(url, {"flight": self.flight.id})
+        results = resp.data["results"] if isinstance(resp.data, dict) else resp.data
+        self.assertEqual(sorted(p["code"] for p in results), ["P0", "P1", "P2"])
+        resp = self.client.get(url, {"min_range_km": "far"})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RosterDocumentStoreTests(RosterFixtureMixin, TestCase):
+    def setUp(self):
+        self.create_roster_fixture()
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(ROSTER_DOCUMENT_STORE=f"{tmp.name}/rosters.sqlite3")
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def generate(self, backend="nosql"):
+        # Documents are written when the roster's transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            return generate_roster(self.flight.id, backend=backend)
+
+    def test_nosql_roster_is_one_document(self):
+        roster = self.generate()
+        self.assertEqual(roster.crew_assignments.count(), 7)
+        self.assertFalse(roster.passenger_assignments.exists())
+        self.assertEqual(get_document_store().versions(self.flight.id), [roster.id])
+
+        roster = Roster.objects.select_related("flight").get(id=roster.id)
+        with self.assertNumQueries(0):
+            data = RosterSerializer(roster).data
+        self.assertEqual(data["flight"]["flight_number"], self.flight.flight_number)
+        self.assertEqual(len(data["crew_assignments"]), 7)
+        seats = {a["passenger"]["passport_number"]: a["seat_number"] for a in data["passenger_assignments"]}
+        self.assertEqual(len(seats), 2)
+        self.assertTrue(all(seats.values()))
+
+    def test_document_matches_sql_roster_representation(self):
+        sql = RosterSerializer(self.generate("sql")).data
+        nosql = RosterSerializer(self.generate()).data
+        self.assertEqual(set(nosql), set(sql))
+
+        def people(data, key, relation):
+            return sorted((a[relation] for a in data[key] if a[relation]), key=lambda person: person["id"])
+
+        for relation in ("pilot", "cabin_crew"):
+            self.assertEqual(people(nosql, "crew_assignments", relation), people(sql, "crew_assignments", relation))
+        self.assertEqual(people(nosql, "passenger_assignments", "passenger"), people(sql, "passenger_assignments", "passenger"))
+        self.assertEqual(set(nosql["passenger_assignments"][0]), set(sql["passenger_assignments"][0]))
+        self.assertEqual(set(nosql["crew_assignments"][0]), set(sql["crew_assignments"][0]))
+
+    def test_document_follows_roster_lifecycle(self):
+        roster = self.generate()
+        with self.assertRaisesMessage(ValueError, "Incremental updates need an 'sql' roster"):
+            update_roster(self.flight.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            roster.delete()
+        self.assertIsNone(get_document_store().latest(self.flight.id))
+
+    def test_rolled_back_roster_leaves_no_document(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                generate_roster(self.flight.id, backend="nosql")
+                transaction.set_rollback(True)
+        self.assertFalse(Roster.objects.exists())
+        self.assertEqual(get_document_store().versions(self.flight.id), [])
+
+    def test_read_benchmark_command(self):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("benchmark_roster_reads", flight_id=self.flight.id, iterations=3, stdout=out)
+        self.assertIn("nosql:", out.getvalue())
+        self.assertFalse(Roster.objects.exists())
+        self.assertEqual(get_document_store().versions(self.flight.id), [])
+
+
+class RosterExportTests(RosterFixtureMixin, APITestCase):
+    def setUp(self):
+        self.create_roster_fixture()
+        self.client.force_authenticate(User.objects.create_user(username="exporter", password="password", is_staff=True))
+        self.roster = generate_roster(self.flight.id)
+
+    def _download(self, url, params=None):
+        resp = self.client.get(url, params or {})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        return b"".join(resp.streaming_content).decode()
+
+    def test_formats(self):
+        data = json.loads(self._download(reverse("roster-export-json", args=[self.roster.id])))
+        self.assertEqual(data["flight"]["origin"], "AAA")
+        self.assertEqual(len(data["crew"]), 7)
+        self.assertEqual(sorted(p["passport"] for p in data["passengers"]), ["PASS1", "PASS2"])
+
+        lines = self._download(reverse("roster-export", args=[self.roster.id]), {"fmt": "ndjson"}).splitlines()
+        records = [json.loads(line)["record"] for line in lines]
+        self.assertEqual((records.count("roster"), records.count("crew"), records.count("passenger")), (1, 7, 2))
+
+        rows = list(csv.DictReader(StringIO(self._download(reverse("roster-export", args=[self.roster.id]), {"fmt": "csv"}))))
+        self.assertEqual(len(rows), 9)
+        self.assertEqual({row["flight_number"] for row in rows}, {self.flight.flight_number})
+
+        resp = self.client.get(reverse("roster-export", args=[self.roster.id]), {"fmt": "xml"})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count_does_not_grow_with_passengers(self):
+        def export_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                _, body = stream_export(export_rosters([self.roster.id]), "ndjson", single=True)
+                rows = sum(chunk.count("\n") for chunk in body)
+            return len(ctx.captured_queries), rows
+
+        before, rows_before = export_queries()
+        self._add_passengers("X", 6)
+        self.roster = update_roster(self.flight.id)
+        after, rows_after = export_queries()
+        self.assertEqual(rows_after, rows_before + 6)
+        self.assertEqual(before, after)
+        self.assertLessEqual(after, 3)
+
+    def test_date_range_exports_latest_roster_per_flight(self):
+        newer = generate_roster(self.flight.id)
+        day = timezone.localtime(self.flight.departure_time).date().isoformat()
+        data = json.loads(self._download(reverse("roster-export-range"), {"date_from": day, "date_to": day}))
+        self.assertEqual([r["roster_id"] for r in data["rosters"]], [newer.id])
+
+        resp = self.client.get(reverse("roster-export-range"))
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_date_range_export_rejects_impossible_dates(self):
+        for params in ({"date_from": "2024-02-30"}, {"date_to": "2024-13-01"}, {"date_from": "30-02-2024"}):
+            resp = self.client.get(reverse("roster-export-range"), params)
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertEqual(resp.data, {"detail": "dates must be YYYY-MM-DD"})
+
+
+class RosterPayloadTests(RosterFixtureMixin, APITestCase):
+    def setUp(self):
+        self.create_roster_fixture()
+        self.client.force_authenticate(User.objects.create_user(username="payloads", password="password", is_staff=True))
+
+    def _verbose(self, roster):
+        roster = Roster.objects.select_related("flight__plane_type").get(id=roster.id)
+        return expand_payload(roster)
+
+    def test_compact_payload_expands_to_verbose(self):
+        roster = generate_roster(self.flight.id)
+        payload = roster.payload
+        self.assertEqual(payload["v"], 2)
+        self.assertEqual(set(payload["passengers"]), {self.passenger1.id, self.passenger2.id})
+        self.assertTrue(all(isinstance(seat, int) for seat in payload["seats"]))
+
+        verbose = self._verbose(roster)
+        self.assertEqual(len(verbose["crew"]), 7)
+        seats = dict(roster.passenger_assignments.values_list("passenger_id", "seat_number"))
+        self.assertEqual({p["passenger_id"]: p["seat"] for p in verbose["passengers"]}, seats)
+        self.assertEqual(len(verbose["remaining_seats"]["economy"]) + len(verbose["remaining_seats"]["business"]), 12)
+        # Several times smaller even for a two-passenger cabin; the gap grows with the cabin
+        self.assertLess(len(json.dumps(payload)) * 5, len(json.dumps(verbose)))
+
+        url = reverse("roster-detail", args=[roster.id])
+        self.assertEqual(self.client.get(url).data["payload"]["v"], 2)
+        self.assertEqual(self.client.get(url, {"payload": "verbose"}).data["payload"]["crew"], verbose["crew"])
+
+    def test_verboses_are_compacted(self):
+        roster = generate_roster(self.flight.id)
+        verbose = self._verbose(roster)
+        Roster.objects.filter(id=roster.id).update(payload=verbose)
+
+        call_command("compact_roster_payloads", stdout=StringIO())
+        roster.refresh_from_db()
+        self.assertEqual(roster.payload["v"], 2)
+        self.assertEqual(self._verbose(roster), verbose)
+
+    def test_changed_layout_reads_seats_from_assignments(self):
+        roster = generate_roster(self.flight.id)
+        seats = dict(roster.passenger_assignments.values_list("passenger_id", "seat_number"))
+        self.plane.seat_layout["economy"].append("24A")
+        self.plane.save()
+        verbose = self._verbose(roster)
+        self.assertEqual({p["passenger_id"]: p["seat"] for p in verbose["passengers"]}, seats)
+        self.assertIn("24A", verbose["remaining_seats"]["economy"])
+
+
+class FleetBenchmarkTests(TestCase):
+    def test_benchmark_on_tiny_fleet(self):
+        scale = FleetScale(flights=4, tickets=40, pilots=24, cabin_crew=40, days=1)
+        results = run_benchmark(scale, sample=2)
+        self.assertEqual(results["build"]["flights"], 4)
+        self.assertEqual(results["build"]["tickets"], FlightTicket.objects.count())
+        self.assertEqual(results["single"]["flights"] + results["single"]["failed"], 2)
+        self.assertIn("seat_assignment", results["single"]["stages_ms"])
+        self.assertGreater(results["single"]["queries"]["mean"], 0)
+
+        noisy = json.loads(json.dumps(results))
+        for summary in noisy["single"]["stages_ms"].values():
+            summary["p50"] += NOISE_FLOOR_MS / 2
+        self.assertFalse([row for row in compare_results(noisy, results, 25) if row["regressed"]])
+
+        slower = json.loads(json.dumps(results))
+        slower["single"]["total_ms"]["p50"] = results["single"]["total_ms"]["p50"] * 2 + NOISE_FLOOR_MS
+        regressed = [row["metric"] for row in compare_results(slower, results, 25) if row["regressed"]]
+        self.assertEqual(regressed, ["single total p50 ms"])
+        slower["meta"]["seed"] = 1
+        with self.assertRaisesMessage(ValueError, "Runs differ in seed"):
+            compare_results(slower, results, 25)
+
+
 class FlightValidationTests(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="flightuser", password="password", is_staff=True)
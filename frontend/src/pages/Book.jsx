@@ -16,6 +16,18 @@ function currencyFormat(v){
   return `$${Number(v).toFixed(2)}`
 }
 
+// Taken seat labels from a flights/<id>/seatmap/ response: `taken` is a hex
+// bitmap where bit i marks the seat with index i as taken
+function takenFromSeatMap(data){
+  const hex = data.taken || ''
+  const taken = new Set(data.taken_unmapped || [])
+  for (const seat of data.seats || []) {
+    const pos = hex.length - 1 - Math.floor(seat.index / 4)
+    if (pos >= 0 && (parseInt(hex[pos], 16) >> (seat.index % 4)) & 1) taken.add(seat.label)
+  }
+  return taken
+}
+
 // Simple Error Boundary component
 class ErrorBoundary extends React.Component {
   constructor(props) {
@@ -168,14 +180,12 @@ export default function Book(){
 
   function update(field, value){ setForm(prev=> ({...prev, [field]: value})); setError(null) }
 
-  // fetch taken seats for selected flight (best-effort; may require auth)
+  // fetch taken seats for selected flight from its cached seat map (best-effort)
   useEffect(()=>{
     setTakenSeats(new Set())
     if(!selected) return
-    api.get(`tickets/?flight=${selected.id}&page_size=500`).then(r=>{
-      const rows = r.data.results || r.data || []
-      const seats = new Set(rows.map(t=> (t.seat_number||'').toString().trim()).filter(Boolean))
-      setTakenSeats(seats)
+    api.get(`flights/${selected.id}/seatmap/`).then(r=>{
+      setTakenSeats(takenFromSeatMap(r.data))
     }).catch(()=>{
       setTakenSeats(new Set())
     })
@@ -417,6 +417,10 @@ function PassengerModal({ passenger, assignment, onClose }) {
   )
 }
 
+function parseIds(text){
+  return text.split(',').map(v => parseInt(v.trim(), 10)).filter(Number.isInteger)
+}
+
 export default function RostersPageEnhanced(){
   const [rosters, setRosters] = useState([])
   const [flights, setFlights] = useState([])
@@ -431,6 +435,9 @@ export default function RostersPageEnhanced(){
   const [hoveredPerson, setHoveredPerson] = useState(null)
   const [showGenerateModal, setShowGenerateModal] = useState(false)
   const [selectedPassenger, setSelectedPassenger] = useState(null)
+  const [pilotIdsText, setPilotIdsText] = useState('')
+  const [cabinCrewIdsText, setCabinCrewIdsText] = useState('')
+  const [simulation, setSimulation] = useState(null)
 
   useEffect(() => {
     setLoading(true)
@@ -468,6 +475,31 @@ export default function RostersPageEnhanced(){
     [flights, selectedFlightId]
   )
 
+  // Dry-run the current selection while the generate dialog is open
+  useEffect(() => {
+    if (!showGenerateModal || !selectedFlightId) {
+      setSimulation(null)
+      return
+    }
+    let cancelled = false
+    const timer = setTimeout(() => {
+      api.post('rosters/simulate/', {
+        flight_id: selectedFlightId,
+        backend: databaseBackend,
+        pilot_ids: parseIds(pilotIdsText),
+        cabin_crew_ids: parseIds(cabinCrewIdsText),
+      }).then(res => {
+        if (!cancelled) setSimulation(res.data)
+      }).catch(() => {
+        if (!cancelled) setSimulation(null)
+      })
+    }, 250)
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
+    }
+  }, [showGenerateModal, selectedFlightId, databaseBackend, pilotIdsText, cabinCrewIdsText])
+
   async function generateRoster() {
     if (!selectedFlightId) {
       setError('Please select a flight first.')
@@ -478,7 +510,9 @@ export default function RostersPageEnhanced(){
     try {
       const res = await api.post('rosters/generate/', { 
         flight_id: selectedFlightId,
-        backend: databaseBackend
+        backend: databaseBackend,
+        pilot_ids: parseIds(pilotIdsText),
+        cabin_crew_ids: parseIds(cabinCrewIdsText),
       })
       setRosters(prev => [res.data, ...prev])
       setSelectedRosterId(res.data.id)
@@ -600,9 +634,47 @@ export default function RostersPageEnhanced(){
                   </select>
                 </div>
               </div>
+              <div className="info-section">
+                <div className="info-label">Pilot IDs (optional, comma separated)</div>
+                <div className="info-value">
+                  <input
+                    className="input"
+                    value={pilotIdsText}
+                    onChange={e => setPilotIdsText(e.target.value)}
+                    placeholder="Pick automatically"
+                    style={{width: '100%'}}
+                  />
+                </div>
+              </div>
+              <div className="info-section">
+                <div className="info-label">Cabin Crew IDs (optional, comma separated)</div>
+                <div className="info-value">
+                  <input
+                    className="input"
+                    value={cabinCrewIdsText}
+                    onChange={e => setCabinCrewIdsText(e.target.value)}
+                    placeholder="Pick automatically"
+                    style={{width: '100%'}}
+                  />
+                </div>
+              </div>
+              {simulation && (
+                <div className="info-section">
+                  <div className="info-label">Preview</div>
+                  {simulation.valid ? (
+                    <div className="info-value">
+                      {simulation.roster.crew.length} crew, {simulation.roster.passengers.length} passengers seated
+                    </div>
+                  ) : (
+                    <ul className="error-box" style={{margin: 0, paddingLeft: 20}}>
+                      {simulation.violations.map(v => <li key={v}>{v}</li>)}
+                    </ul>
+                  )}
+                </div>
+              )}
               <div className="actions" style={{marginTop: 16, justifyContent: 'flex-end'}}>
                 <button className="btn ghost" onClick={() => setShowGenerateModal(false)}>Cancel</button>
-                <button className="btn" onClick={generateRoster} disabled={creating}>
+                <button className="btn" onClick={generateRoster} disabled={creating || (simulation && !simulation.valid)}>
                   {creating ? 'Generating...' : 'Generate'}
                 </button>
               </div>